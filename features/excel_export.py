@@ -0,0 +1,133 @@
+from __future__ import annotations
+import csv, datetime, os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from openpyxl import Workbook, load_workbook
+
+from features.excel_import import find_header_row_and_map, iter_source_rows, _norm_header
+
+# Devolve à planilha de planejamento o resultado do preenchimento: uma cópia da
+# pasta de trabalho com "Status diário" e "Atualizado em" ao lado de cada linha lida
+# por process_worksheet. Leitura em modo read-only e escrita em modo write-only
+# (streaming): a planilha nunca é carregada inteira na memória. A cópia leva
+# valores e fórmulas, não a formatação.
+
+STATUS_HEADER = "Status diário"
+TIME_HEADER = "Atualizado em"
+
+
+def _atomic_save(wb: Workbook, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    wb.save(tmp)
+    os.replace(tmp, path)
+
+
+def writeback_path(src: str) -> Path:
+    """<planilha>.diario.xlsx ao lado da original (write-only grava só .xlsx)."""
+    p = Path(src)
+    return p.with_name(f"{p.stem}.diario.xlsx")
+
+
+def write_back_statuses(
+    src: str,
+    sheet: str,
+    statuses: Dict[str, str],
+    normalize: Callable[[str], str],
+    out_path: Optional[str] = None,
+    *,
+    when: Optional[datetime.datetime] = None,
+) -> dict:
+    """Copia a pasta de trabalho `src` anotando status e horário nas linhas da aba `sheet`.
+
+    `statuses`: {chave normalizada: status} (ok / not_found / skipped / verified ...);
+    `normalize` converte a chave montada da linha para a forma usada em `statuses`
+    (services.utils.normalize_label). Linhas sem status ficam com as colunas vazias.
+    Colunas de status de uma exportação anterior são reaproveitadas. Devolve
+    {'path', 'rows', 'annotated', 'counts'}.
+    """
+    out = Path(out_path) if out_path else writeback_path(src)
+    stamp = (when or datetime.datetime.now()).replace(microsecond=0)
+    # valores (datas/fórmulas já calculadas) para montar as chaves; bruto para copiar fórmulas
+    wb_val = load_workbook(src, read_only=True, data_only=True)
+    wb_raw = load_workbook(src, read_only=True, data_only=False)
+    wb_out = Workbook(write_only=True)
+    counts: Dict[str, int] = {}
+    rows = annotated = 0
+    try:
+        for name in wb_raw.sheetnames:
+            ws_raw = wb_raw[name]
+            ws_out = wb_out.create_sheet(title=name)
+            if name != sheet:
+                for row in ws_raw.iter_rows(values_only=True):
+                    ws_out.append(row)
+                continue
+
+            ws_val = wb_val[name]
+            header_row, cols = find_header_row_and_map(ws_val)
+            header = next(ws_raw.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+            norm_header = [_norm_header(str(h)) if h is not None else "" for h in header]
+            c_status = (norm_header.index(_norm_header(STATUS_HEADER)) if _norm_header(STATUS_HEADER) in norm_header
+                        else max(len(header), ws_raw.max_column or 0))
+            c_time = (norm_header.index(_norm_header(TIME_HEADER)) if _norm_header(TIME_HEADER) in norm_header
+                      else c_status + 1)
+            width = max(c_status, c_time) + 1
+
+            def _put(row, status, ts):
+                cells = list(row) + [None] * (width - len(row))
+                cells[c_status], cells[c_time] = status, ts
+                return cells
+
+            raw_rows = ws_raw.iter_rows(values_only=True)
+            for r, row in enumerate(raw_rows, start=1):
+                if r < header_row:
+                    ws_out.append(row)
+                elif r == header_row:
+                    ws_out.append(_put(row, STATUS_HEADER, TIME_HEADER))
+                    break
+            for (r, key, _text), row in zip(iter_source_rows(ws_val, header_row, cols), raw_rows):
+                rows += 1
+                status = statuses.get(normalize(key)) if key else None
+                if status:
+                    annotated += 1
+                    counts[status] = counts.get(status, 0) + 1
+                ws_out.append(_put(row, status, stamp if status else None))
+        _atomic_save(wb_out, out)
+    finally:
+        wb_val.close()
+        wb_raw.close()
+    return {"path": str(out), "rows": rows, "annotated": annotated, "counts": counts}
+
+
+REPORT_COLUMNS = ("Chave", "Status", "Texto", "Atualizado em")
+
+
+def export_run_report(path: str, rows: Iterable[tuple]) -> str:
+    """Relatório avulso do preenchimento: CSV (';', UTF-8 com BOM — abre direto no Excel) ou XLSX.
+
+    `rows`: (chave, status, texto, horário) na ordem desejada.
+    """
+    out = Path(path)
+    if out.suffix.lower() == ".csv":
+        tmp = out.with_name(out.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f, delimiter=";")
+            w.writerow(REPORT_COLUMNS)
+            for key, status, text, ts in rows:
+                w.writerow((key, status, text, ts.isoformat(sep=" ") if isinstance(ts, datetime.datetime) else ts))
+        os.replace(tmp, out)
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="Preenchimento")
+        ws.append(REPORT_COLUMNS)
+        for row in rows:
+            ws.append(list(row))
+        _atomic_save(wb, out)
+    return str(out)
+
+
+def run_report_rows(value_map: Dict[str, str], statuses: Dict[str, str],
+                    when: Optional[datetime.datetime] = None) -> List[tuple]:
+    """Linhas do relatório a partir do dataset e dos status do último preenchimento."""
+    stamp = (when or datetime.datetime.now()).replace(microsecond=0)
+    return [(k, statuses.get(k, ""), value_map.get(k, ""), stamp) for k in value_map]
@@ -15,8 +15,9 @@ def _norm_header(s: str) -> str:
 
 def find_header_row_and_map(ws: Worksheet, max_scan_rows: int = 10):
     """Detecta linha de cabeçalho e retorna (header_row_idx, {'data': c, 'modalidade': c, 'materia': c})."""
-    for r in range(1, max_scan_rows+1):
-        row_vals = [_norm_header((ws.cell(r, c).value or "")) for c in range(1, ws.max_column+1)]
+    # iter_rows: funciona (e é rápido) também em read-only sem dimensão gravada
+    for r, row in enumerate(ws.iter_rows(min_row=1, max_row=max_scan_rows, values_only=True), start=1):
+        row_vals = [_norm_header((v or "")) for v in row]
         cand = {"data": None, "modalidade": None, "materia": None}
         for c, hv in enumerate(row_vals, start=1):
             if hv in ("data", "dia"):
@@ -51,30 +52,35 @@ def mod_to_suffix(mod: str) -> str | None:
         return "P"
     return None
 
+def iter_source_rows(ws: Worksheet, header_row: int, cols: dict):
+    """Linhas de dados em streaming (iter_rows): (nº da linha, chave 'DD/MM/AAAA -X' | None, texto)."""
+    c_data, c_mod, c_mat = cols["data"], cols["modalidade"], cols["materia"]
+    for r, row in enumerate(ws.iter_rows(min_row=header_row + 1, values_only=True), start=header_row + 1):
+        n = len(row)
+        v_date = row[c_data - 1] if c_data <= n else None
+        v_mod = row[c_mod - 1] if c_mod <= n else None
+        v_text = row[c_mat - 1] if c_mat <= n else None
+
+        key_date = fmt_date_ddmmyyyy(v_date)
+        suf = mod_to_suffix(v_mod)
+        text = (str(v_text).strip() if v_text is not None else "")
+        key = f"{key_date} -{suf}" if key_date and suf else None
+        yield r, key, text
+
 def process_worksheet(ws: Worksheet, validate_value_map) -> tuple[Dict[str, str], dict]:
     """Lê uma worksheet e devolve (norm_map, stats)."""
     header_row, cols = find_header_row_and_map(ws)
-    c_data, c_mod, c_mat = cols["data"], cols["modalidade"], cols["materia"]
 
     new_items: Dict[str, str] = {}
     imported = 0
     skipped = 0
     overwritten = 0
 
-    for r in range(header_row + 1, ws.max_row + 1):
-        v_date = ws.cell(r, c_data).value
-        v_mod = ws.cell(r, c_mod).value
-        v_text = ws.cell(r, c_mat).value
-
-        key_date = fmt_date_ddmmyyyy(v_date)
-        suf = mod_to_suffix(v_mod)
-        text = (str(v_text).strip() if v_text is not None else "")
-
-        if not key_date or not suf or not text:
+    for _r, key, text in iter_source_rows(ws, header_row, cols):
+        if not key or not text:
             skipped += 1
             continue
 
-        key = f"{key_date} -{suf}"
         if key in new_items:
             overwritten += 1
         new_items[key] = text
@@ -88,4 +94,4 @@ def process_worksheet(ws: Worksheet, validate_value_map) -> tuple[Dict[str, str]
         "errors": errors,
         "valid": len(norm),
     }
-    return norm, stats
\ No newline at end of file
+    return norm, stats
@@ -0,0 +1,308 @@
+from __future__ import annotations
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ---------- Mapa persistente (HAMT) ----------
+# Cada alteração copia só o caminho da raiz até a folha (≈ log32 n nós); o resto da
+# árvore é compartilhado entre versões. Isso deixa cada snapshot do histórico com
+# custo proporcional às entradas alteradas e permite comparar versões pulando
+# subárvores idênticas (mesmo objeto).
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_MAX_SHIFT = 30  # hash de 32 bits → 7 níveis (0..30)
+_MISSING = object()
+
+def _hash(key) -> int:
+    return hash(key) & 0xFFFFFFFF
+
+def _popcount(x: int) -> int:
+    return bin(x).count("1")
+
+class _Bitmap:
+    __slots__ = ("bitmap", "items")  # items: folhas (chave, valor) ou nós filhos
+
+    def __init__(self, bitmap: int, items: tuple):
+        self.bitmap = bitmap
+        self.items = items
+
+class _Collision:
+    __slots__ = ("hash", "items")  # items: tupla de folhas com o mesmo hash
+
+    def __init__(self, h: int, items: tuple):
+        self.hash = h
+        self.items = items
+
+_EMPTY = _Bitmap(0, ())
+
+def _merge_leaves(shift: int, h1: int, leaf1: tuple, h2: int, leaf2: tuple):
+    if h1 == h2 or shift > _MAX_SHIFT:
+        return _Collision(h1, (leaf1, leaf2))
+    b1 = (h1 >> shift) & _MASK
+    b2 = (h2 >> shift) & _MASK
+    if b1 == b2:
+        return _Bitmap(1 << b1, (_merge_leaves(shift + _BITS, h1, leaf1, h2, leaf2),))
+    items = (leaf1, leaf2) if b1 < b2 else (leaf2, leaf1)
+    return _Bitmap((1 << b1) | (1 << b2), items)
+
+def _set(node, shift: int, h: int, key, value):
+    """Retorna (novo_nó, adicionou_chave)."""
+    if isinstance(node, _Collision):
+        if node.hash == h:
+            for i, (k, v) in enumerate(node.items):
+                if k == key:
+                    if v is value:
+                        return node, False
+                    return _Collision(h, node.items[:i] + ((key, value),) + node.items[i + 1:]), False
+            return _Collision(h, node.items + ((key, value),)), True
+        # hashes diferentes: sobe a colisão para dentro de um bitmap
+        wrapper = _Bitmap(1 << ((node.hash >> shift) & _MASK), (node,))
+        return _set(wrapper, shift, h, key, value)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    idx = _popcount(node.bitmap & (bit - 1))
+    items = node.items
+    if not node.bitmap & bit:
+        return _Bitmap(node.bitmap | bit, items[:idx] + ((key, value),) + items[idx:]), True
+
+    item = items[idx]
+    if isinstance(item, tuple):
+        k, v = item
+        if k == key:
+            if v is value:
+                return node, False
+            new_item, added = (key, value), False
+        else:
+            new_item, added = _merge_leaves(shift + _BITS, _hash(k), item, h, (key, value)), True
+    else:
+        new_item, added = _set(item, shift + _BITS, h, key, value)
+        if new_item is item:
+            return node, False
+    return _Bitmap(node.bitmap, items[:idx] + (new_item,) + items[idx + 1:]), added
+
+def _delete(node, shift: int, h: int, key):
+    """Retorna nó novo, o próprio nó (chave ausente), uma folha (colapso) ou None (vazio)."""
+    if isinstance(node, _Collision):
+        rest = tuple(it for it in node.items if it[0] != key)
+        if len(rest) == len(node.items):
+            return node
+        return rest[0] if len(rest) == 1 else _Collision(node.hash, rest)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node
+    idx = _popcount(node.bitmap & (bit - 1))
+    items = node.items
+    item = items[idx]
+    if isinstance(item, tuple):
+        if item[0] != key:
+            return node
+        new_item = None
+    else:
+        new_item = _delete(item, shift + _BITS, h, key)
+        if new_item is item:
+            return node
+
+    if new_item is None:
+        rest = items[:idx] + items[idx + 1:]
+        if not rest:
+            return None
+        if len(rest) == 1 and isinstance(rest[0], tuple) and shift > 0:
+            return rest[0]  # sobra uma folha: o pai guarda direto
+        return _Bitmap(node.bitmap & ~bit, rest)
+    return _Bitmap(node.bitmap, items[:idx] + (new_item,) + items[idx + 1:])
+
+def _iter(node) -> Iterator[tuple]:
+    if isinstance(node, tuple):
+        yield node
+        return
+    for item in node.items:
+        if isinstance(item, tuple):
+            yield item
+        else:
+            yield from _iter(item)
+
+def _diff(a, b, out: dict) -> None:
+    """Acumula em `out` {chave: (valor_em_a, valor_em_b)} pulando subárvores compartilhadas."""
+    if a is b:
+        return
+    if isinstance(a, _Bitmap) and isinstance(b, _Bitmap):
+        ba, bb = a.bitmap, b.bitmap
+        bits = ba | bb
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            x = a.items[_popcount(ba & (bit - 1))] if ba & bit else None
+            y = b.items[_popcount(bb & (bit - 1))] if bb & bit else None
+            if x is not y:
+                _diff(x, y, out)
+        return
+    # folhas, colisões ou formatos diferentes: compara materializando (subárvore pequena)
+    da = dict(_iter(a)) if a is not None else {}
+    db = dict(_iter(b)) if b is not None else {}
+    for k, v in da.items():
+        w = db.get(k, _MISSING)
+        if w is _MISSING:
+            out[k] = (v, None)
+        elif w is not v and w != v:
+            out[k] = (v, w)
+    for k, w in db.items():
+        if k not in da:
+            out[k] = (None, w)
+
+def _build(entries: list, shift: int) -> _Bitmap:
+    """Constrói a árvore de uma vez a partir de [(hash, chave, valor)] com chaves distintas."""
+    buckets: Dict[int, list] = {}
+    for e in entries:
+        buckets.setdefault((e[0] >> shift) & _MASK, []).append(e)
+    bitmap, items = 0, []
+    for pos in sorted(buckets):
+        group = buckets[pos]
+        bitmap |= 1 << pos
+        if len(group) == 1:
+            items.append((group[0][1], group[0][2]))
+        elif shift + _BITS > _MAX_SHIFT or all(e[0] == group[0][0] for e in group):
+            items.append(_Collision(group[0][0], tuple((e[1], e[2]) for e in group)))
+        else:
+            items.append(_build(group, shift + _BITS))
+    return _Bitmap(bitmap, tuple(items))
+
+class PMap:
+    """Mapa imutável str -> str com compartilhamento estrutural entre versões."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, root=_EMPTY, size: int = 0):
+        self._root = root
+        self._size = size
+
+    @classmethod
+    def from_dict(cls, mapping: Dict[str, str]) -> "PMap":
+        if not mapping:
+            return cls()
+        return cls(_build([(_hash(k), k, v) for k, v in mapping.items()], 0), len(mapping))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, key, default=None):
+        node, shift, h = self._root, 0, _hash(key)
+        while True:
+            if isinstance(node, _Collision):
+                for k, v in node.items:
+                    if k == key:
+                        return v
+                return default
+            bit = 1 << ((h >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return default
+            item = node.items[_popcount(node.bitmap & (bit - 1))]
+            if isinstance(item, tuple):
+                return item[1] if item[0] == key else default
+            node, shift = item, shift + _BITS
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def items(self) -> Iterator[tuple]:
+        return _iter(self._root)
+
+    def __iter__(self):
+        return (k for k, _ in _iter(self._root))
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(_iter(self._root))
+
+    def set(self, key, value) -> "PMap":
+        root, added = _set(self._root, 0, _hash(key), key, value)
+        return self if root is self._root else PMap(root, self._size + added)
+
+    def delete(self, key) -> "PMap":
+        root = _delete(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        if root is None:
+            root = _EMPTY
+        elif isinstance(root, tuple):
+            root = _set(_EMPTY, 0, _hash(root[0]), root[0], root[1])[0]
+        return PMap(root, self._size - 1)
+
+    def update(self, changes: Dict[str, Optional[str]]) -> "PMap":
+        """Aplica {chave: valor}; valor None remove a chave."""
+        if not self._size:
+            return PMap.from_dict({k: v for k, v in changes.items() if v is not None})
+        m = self
+        for k, v in changes.items():
+            m = m.delete(k) if v is None else m.set(k, v)
+        return m
+
+    def diff(self, other: "PMap") -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """{chave: (valor_aqui, valor_em_other)}; None = ausente. Custo ~ O(alterações)."""
+        out: dict = {}
+        _diff(self._root, other._root, out)
+        return out
+
+# ---------- Histórico desfazer/refazer ----------
+
+class History:
+    """Desfazer/refazer sobre versões de PMap.
+
+    Cada operação vira uma nova versão (compartilhando o que não mudou); desfazer
+    devolve só o delta {chave: valor|None} a aplicar no dict da UI.
+    """
+
+    def __init__(self, limit: int = 500):
+        self.limit = limit
+        self.current = PMap()
+        self._undo: List[Tuple[PMap, str]] = []
+        self._redo: List[Tuple[PMap, str]] = []
+
+    def reset(self, value_map: Dict[str, str]) -> None:
+        self.current = PMap.from_dict(value_map)
+        self._undo.clear()
+        self._redo.clear()
+
+    def commit(self, changes: Dict[str, Optional[str]], label: str) -> Dict[str, Optional[str]]:
+        """Registra alterações explícitas ({chave: valor|None}); devolve-as ({} se nada mudou)."""
+        new = self.current.update(changes)
+        if new is self.current:
+            return {}
+        self._undo.append((self.current, label))
+        if len(self._undo) > self.limit:
+            del self._undo[0]
+        self._redo.clear()
+        self.current = new
+        return changes
+
+    def commit_map(self, value_map: Dict[str, str], label: str) -> Dict[str, Optional[str]]:
+        """Registra o estado completo (ex.: após ajuste de datas); guarda e devolve só o que mudou."""
+        cur = self.current
+        changes: Dict[str, Optional[str]] = {k: None for k in cur if k not in value_map}
+        for k, v in value_map.items():
+            old = cur.get(k, _MISSING)
+            if old is _MISSING or (old is not v and old != v):
+                changes[k] = v
+        return self.commit(changes, label) if changes else {}
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> Optional[Tuple[Dict[str, Optional[str]], str]]:
+        if not self._undo:
+            return None
+        prev, label = self._undo.pop()
+        delta = {k: new for k, (_old, new) in self.current.diff(prev).items()}
+        self._redo.append((self.current, label))
+        self.current = prev
+        return delta, label
+
+    def redo(self) -> Optional[Tuple[Dict[str, Optional[str]], str]]:
+        if not self._redo:
+            return None
+        nxt, label = self._redo.pop()
+        delta = {k: new for k, (_old, new) in self.current.diff(nxt).items()}
+        self._undo.append((self.current, label))
+        self.current = nxt
+        return delta, label
@@ -0,0 +1,49 @@
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+import re
+
+def _same(a: Optional[str], b: Optional[str]) -> bool:
+    """Compara textos ignorando diferenças de espaços/quebras (o portal reformata)."""
+    if a is None or b is None:
+        return a is b
+    return re.sub(r"\s+", " ", a).strip() == re.sub(r"\s+", " ", b).strip()
+
+def diff_maps(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, list]:
+    """Retorna {'added': [...], 'removed': [...], 'changed': [...], 'same': [...]} (chaves)."""
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    changed, same = [], []
+    for k in old:
+        if k in new:
+            (same if _same(old[k], new[k]) else changed).append(k)
+    return {"added": added, "removed": removed, "changed": changed, "same": same}
+
+def three_way_merge(
+    base: Dict[str, str], local: Dict[str, str], remote: Dict[str, str]
+) -> Tuple[Dict[str, str], Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]]:
+    """Mescla local (app) e remote (portal) a partir de base (dados.json carregado).
+
+    `remote` é parcial: chave ausente no portal = sem informação (mantém o local).
+    Quando os dois lados mudaram de forma diferente, fica o local e a chave vai
+    para `conflicts` como (base, local, remote). Retorna (merged, conflicts).
+    """
+    merged: Dict[str, str] = dict(local)
+    conflicts: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+
+    for k, r in remote.items():
+        b, l = base.get(k), local.get(k)
+        if _same(l, r):
+            continue
+        if l is None:
+            if b is None:
+                merged[k] = r  # só existe no portal
+            elif not _same(b, r):
+                conflicts[k] = (b, l, r)  # removido aqui, alterado lá
+            continue
+        if _same(l, b):
+            merged[k] = r  # só o portal mudou
+        elif _same(r, b):
+            continue  # só o local mudou
+        else:
+            conflicts[k] = (b, l, r)
+    return merged, conflicts
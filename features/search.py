@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set
+import re
+
+from features.excel_import import _strip_accents
+
+_DASHES = str.maketrans({"–": "-", "—": "-", "−": "-"})
+
+def fold(s: str) -> str:
+    """Mesma normalização do norm() do JS: minúsculas, sem acentos, traços e espaços unificados."""
+    s = _strip_accents(s or "").lower().translate(_DASHES)
+    return re.sub(r"\s+", " ", s).strip()
+
+def _grams(s: str) -> Set[str]:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+class SearchIndex:
+    """Índice incremental de trigramas sobre chave + texto das entradas.
+
+    add/remove/update mexem só nas postings da entrada alterada (sem reconstrução).
+    Consulta: cada termo (>= 3 letras) intersecta as postings dos seus trigramas e
+    confirma por substring; termos curtos filtram por varredura.
+    """
+
+    def __init__(self, value_map: Optional[Dict[str, str]] = None):
+        self._docs: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        if value_map:
+            for k, v in value_map.items():
+                self.add(k, v)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, key: str, text: str) -> None:
+        if key in self._docs:
+            self.remove(key)
+        doc = fold(f"{key} {text}")
+        self._docs[key] = doc
+        postings = self._postings
+        for g in _grams(doc):
+            bucket = postings.get(g)
+            if bucket is None:
+                postings[g] = {key}
+            else:
+                bucket.add(key)
+
+    def remove(self, key: str) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for g in _grams(doc):
+            bucket = self._postings.get(g)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._postings[g]
+
+    def update(self, key: str, text: Optional[str]) -> None:
+        """text None remove a entrada (mesma convenção dos deltas do histórico)."""
+        if text is None:
+            self.remove(key)
+        else:
+            self.add(key, text)
+
+    def apply(self, changes: Dict[str, Optional[str]]) -> None:
+        for k, v in changes.items():
+            self.update(k, v)
+
+    def search(self, query: str) -> Optional[Set[str]]:
+        """Chaves que contêm todos os termos; None se a consulta for vazia (sem filtro)."""
+        terms = fold(query).split(" ")
+        terms = [t for t in terms if t]
+        if not terms:
+            return None
+        long_terms = sorted((t for t in terms if len(t) >= 3), key=len, reverse=True)
+        candidates: Optional[Set[str]] = None
+        for t in long_terms:
+            # as duas postings mais raras bastam para podar; a substring confirma o resto
+            buckets = sorted((self._postings.get(g) or () for g in _grams(t)), key=len)[:2]
+            if not buckets[0]:
+                return set()
+            cur = buckets[0] if candidates is None else candidates
+            for b in buckets:
+                if b is not cur:
+                    cur = cur & b
+            candidates = cur
+            if not candidates:
+                return set()
+        pool: Iterable[str] = candidates if candidates is not None else self._docs.keys()
+        docs = self._docs
+        for t in terms:
+            pool = [k for k in pool if t in docs[k]]
+        return set(pool)
+
+def filter_keys(ordered_keys: Iterable[str], hits: Optional[Set[str]]) -> List[str]:
+    """Mantém a ordem da lista (por data) e aplica o resultado da busca."""
+    if hits is None:
+        return list(ordered_keys)
+    return [k for k in ordered_keys if k in hits]
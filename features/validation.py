@@ -0,0 +1,112 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (chave normalizada, motivo | None) para uma chave bruta — ex.: services.utils.check_key
+KeyCheck = Callable[[str], Tuple[str, Optional[str]]]
+
+
+class ValidationState:
+    """Validação incremental de um arquivo de origem (dados.json ou aba da planilha).
+
+    Guarda, por chave bruta, a chave normalizada e o veredito; `update(changes)`
+    revalida só as chaves brutas alteradas e mantém `norm` (o que vale) e `errors`
+    (erros vivos: chave bruta -> motivo). Chaves brutas que normalizam para a mesma
+    chave ficam em fila: vale a primeira, as demais são erro de duplicata até a
+    primeira sair.
+
+    Chamar a instância com um map completo (`state(raw)`) tem a assinatura de
+    `validate_value_map` — pode ser passada a `process_worksheet` — e revalida apenas
+    o que difere da chamada anterior; o efeito fica em `last_diff`.
+    """
+
+    def __init__(self, check_key: KeyCheck):
+        self.check_key = check_key
+        self.norm: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.last_diff: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._raw: Dict[str, object] = {}          # chave bruta -> valor bruto
+        self._nk: Dict[str, Optional[str]] = {}    # chave bruta -> chave normalizada (None = inválida)
+        self._claims: Dict[str, List[str]] = {}    # chave normalizada -> chaves brutas (a 1ª vale)
+        self.stats = {"checked": 0, "unchanged": 0}
+
+    def __len__(self) -> int:
+        return len(self.norm)
+
+    def _set(self, nk: str, value: Optional[str], touched: Dict[str, Optional[str]]) -> None:
+        if nk not in touched:
+            touched[nk] = self.norm.get(nk)
+        if value is None:
+            self.norm.pop(nk, None)
+        else:
+            self.norm[nk] = value
+
+    def _release(self, raw: str, nk: str, touched: Dict[str, Optional[str]]) -> None:
+        claims = self._claims[nk]
+        owner = claims[0] == raw
+        claims.remove(raw)
+        if not claims:
+            del self._claims[nk]
+            self._set(nk, None, touched)
+        elif owner:
+            heir = claims[0]
+            self.errors.pop(heir, None)
+            self._set(nk, self._raw[heir], touched)
+
+    def update(self, changes: Dict[str, object]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Aplica {chave bruta: valor | None (removida)}; devolve {chave normalizada: (antes, depois)}."""
+        touched: Dict[str, Optional[str]] = {}
+        for raw, value in changes.items():
+            raw = str(raw)
+            prev = self._nk.pop(raw, None)
+            self._raw.pop(raw, None)
+            self.errors.pop(raw, None)
+            if value is None:
+                if prev is not None:
+                    self._release(raw, prev, touched)
+                continue
+            self.stats["checked"] += 1
+            self._raw[raw] = value
+            if isinstance(value, str):
+                nk, err = self.check_key(raw)
+            else:
+                nk, err = raw, "Valor precisa ser texto (string)."
+            if prev is not None and prev == nk and not err:
+                # mesmo destino: só o texto mudou (mantém a posição na fila de duplicatas)
+                self._nk[raw] = nk
+                if self._claims[nk][0] == raw:
+                    self._set(nk, value, touched)
+                else:
+                    self.errors[raw] = f"Chave duplicada após normalização: {nk!r}."
+                continue
+            if prev is not None:
+                self._release(raw, prev, touched)
+            if err:
+                self._nk[raw] = None
+                self.errors[raw] = err
+                continue
+            self._nk[raw] = nk
+            claims = self._claims.setdefault(nk, [])
+            claims.append(raw)
+            if claims[0] == raw:
+                self._set(nk, value, touched)
+            else:
+                self.errors[raw] = f"Chave duplicada após normalização: {nk!r}."
+        return {nk: (old, self.norm.get(nk)) for nk, old in touched.items() if old != self.norm.get(nk)}
+
+    def replace(self, raw_map: Dict[str, object]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Troca o conteúdo inteiro, revalidando só as chaves brutas novas/alteradas/removidas."""
+        changes: Dict[str, object] = {raw: None for raw in self._raw if raw not in raw_map}
+        for raw, value in raw_map.items():
+            raw = str(raw)
+            if raw in self._raw and self._raw[raw] == value:
+                self.stats["unchanged"] += 1
+                continue
+            changes[raw] = value
+        return self.update(changes)
+
+    def __call__(self, raw_map) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if not isinstance(raw_map, dict):
+            self.last_diff = {}
+            return {}, {"__root__": "JSON precisa ser objeto {label: texto}."}
+        self.last_diff = self.replace(raw_map)
+        return dict(self.norm), dict(self.errors)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+from typing import Dict, List
+import hashlib, json, os
+
+def text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=10).hexdigest()
+
+class TextStore:
+    """Armazena cada texto distinto uma única vez (endereçado pelo hash do conteúdo)."""
+
+    def __init__(self):
+        self._texts: Dict[str, str] = {}
+        self._refs: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def intern(self, text: str) -> str:
+        """Registra uma referência a `text` e devolve o hash."""
+        h = text_digest(text)
+        if h not in self._texts:
+            self._texts[h] = text
+        self._refs[h] = self._refs.get(h, 0) + 1
+        return h
+
+    def retain(self, h: str, text: str) -> bool:
+        """Nova referência a `h` se `text` for o próprio objeto guardado (sem re-hash)."""
+        if self._texts.get(h) is not text:
+            return False
+        self._refs[h] += 1
+        return True
+
+    def release(self, h: str) -> None:
+        n = self._refs.get(h, 0) - 1
+        if n > 0:
+            self._refs[h] = n
+        else:
+            self._refs.pop(h, None)
+            self._texts.pop(h, None)
+
+    def get(self, h: str) -> str:
+        return self._texts[h]
+
+    def items(self):
+        return self._texts.items()
+
+class Workspace:
+    """Vários datasets (turmas) ao mesmo tempo, com textos compartilhados.
+
+    Cada dataset guarda só {chave: hash}; os textos ficam no TextStore. O map de cada
+    dataset (já com os textos internados) fica pronto e `dataset()` o devolve sem cópia,
+    então trocar de turma não reconstrói nada. Os maps apontam para os mesmos objetos
+    str, então a memória cresce com o conteúdo distinto, não com turmas × entradas.
+    """
+
+    VERSION = 1
+
+    def __init__(self):
+        self.store = TextStore()
+        self._datasets: Dict[str, Dict[str, str]] = {}  # nome -> {chave: hash}
+        self._maps: Dict[str, Dict[str, str]] = {}      # nome -> {chave: texto internado}
+
+    def names(self) -> List[str]:
+        return list(self._datasets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._datasets
+
+    def set_dataset(self, name: str, value_map: Dict[str, str]) -> Dict[str, str]:
+        """Substitui o dataset `name`; devolve o map com textos internados (compartilhados).
+
+        Passar o próprio map devolvido por `dataset()` (alterado no lugar) o atualiza sem
+        criar outro: só as entradas com texto novo são trocadas pelo objeto do store.
+        """
+        old = self._datasets.get(name, {})
+        refs: Dict[str, str] = {}
+        get = self.store.get
+        live = value_map is self._maps.get(name)
+        out = value_map if live else {}
+        for k, v in value_map.items():
+            h = old.get(k)
+            # entrada inalterada: mesmo objeto do store, evita re-hash
+            if h is None or not self.store.retain(h, v):
+                h = self.store.intern(v)
+                if live:
+                    out[k] = get(h)
+            refs[k] = h
+            if not live:
+                out[k] = get(h)
+        for h in old.values():
+            self.store.release(h)
+        self._datasets[name] = refs
+        self._maps[name] = out
+        return out
+
+    def dataset(self, name: str) -> Dict[str, str]:
+        """Map do dataset (o próprio, sem cópia); alterações valem após `set_dataset()`."""
+        return self._maps.get(name, {})
+
+    def remove(self, name: str) -> None:
+        self._maps.pop(name, None)
+        for h in self._datasets.pop(name, {}).values():
+            self.store.release(h)
+
+    def stats(self) -> dict:
+        entries = sum(len(d) for d in self._datasets.values())
+        return {
+            "datasets": len(self._datasets),
+            "entries": entries,
+            "unique_texts": len(self.store),
+            "text_bytes": sum(len(t.encode("utf-8")) for _, t in self.store.items()),
+        }
+
+    # ---------- persistência ----------
+    def to_json(self) -> dict:
+        return {
+            "version": self.VERSION,
+            "texts": dict(self.store.items()),
+            "turmas": {name: dict(refs) for name, refs in self._datasets.items()},
+        }
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Workspace":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "texts" not in data or "turmas" not in data:
+            raise ValueError("Arquivo não é um workspace (esperado 'texts' e 'turmas').")
+        ws = cls()
+        texts: Dict[str, str] = data["texts"]
+        for name, refs in data["turmas"].items():
+            ws.set_dataset(name, {k: texts[h] for k, h in refs.items()})
+        return ws
+
+def next_dataset_name(ws: Workspace, base: str = "Turma") -> str:
+    i = len(ws.names()) + 1
+    while f"{base} {i}" in ws:
+        i += 1
+    return f"{base} {i}"
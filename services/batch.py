@@ -0,0 +1,112 @@
+from __future__ import annotations
+import datetime, json, time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.utils import OUT_DIR
+from services.diario import fill_entries, try_click_save
+from services.frames import enter_cached_frame
+from services.readiness import wait_for_labels
+from services.pacing import AimdPacer
+from services.verify import verify_after_save
+
+
+def _save_and_settle(driver: WebDriver, keys: List[str], logger: Callable[[str], None], timeout: float) -> bool:
+    """Clica em Salvar e espera a resposta assentar (datas presentes e DOM quieto)."""
+    if not try_click_save(driver, logger):
+        return False
+    try:
+        enter_cached_frame(driver)
+        res = wait_for_labels(driver, keys, timeout=timeout, quiet_ms=400)
+    finally:
+        driver.switch_to.default_content()
+    return bool(res.get("ready"))
+
+
+def fill_turmas(
+    driver: WebDriver,
+    targets: List[dict],
+    logger: Callable[[str], None],
+    *,
+    pacer: Optional[AimdPacer] = None,
+    verify: bool = False,
+    save_timeout: float = 20.0,
+    out_dir: Optional[Path] = OUT_DIR,
+) -> dict:
+    """Preenche várias turmas em sequência com ritmo adaptativo.
+
+    `targets`: [{'name', 'url', 'value_map'}]. Cada turma é aberta (latência 'nav'),
+    preenchida em lotes de `pacer.chunk_size` entradas com um salvamento por lote
+    (latência 'save') e, opcionalmente, verificada. Sessão expirada (redirecionamento
+    para login) interrompe o restante. Relatório em out_portal/batch_*.json.
+    """
+    pacer = pacer or AimdPacer(logger=logger)
+    if pacer.logger is None:
+        pacer.logger = logger
+    turmas: Dict[str, dict] = {}
+    t_start = time.perf_counter()
+    cache = None
+    if verify:
+        from services.http_cache import default_cache
+        cache = default_cache()
+
+    for n, target in enumerate(targets, 1):
+        name, url, value_map = target["name"], target["url"], target["value_map"]
+        item = turmas[name] = {"url": url, "entries": len(value_map), "ok": 0, "not_found": 0,
+                               "skipped": 0, "saves": 0, "save_errors": 0}
+        logger(f"[lote] ({n}/{len(targets)}) {name}: {len(value_map)} entradas")
+        try:
+            pacer.timed("nav", lambda: driver.get(url), ok=lambda _r: True)
+        except Exception as e:
+            item["error"] = f"navegação: {e}"
+            logger(f"[ERRO] {name}: falha ao abrir {url}: {e}")
+            pacer.wait()
+            continue
+        if "login" in (driver.current_url or "").lower() and "login" not in url.lower():
+            item["error"] = "sessão expirada"
+            logger("[lote] Sessão expirada (redirecionado para login); interrompendo.")
+            break
+
+        keys = list(value_map)
+        i = 0
+        while i < len(keys):
+            chunk = keys[i:i + pacer.chunk_size]
+            i += len(chunk)
+            ok, nf, sk = fill_entries(driver, {k: value_map[k] for k in chunk}, logger, highlight=False)
+            item["ok"] += ok
+            item["not_found"] += nf
+            item["skipped"] += sk
+            saved = pacer.timed("save", lambda: _save_and_settle(driver, chunk, logger, save_timeout))
+            item["saves"] += 1
+            item["save_errors"] += 0 if saved else 1
+            pacer.wait()
+
+        if verify and item["save_errors"]:
+            # recarregar a página descartaria os lotes que não foram salvos
+            logger(f"[lote] {name}: {item['save_errors']} salvamento(s) sem confirmação; verificação não executada.")
+        elif verify:
+            rep = verify_after_save(driver, value_map, logger, cache=cache, out_dir=None)
+            item["verify"] = rep["summary"]
+
+    if cache is not None:
+        cache.flush()  # índice do cache HTTP gravado uma vez por lote
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "elapsed_s": round(time.perf_counter() - t_start, 2),
+        "turmas": turmas,
+        "pacing": pacer.report(),
+    }
+    fin = report["pacing"]["final"]
+    logger(f"[lote] {len(turmas)} turma(s) em {report['elapsed_s']}s | ritmo final: lote {fin['chunk']}, "
+           f"concorrência {fin['concurrency']}, pausa {fin['delay']:.2f}s")
+    if out_dir is not None:
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out = out_dir / f"batch_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+            out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            report["path"] = str(out)
+        except OSError as e:
+            logger(f"[lote] Não consegui gravar o relatório: {e}")
+    return report
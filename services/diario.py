@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import Callable, Tuple
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
 from selenium.webdriver.remote.webdriver import WebDriver
 
+from services.readiness import wait_for_labels
+from services.frames import diary_frame_path, enter_frame_path, enter_cached_frame
+from services.recovery import StaleRecovery, OK, NOT_FOUND, SKIPPED
+from services.matcher import ROW_INDEX_JS, RowIndex
+from services.layout import LAYOUT_CACHE_FILE, layout_fingerprint, load_layout, store_layout
+
 # services/diario.py
 # ---------- JS helpers (corrigidos) ----------
 FIND_RELATED_TEXTAREA_JS = r"""
@@ -82,6 +89,12 @@ for (const el of allLabels){
 return null;
 """
 
+# Resolve várias chaves numa única execução (mesma lógica de FIND_RELATED_TEXTAREA_JS)
+FIND_MANY_TEXTAREAS_JS = (
+    "function __findRelated(){\n" + FIND_RELATED_TEXTAREA_JS + "\n}\n"
+    "return (arguments[0] || []).map(k => __findRelated(k));"
+)
+
 FILL_TEXTAREA_JS = r"""
 const ta = arguments[0];
 const text = arguments[1] || '';
@@ -102,8 +115,31 @@ if (highlight){
 return true;
 """
 
+# Lê o valor atual do textarea de cada chave numa única execução (null = não encontrado)
+READ_MANY_VALUES_JS = (
+    "function __findRelated(){\n" + FIND_RELATED_TEXTAREA_JS + "\n}\n"
+    "return (arguments[0] || []).map(k => { const ta = __findRelated(k); return ta ? (ta.value || '') : null; });"
+)
+
 CLICK_SAVE_BUTTON_JS = r"""
-// (deixe sua lógica de localizar o botão Salvar/Gravar como já estava)
+function norm(s){
+  return (s || '').toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g,'').replace(/\s+/g,' ').trim();
+}
+const cands = Array.from(document.querySelectorAll(
+  'button, input[type=submit], input[type=button], a[role=button], a.btn, [onclick]'
+));
+let best = null;
+for (const el of cands){
+  if (!el.offsetParent || el.disabled) continue;
+  const label = norm(el.innerText || el.value || el.getAttribute('title') || el.getAttribute('aria-label'));
+  if (!/\b(salvar|gravar)\b/.test(label)) continue;
+  // prefere o rótulo mais curto ("Salvar" antes de "Salvar e sair")
+  if (!best || label.length < best.label.length) best = {el, label};
+}
+if (!best) return false;
+try { best.el.scrollIntoView({block:'center'}); } catch(e) {}
+best.el.click();
+return true;
 """
 
 # ---------- API usada pela UI ----------
@@ -116,53 +152,179 @@ def fill_entries(
     strict: bool = True,          # agora padrão estrito: NÃO usa fallback global
     require_empty: bool = False,  # se True, pula campos que já têm conteúdo
     highlight: bool = True,       # destaca o campo preenchido
+    ready_timeout: float = 15.0,  # espera as datas do value_map aparecerem (0 = não espera)
+    max_retries: int = 3,         # rodadas de recuperação quando a tabela é re-renderizada
+    match_rules: Optional[Dict[str, Any]] = None,  # tolerância do casamento (services.matcher.MATCH_RULES)
+    report: Optional[dict] = None,
+    layout_cache: Optional[Path] = LAYOUT_CACHE_FILE,  # None = não lê nem grava o cache de layout
 ) -> Tuple[int, int, int]:
     """
     Preenche item-a-item. Retorna (ok, nao_encontradas, pulado_ja_preenchido).
     - strict=True: não preenche se não localizar textarea relacionado.
     - require_empty=True: só preenche se o textarea estiver vazio (evita sobrescrever).
+    - report: se informado, recebe {'status': {chave: status}, 'retried': n, 'rounds': n,
+      'match': {'rows', 'ambiguous', 'shared', 'blocked', 'strategy', 'strategies'}}.
+    - A estrutura do diário é identificada por impressão digital (services.layout); se já
+      for conhecida, a localização vai direto à estratégia comprovada na página.
+    """
+    # diário pode estar num iframe/frameset: descobre uma vez (com cache por URL) e
+    # entra no frame uma única vez para toda a operação
+    path = diary_frame_path(driver, value_map.keys(), logger)
+    waited = False
+    if path is None and ready_timeout > 0:
+        wait_for_labels(driver, value_map.keys(), timeout=ready_timeout, logger=logger)
+        path = diary_frame_path(driver, value_map.keys(), logger, refresh=True)
+        waited = not path  # esperou no próprio documento do diário; num frame, espera de novo lá
+    enter_frame_path(driver, path or [])
+    try:
+        # começa no primeiro instante seguro: datas esperadas no DOM e página estável
+        if ready_timeout > 0 and not waited:
+            wait_for_labels(driver, value_map.keys(), timeout=ready_timeout, logger=logger)
+        url = driver.current_url
+        fingerprint = layout_fingerprint(driver)
+        strategy = load_layout(url, fingerprint, logger, layout_cache)
+        if strategy:
+            logger(f"   layout conhecido: estratégia {strategy!r}.")
+        run_report = report if report is not None else {}
+        counts = _fill_in_context(
+            driver, value_map, logger,
+            require_empty=require_empty, highlight=highlight,
+            max_retries=max_retries, before_retry=lambda: enter_frame_path(driver, path or []),
+            match_rules=match_rules, strategy=strategy, report=run_report,
+        )
+        match = run_report.get("match", {})
+        if match.get("strategy") != strategy or not strategy:
+            learned = store_layout(url, fingerprint, match.get("strategies", {}), layout_cache)
+            if learned:
+                logger(f"   layout registrado: estratégia {learned!r}.")
+        return counts
+    finally:
+        driver.switch_to.default_content()
+
+
+def resolve_textareas(
+    driver: WebDriver,
+    keys: list[str],
+    rules: Optional[Dict[str, Any]] = None,
+    match_report: Optional[dict] = None,
+    strategy: Optional[str] = None,
+) -> dict:
+    """{chave: WebElement|None}.
+
+    Lê todas as linhas uma vez e resolve pelo índice (data, sufixo) do RowIndex;
+    só as chaves que o índice não achou passam pela busca por substring antiga.
+    `strategy` (do cache de layout) restringe a leitura ao seletor comprovado; a
+    descoberta completa só roda de novo se ele deixar textareas sem rótulo e chaves sem
+    linha (chaves cujas datas simplesmente não estão na página não invalidam o cache).
     """
-    ok = 0
-    not_found = 0
-    skipped_filled = 0
+    rows = driver.execute_script(ROW_INDEX_JS, strategy) or []
+    labeled = [r for r in rows if r[0]]
+    index = RowIndex(labeled, rules)
+    result = index.resolve(keys)
+    if strategy and len(labeled) < len(rows) and any(v is None for v in result.values()):
+        index = RowIndex(driver.execute_script(ROW_INDEX_JS, None) or [], rules)
+        result = index.resolve(keys)
+        strategy = None
+    missing = [k for k in keys if result.get(k) is None and k not in index.ambiguous and k not in index.blocked]
+    if missing:
+        found = driver.execute_script(FIND_MANY_TEXTAREAS_JS, missing) or []
+        # a busca por substring não conhece as linhas já entregues: um textarea atende uma chave só
+        taken = {el: k for k, el in result.items() if el is not None}
+        for i, k in enumerate(missing):
+            el = found[i] if i < len(found) else None
+            if el is not None and el in taken:
+                index.blocked[k] = taken[el]
+                el = None
+            elif el is not None:
+                taken[el] = k
+            result[k] = el
+    if match_report is not None:
+        rep = index.report()
+        match_report["rows"] = rep["rows"]
+        match_report["strategy"] = strategy
+        match_report["strategies"] = dict(index.strategies)
+        match_report.setdefault("ambiguous", {}).update(rep["ambiguous"])
+        match_report.setdefault("shared", {}).update(rep["shared"])
+        match_report.setdefault("blocked", {}).update(rep["blocked"])
+    return result
+
+
+def _fill_in_context(
+    driver: WebDriver,
+    value_map: dict[str, str],
+    logger: Callable[[str], None],
+    *,
+    require_empty: bool,
+    highlight: bool,
+    max_retries: int = 3,
+    before_retry: Optional[Callable[[], None]] = None,
+    match_rules: Optional[Dict[str, Any]] = None,
+    strategy: Optional[str] = None,
+    report: Optional[dict] = None,
+) -> Tuple[int, int, int]:
+    """Laço de preenchimento no contexto (documento/frame) já selecionado."""
 
-    # IMPORTANTE: garantir ordem por chave já vem da UI; aqui iteramos na ordem recebida
-    for k, v in value_map.items():
+    def _fill_one(k: str, textarea) -> str:
+        # IMPORTANTE: ordem por chave já vem da UI; aqui seguimos a ordem recebida
         logger(f"→ Preenchendo: {k}")
-        try:
-            # procura textarea relacionado à label/data
-            textarea = driver.execute_script(FIND_RELATED_TEXTAREA_JS, k)
-            if not textarea:
-                logger(f"   não encontrei textarea para '{k}'")
-                not_found += 1
-                continue  # STRICT: não tenta fallback algum
-
-            if require_empty:
-                current = driver.execute_script("return arguments[0].value || '';", textarea) or ""
-                if str(current).strip():
-                    logger("   pulado (já havia conteúdo)")
-                    skipped_filled += 1
-                    continue
-
-            # preencher + eventos + highlight
-            driver.execute_script(FILL_TEXTAREA_JS, textarea, v, highlight)
-            logger("   ok")
-            ok += 1
-
-        except Exception as e:
-            # qualquer erro neste item não deve contaminar os demais
-            logger(f"   erro: {e}")
-            not_found += 1  # contabiliza como falho/não preenchido
+        if require_empty:
+            current = driver.execute_script("return arguments[0].value || '';", textarea) or ""
+            if str(current).strip():
+                logger("   pulado (já havia conteúdo)")
+                return SKIPPED
 
+        # preencher + eventos + highlight
+        driver.execute_script(FILL_TEXTAREA_JS, textarea, value_map[k], highlight)
+        logger("   ok")
+        return OK
+
+    # STRICT: chave sem textarea relacionado não tenta fallback algum;
+    # erros de um item não contaminam os demais (contam como não preenchido)
+    match: dict = {}
+    keys = list(value_map.keys())
+    recovery = StaleRecovery(
+        # re-resolve sempre todas as chaves, na mesma ordem: as linhas já preenchidas
+        # continuam reservadas às suas chaves e não são entregues às pendentes
+        lambda _pending: resolve_textareas(driver, keys, match_rules, match, strategy),
+        max_retries=max_retries, before_retry=before_retry, logger=logger,
+    )
+    statuses = recovery.run(keys, _fill_one)
+
+    ok = sum(1 for st in statuses.values() if st == OK)
+    skipped_filled = sum(1 for st in statuses.values() if st == SKIPPED)
+    not_found = len(statuses) - ok - skipped_filled
+    if recovery.retried:
+        logger(f"   recuperação: {recovery.retried} itens re-resolvidos em {recovery.rounds} rodada(s).")
+    for k, labels in match.get("ambiguous", {}).items():
+        logger(f"   aviso: {k} casa com {len(labels)} linhas ({' | '.join(labels[:3])})")
+    for label, ks in match.get("shared", {}).items():
+        logger(f"   aviso: a linha {label!r} casa com {len(ks)} chaves ({', '.join(ks)}); preenchida só para {ks[0]}")
+    for k, other in match.get("blocked", {}).items():
+        if not any(k in ks for ks in match.get("shared", {}).values()):
+            logger(f"   aviso: {k} cairia no mesmo campo de {other}; não preenchido")
+    if report is not None:
+        report["status"] = statuses
+        report["retried"] = recovery.retried
+        report["rounds"] = recovery.rounds
+        report["match"] = match
     return ok, not_found, skipped_filled
 
 
-def try_click_save(driver: WebDriver, logger: Callable[[str], None]) -> None:
+def try_click_save(driver: WebDriver, logger: Callable[[str], None]) -> bool:
+    """Clica em Salvar/Gravar; True se encontrou e clicou no botão."""
+    clicked = False
     try:
-        clicked = driver.execute_script(CLICK_SAVE_BUTTON_JS)
+        enter_cached_frame(driver)  # botão costuma estar no mesmo frame do diário
+        clicked = bool(driver.execute_script(CLICK_SAVE_BUTTON_JS))
         if clicked:
             logger("Cliquei em Salvar/Gravar.")
         else:
             logger("Não localizei botão Salvar/Gravar.")
     except Exception as e:
         logger(f"Falha ao tentar salvar: {e}")
+    finally:
+        try:
+            driver.switch_to.default_content()
+        except Exception:
+            pass
+    return clicked
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import datetime, json, os, re, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.utils import OUT_DIR, GET_URL
+from services.pacing import AimdPacer
+from services.http_cache import PageCache, default_cache
+
+# Descoberta de turmas por HTTP reaproveitando a sessão autenticada do navegador.
+# A listagem e as páginas das turmas são baixadas em paralelo (sessão com pool de
+# conexões) e interpretadas com lxml; o resultado fica em cache por semestre.
+
+TURMAS_URL = os.environ.get("UFU_TURMAS_URL") or GET_URL
+TURMAS_CACHE_FILE = OUT_DIR / "turmas_cache.json"
+
+_TURMA_HREF_RE = re.compile(r"turma|diari|disciplina|classe", re.IGNORECASE)
+_DIARY_TEXT_RE = re.compile(r"di[aá]rio|conte[uú]do|registro de aulas", re.IGNORECASE)
+_CODE_RE = re.compile(r"\b([A-Z]{2,5}\s?\d{2,5}[A-Z]?)\b")
+_LOGIN_RE = re.compile(r"login|entrar|autentica", re.IGNORECASE)
+
+
+def session_from_driver(driver: WebDriver, pool_size: int = 16) -> requests.Session:
+    """requests.Session com os cookies e o User-Agent do navegador logado."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    for c in driver.get_cookies():
+        s.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+    try:
+        ua = driver.execute_script("return navigator.userAgent;")
+        if ua:
+            s.headers["User-Agent"] = ua
+    except Exception:
+        pass
+    return s
+
+
+def _text(el) -> str:
+    return re.sub(r"\s+", " ", el.text_content() or "").strip()
+
+
+def parse_turma_listing(html: str, base_url: str) -> List[dict]:
+    """Turmas na página de listagem: [{'code', 'name', 'url'}] na ordem da página."""
+    from lxml import html as lxml_html
+
+    doc = lxml_html.fromstring(html)
+    seen: Dict[str, dict] = {}
+    for a in doc.iter("a"):
+        href = a.get("href") or ""
+        if not href or href.startswith(("#", "javascript:", "mailto:")) or not _TURMA_HREF_RE.search(href):
+            continue
+        url = urljoin(base_url, href)
+        if url in seen:
+            continue
+        row = next((anc for anc in a.iterancestors() if anc.tag in ("tr", "li")), None)
+        name = _text(row if row is not None else a)
+        q = parse_qs(urlsplit(url).query)
+        m = _CODE_RE.search(name)
+        code = (q.get("turma") or q.get("codigo") or [m.group(1) if m else ""])[0] or name[:40]
+        seen[url] = {"code": code, "name": name, "url": url}
+    return list(seen.values())
+
+
+def parse_diary_link(html: str, base_url: str) -> Optional[str]:
+    """URL do diário a partir da página da turma; a própria página se já for o diário."""
+    from lxml import html as lxml_html
+
+    doc = lxml_html.fromstring(html)
+    if doc.xpath("//textarea"):
+        return base_url
+    for a in doc.iter("a"):
+        href = a.get("href") or ""
+        if href and not href.startswith(("#", "javascript:")) and (
+            _DIARY_TEXT_RE.search(_text(a)) or "diario" in href.lower()
+        ):
+            return urljoin(base_url, href)
+    return None
+
+
+def _read_cache(path: Path = TURMAS_CACHE_FILE) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(data: dict, path: Path = TURMAS_CACHE_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def cached_turmas(semester: str, max_age: float = 12 * 3600, path: Path = TURMAS_CACHE_FILE) -> Optional[List[dict]]:
+    entry = _read_cache(path).get(semester)
+    if not isinstance(entry, dict):
+        return None
+    if time.time() - float(entry.get("fetched_at", 0)) > max_age:
+        return None
+    return entry.get("turmas") or None
+
+
+def discover_turmas(
+    session: requests.Session,
+    semester: str,
+    logger: Optional[Callable[[str], None]] = None,
+    *,
+    listing_url: str = TURMAS_URL,
+    pacer: Optional[AimdPacer] = None,
+    max_workers: int = 8,
+    timeout: float = 15.0,
+    refresh: bool = False,
+    max_age: float = 12 * 3600,
+    cache_path: Path = TURMAS_CACHE_FILE,
+    page_cache: Optional[PageCache] = None,
+) -> List[dict]:
+    """Turmas do semestre com a URL do diário: [{'code', 'name', 'url', 'diary_url'}].
+
+    Usa o cache (out_portal/turmas_cache.json) se for recente, salvo `refresh=True`.
+    As páginas das turmas são buscadas em paralelo (`pacer.concurrency` se houver,
+    senão `max_workers`); sessão expirada (redirecionamento para login) levanta PermissionError.
+    Páginas passam pelo GET condicional do PageCache: turma inalterada custa um 304.
+    """
+    log = logger or (lambda _m: None)
+    if not refresh:
+        cached = cached_turmas(semester, max_age, cache_path)
+        if cached:
+            log(f"[turmas] {len(cached)} turmas de {semester} do cache.")
+            return cached
+
+    cache = page_cache or default_cache()
+    hits0 = cache.stats["hits"]
+
+    def _get(url: str):
+        t0 = time.perf_counter()
+        try:
+            page = cache.get(session, url, timeout=timeout)
+        except requests.RequestException:
+            if pacer: pacer.observe("http", time.perf_counter() - t0, ok=False)
+            raise
+        if pacer: pacer.observe("http", time.perf_counter() - t0, ok=page.status < 400)
+        if _LOGIN_RE.search(urlsplit(page.url).path) and not _LOGIN_RE.search(urlsplit(url).path):
+            raise PermissionError("Sessão expirada: o portal redirecionou para o login.")
+        if page.status >= 400:
+            raise requests.HTTPError(f"HTTP {page.status} em {url}")
+        return page
+
+    t_start = time.perf_counter()
+    url = listing_url
+    if semester:
+        url += ("&" if "?" in url else "?") + urlencode({"semestre": semester})
+    try:
+        listing = _get(url)
+        turmas = [dict(t) for t in cache.parsed(listing, lambda html: parse_turma_listing(html, listing.url), "turmas")]
+        log(f"[turmas] Listagem: {len(turmas)} turmas; resolvendo diários...")
+
+        workers = max(1, min(pacer.concurrency if pacer else max_workers, len(turmas) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_get, t["url"]): t for t in turmas}
+            for fut in as_completed(futures):
+                t = futures[fut]
+                try:
+                    page = fut.result()
+                    t["diary_url"] = cache.parsed(page, lambda html, u=page.url: parse_diary_link(html, u), "diary_link")
+                except PermissionError:
+                    raise
+                except Exception as e:
+                    t["diary_url"] = None
+                    t["error"] = str(e)
+    finally:
+        cache.flush()  # uma gravação do índice por descoberta, não por página
+
+    found = [t for t in turmas if t.get("diary_url")]
+    log(f"[turmas] {len(found)}/{len(turmas)} diários localizados em "
+        f"{time.perf_counter() - t_start:.2f}s ({workers} conexões; {cache.stats['hits'] - hits0} páginas inalteradas).")
+    data = _read_cache(cache_path)
+    data[semester] = {"fetched_at": time.time(),
+                      "fetched": datetime.datetime.now().isoformat(timespec="seconds"),
+                      "listing_url": listing_url, "turmas": turmas}
+    try:
+        _write_cache(data, cache_path)
+    except OSError:
+        pass
+    return turmas
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import json, os
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.utils import OUT_DIR
+
+# Cache persistente da resolução de drivers: evita consultar Selenium Manager /
+# webdriver_manager (rede) a cada início do navegador.
+DRIVER_CACHE_FILE = OUT_DIR / "driver_cache.json"
+
+
+# Locais usuais dos executáveis (usados quando o Selenium não informa o binário)
+BROWSER_BINARIES = {
+    "edge": [
+        r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+        r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+        "/usr/bin/microsoft-edge",
+        "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+    ],
+    "chrome": [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        "/usr/bin/google-chrome",
+        "/usr/bin/chromium",
+        "/usr/bin/chromium-browser",
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    ],
+    "firefox": [
+        r"C:\Program Files\Mozilla Firefox\firefox.exe",
+        r"C:\Program Files (x86)\Mozilla Firefox\firefox.exe",
+        "/usr/bin/firefox",
+        "/Applications/Firefox.app/Contents/MacOS/firefox",
+    ],
+}
+
+
+def find_browser_binary(browser: str) -> Optional[str]:
+    for cand in BROWSER_BINARIES.get(browser, []):
+        if os.path.isfile(cand):
+            return cand
+    return None
+
+
+def binary_signature(path: Optional[str]) -> Optional[dict]:
+    """Assinatura barata (caminho, tamanho, mtime) de um binário; None se não existir."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_cache(path: Path = DRIVER_CACHE_FILE) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(data: dict, path: Path = DRIVER_CACHE_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_cached_driver(
+    browser: str,
+    logger: Optional[Callable[[str], None]] = None,
+    path: Path = DRIVER_CACHE_FILE,
+) -> Optional[dict]:
+    """Retorna a entrada em cache para `browser` se ainda for válida.
+
+    A entrada é descartada quando o driver sumiu do disco ou quando o binário do
+    navegador mudou (atualização altera tamanho/mtime do executável). Como o binário
+    nem sempre é localizado, a versão também é conferida depois do início
+    (check_browser_version).
+    """
+    entry = _read_cache(path).get(browser)
+    if not isinstance(entry, dict):
+        return None
+
+    driver_path = entry.get("driver_path")
+    if not driver_path or not Path(driver_path).is_file():
+        if logger: logger(f"[drivers] Cache de driver inválido para {browser!r}: driver ausente.")
+        invalidate_driver(browser, path)
+        return None
+
+    cached_sig = entry.get("browser_signature")
+    if cached_sig:
+        current = binary_signature(cached_sig.get("path"))
+        if current != cached_sig:
+            if logger: logger(f"[drivers] Navegador {browser!r} mudou desde o cache; revalidando driver.")
+            invalidate_driver(browser, path)
+            return None
+    return entry
+
+
+def store_driver(
+    browser: str,
+    *,
+    driver_path: str,
+    browser_path: Optional[str],
+    browser_version: Optional[str],
+    strategy: str,
+    path: Path = DRIVER_CACHE_FILE,
+) -> None:
+    """Grava (ou substitui) a resolução que funcionou para `browser`."""
+    data = _read_cache(path)
+    data[browser] = {
+        "driver_path": str(driver_path),
+        "browser_path": browser_path or None,
+        "browser_version": browser_version or None,
+        "browser_signature": binary_signature(browser_path),
+        "strategy": strategy,
+    }
+    try:
+        _write_cache(data, path)
+    except OSError:
+        pass  # cache é só otimização; nunca deve impedir o navegador de abrir
+
+
+def check_browser_version(
+    browser: str,
+    running_version: Optional[str],
+    logger: Optional[Callable[[str], None]] = None,
+    path: Path = DRIVER_CACHE_FILE,
+) -> bool:
+    """Compara a versão do navegador em execução com a do cache; descarta a entrada se diferir.
+
+    Entrada sem versão registrada (ou navegador que não informa a versão) é aceita, e a
+    versão conhecida passa a ser gravada. Retorna False quando a entrada foi descartada.
+    """
+    data = _read_cache(path)
+    entry = data.get(browser)
+    if not isinstance(entry, dict) or not running_version:
+        return True
+    cached = entry.get("browser_version")
+    if cached and cached != running_version:
+        if logger: logger(f"[drivers] {browser!r} atualizado ({cached} → {running_version}); "
+                          "o driver será resolvido de novo no próximo início.")
+        invalidate_driver(browser, path)
+        return False
+    if not cached:
+        entry["browser_version"] = running_version
+        try:
+            _write_cache(data, path)
+        except OSError:
+            pass
+    return True
+
+
+def invalidate_driver(browser: str, path: Path = DRIVER_CACHE_FILE) -> None:
+    data = _read_cache(path)
+    if data.pop(browser, None) is not None:
+        try:
+            _write_cache(data, path)
+        except OSError:
+            pass
@@ -3,27 +3,223 @@ from __future__ import annotations
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.edge.service import Service as EdgeService
-from typing import Callable, Optional
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from selenium.webdriver.firefox.service import Service as FirefoxService
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import shutil
 
-def create_driver(browser: str = "edge", logger: Optional[Callable[[str], None]] = None):
+from services.driver_cache import (
+    load_cached_driver, store_driver, invalidate_driver, find_browser_binary, check_browser_version,
+)
+from services.utils import OUT_DIR
+
+HEADLESS_SUFFIX = "-headless"
+
+
+def _edge_manager():
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    return EdgeChromiumDriverManager().install()
+
+def _chrome_manager():
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+def _firefox_manager():
+    from webdriver_manager.firefox import GeckoDriverManager
+    return GeckoDriverManager().install()
+
+# nome -> (classe WebDriver, classe Options, classe Service, instalador webdriver_manager, rótulo)
+BROWSER_SPECS = {
+    "edge": (webdriver.Edge, EdgeOptions, EdgeService, _edge_manager, "Edge"),
+    "chrome": (webdriver.Chrome, ChromeOptions, ChromeService, _chrome_manager, "Chrome"),
+    "firefox": (webdriver.Firefox, FirefoxOptions, FirefoxService, _firefox_manager, "Firefox"),
+}
+
+
+# Perfil "lean": carrega só o necessário para o diário (pageLoadStrategy=eager,
+# sem imagens/fontes/analytics, perfil de usuário reaproveitado e enxuto).
+# (pasta própria: out_portal/profiles/ é do modo perfil, services.profiling)
+LEAN_PROFILE_DIR = OUT_DIR / "browser_profiles"
+_LEGACY_PROFILE_DIR = OUT_DIR / "profiles"  # local antigo; movido na primeira abertura
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*connect.facebook.net*", "*clarity.ms*",
+]
+# subpastas descartáveis do perfil (cookies/login ficam preservados)
+_PROFILE_TRIM = ("Cache", "Code Cache", "GPUCache", "Service Worker", "GrShaderCache", "ShaderCache", "cache2")
+
+
+def lean_profile_dir(browser: str) -> Path:
+    """Pasta de perfil reaproveitável do modo lean, limpa de caches volumosos."""
+    path = LEAN_PROFILE_DIR / f"{browser}-lean"
+    legacy = _LEGACY_PROFILE_DIR / path.name
+    if legacy.is_dir() and not path.exists():
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(legacy), str(path))  # preserva o login salvo
+        except OSError:
+            pass
+    path.mkdir(parents=True, exist_ok=True)
+    for base in (path, path / "Default"):
+        for name in _PROFILE_TRIM:
+            shutil.rmtree(base / name, ignore_errors=True)
+    return path.resolve()
+
+
+def parse_browser(browser: str) -> Tuple[str, bool]:
+    """'chrome-headless' -> ('chrome', True). Desconhecidos caem para ('edge', ...)."""
+    name = (browser or "edge").strip().lower()
+    headless = name.endswith(HEADLESS_SUFFIX)
+    if headless:
+        name = name[: -len(HEADLESS_SUFFIX)]
+    return name, headless
+
+
+def build_options(browser: str, headless: bool = False, profile: str = "default", background: bool = False):
+    """Options padrão do app para o navegador (visível e destacado, ou headless).
+
+    background=True abre a janela fora da tela (sessão pré-aquecida; ver show_window).
+    """
+    _, options_cls, _, _, _ = BROWSER_SPECS[browser]
+    options = options_cls()
+    lean = profile == "lean"
+    if lean:
+        options.page_load_strategy = "eager"  # não espera imagens/iframes/async do load
+
+    if browser == "firefox":
+        if headless:
+            options.add_argument("-headless")
+        if lean:
+            options.add_argument("-profile")
+            options.add_argument(str(lean_profile_dir(browser)))
+            options.set_preference("permissions.default.image", 2)
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+        return options
+
+    if lean:
+        options.add_argument(f"--user-data-dir={lean_profile_dir(browser)}")
+        for arg in ("--no-first-run", "--no-default-browser-check", "--disable-extensions",
+                    "--disable-sync", "--disable-background-networking", "--disable-component-update"):
+            options.add_argument(arg)
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1366,900")
+    else:
+        if background:
+            options.add_argument("--window-position=-32000,-32000")
+        else:
+            options.add_argument("--start-maximized")
+        options.add_experimental_option("detach", True)  # mantém janela aberta
+    return options
+
+
+def show_window(driver) -> None:
+    """Traz para a tela a janela de uma sessão aberta em segundo plano."""
+    try:
+        driver.set_window_position(0, 0)
+        driver.maximize_window()
+    except Exception:
+        pass
+
+
+def enable_resource_blocking(driver, logger: Optional[Callable[[str], None]] = None,
+                             patterns: Optional[list[str]] = None) -> bool:
+    """Bloqueia imagens, fontes e scripts de terceiros via CDP (Edge/Chrome)."""
+    if not hasattr(driver, "execute_cdp_cmd"):
+        if logger: logger("[drivers] Bloqueio de recursos via CDP indisponível neste navegador.")
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns or LEAN_BLOCKED_URLS)})
+        if logger: logger("[drivers] Perfil lean: bloqueio de imagens/fontes/analytics ativo.")
+        return True
+    except Exception as e:
+        if logger: logger(f"[drivers] Falha ao ativar bloqueio de recursos: {e}")
+        return False
+
+
+def _remember(browser: str, driver, options, strategy: str) -> None:
+    """Registra no cache o driver/navegador que acabaram de funcionar."""
+    try:
+        caps = driver.capabilities or {}
+        store_driver(
+            browser,
+            driver_path=driver.service.path,
+            browser_path=getattr(options, "binary_location", "") or find_browser_binary(browser),
+            browser_version=caps.get("browserVersion"),
+            strategy=strategy,
+        )
+    except Exception:
+        pass
+
+
+def create_driver(browser: str = "edge", logger: Optional[Callable[[str], None]] = None,
+                  profile: str = "default", background: bool = False):
     """
-    Inicia o Edge de forma visível priorizando Selenium Manager (Selenium 4.6+).
-    Fallback: webdriver_manager (online).
+    Inicia Edge, Chrome ou Firefox (visível, ou headless com sufixo '-headless',
+    ex.: 'chrome-headless'). profile='lean' usa o perfil enxuto (ver build_options);
+    background=True abre sem roubar a tela (fora da tela/minimizado, ver show_window).
+    0) driver em cache (out_portal/driver_cache.json), se o navegador não mudou (binário
+       e, depois do início, versão; versão diferente descarta a entrada);
+    1) Selenium Manager (Selenium 4.6+);
+    2) Fallback: webdriver_manager (online).
     """
-    if browser.lower() != "edge" and logger:
-        logger(f"[drivers] Browser {browser!r} não suportado; usando 'edge'.")
+    name, headless = parse_browser(browser)
+    if name not in BROWSER_SPECS:
+        if logger: logger(f"[drivers] Browser {browser!r} não suportado; usando 'edge'.")
+        name = "edge"
+    driver_cls, _, service_cls, manager, label = BROWSER_SPECS[name]
+    if headless:
+        label += " (headless)"
+    if profile == "lean":
+        label += " [lean]"
 
-    options = EdgeOptions()
-    options.add_argument("--start-maximized")
-    options.add_experimental_option("detach", True)  # mantém janela aberta
+    def _ready(driver):
+        if background and not headless and name == "firefox":
+            try:
+                driver.minimize_window()  # Firefox não aceita posição inicial por argumento
+            except Exception:
+                pass
+        if profile == "lean":
+            enable_resource_blocking(driver, logger)
+        return driver
+
+    # 0) Cache: vai direto ao driver já resolvido (sem rede)
+    cached = load_cached_driver(name, logger)
+    if cached:
+        try:
+            if logger: logger(f"[drivers] Usando driver em cache ({cached.get('strategy')}): {cached['driver_path']}")
+            options = build_options(name, headless, profile, background)
+            if cached.get("browser_path"):
+                options.binary_location = cached["browser_path"]
+            service = service_cls(executable_path=cached["driver_path"])
+            driver = driver_cls(service=service, options=options)
+            if logger: logger(f"[drivers] {label} iniciado via cache de driver.")
+            # binário nem sempre localizável (assinatura None): a versão em execução decide
+            check_browser_version(name, (driver.capabilities or {}).get("browserVersion"), logger)
+            return _ready(driver)
+        except Exception as e0:
+            if logger:
+                logger(f"[drivers] Driver em cache falhou: {type(e0).__name__}: {e0}")
+            invalidate_driver(name)
 
     # 1) Primeiro tenta Selenium Manager (não depende do repositório do webdriver_manager)
     try:
         if logger: logger("[drivers] Tentando Selenium Manager (padrão do Selenium)...")
-        service = EdgeService()  # sem path → Selenium resolve o driver
-        driver = webdriver.Edge(service=service, options=options)
-        if logger: logger("[drivers] Edge iniciado via Selenium Manager.")
-        return driver
+        options = build_options(name, headless, profile, background)
+        service = service_cls()  # sem path → Selenium resolve o driver
+        driver = driver_cls(service=service, options=options)
+        if logger: logger(f"[drivers] {label} iniciado via Selenium Manager.")
+        _remember(name, driver, options, "selenium-manager")
+        return _ready(driver)
     except Exception as e1:
         if logger:
             logger(f"[drivers] Selenium Manager falhou: {type(e1).__name__}: {e1}")
@@ -31,11 +227,15 @@ def create_driver(browser: str = "edge", logger: Optional[Callable[[str], None]]
     # 2) Fallback: webdriver_manager (online)
     try:
         if logger: logger("[drivers] Tentando webdriver_manager (baixa driver online)...")
-        from webdriver_manager.microsoft import EdgeChromiumDriverManager
-        service = EdgeService(EdgeChromiumDriverManager().install())
-        driver = webdriver.Edge(service=service, options=options)
-        if logger: logger("[drivers] Edge iniciado via webdriver_manager.")
-        return driver
+        options = build_options(name, headless, profile, background)
+        binary = find_browser_binary(name)
+        if binary:
+            options.binary_location = binary
+        service = service_cls(manager())
+        driver = driver_cls(service=service, options=options)
+        if logger: logger(f"[drivers] {label} iniciado via webdriver_manager.")
+        _remember(name, driver, options, "webdriver-manager")
+        return _ready(driver)
     except Exception as e2:
         if logger:
             logger(f"[drivers] webdriver_manager falhou: {type(e2).__name__}: {e2}")
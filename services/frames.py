@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Callable, Iterable, List, Optional
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.readiness import expected_dates, date_variants
+
+# Pontua o documento atual: quantas datas esperadas aparecem e se há textareas.
+PROBE_DIARY_JS = r"""
+const dates = arguments[0] || [];
+const body = document.body;
+if (!body) return 0;
+const tas = document.querySelectorAll('textarea').length;
+if (!tas) return 0;
+const text = (body.textContent || '').replace(/\s+/g, ' ');
+let hits = 0;
+for (const d of dates) { if ([].concat(d).some(a => text.includes(a))) hits++; }
+return hits ? hits * 1000 + Math.min(tas, 999) : 0;
+"""
+
+FRAME_SELECTOR = "iframe, frame"
+
+# URL da página (top-level) -> caminho de índices de frames até o diário ([] = documento principal)
+_FRAME_PATHS: dict[str, List[int]] = {}
+
+
+def enter_frame_path(driver: WebDriver, path: Iterable[int]) -> None:
+    """Troca o contexto para o frame indicado por `path` (a partir do topo)."""
+    driver.switch_to.default_content()
+    for idx in path:
+        frames = driver.find_elements(By.CSS_SELECTOR, FRAME_SELECTOR)
+        driver.switch_to.frame(frames[idx])
+
+
+def _probe_dates(keys: Iterable[str]) -> List[List[str]]:
+    """Datas esperadas com as variantes aceitas (AAAA/AA), no formato do PROBE_DIARY_JS."""
+    return [date_variants(d) for d in expected_dates(keys)]
+
+
+def discover_diary_frame(driver: WebDriver, keys: Iterable[str], max_depth: int = 3) -> Optional[List[int]]:
+    """Percorre documento e frames uma única vez e devolve o caminho do mais provável.
+
+    None quando nenhum documento tem textareas com as datas esperadas.
+    """
+    dates = _probe_dates(keys)
+    best: list = [0, None]
+
+    def _walk(path: List[int]) -> None:
+        try:
+            score = driver.execute_script(PROBE_DIARY_JS, dates) or 0
+        except Exception:
+            score = 0
+        if score > best[0]:
+            best[0], best[1] = score, list(path)
+        if len(path) >= max_depth:
+            return
+        try:
+            count = len(driver.find_elements(By.CSS_SELECTOR, FRAME_SELECTOR))
+        except Exception:
+            return
+        for i in range(count):
+            try:
+                frames = driver.find_elements(By.CSS_SELECTOR, FRAME_SELECTOR)
+                driver.switch_to.frame(frames[i])
+            except Exception:
+                continue
+            try:
+                _walk(path + [i])
+            finally:
+                driver.switch_to.parent_frame()
+
+    driver.switch_to.default_content()
+    _walk([])
+    driver.switch_to.default_content()
+    return best[1]
+
+
+def diary_frame_path(
+    driver: WebDriver,
+    keys: Iterable[str],
+    logger: Optional[Callable[[str], None]] = None,
+    *,
+    refresh: bool = False,
+) -> Optional[List[int]]:
+    """Caminho do frame do diário, usando o cache por URL quando ainda for válido."""
+    keys = list(keys)
+    try:
+        url = driver.current_url
+    except Exception:
+        url = ""
+
+    cached = None if refresh else _FRAME_PATHS.get(url)
+    if cached is not None:
+        try:
+            enter_frame_path(driver, cached)
+            if driver.execute_script(PROBE_DIARY_JS, _probe_dates(keys)):
+                driver.switch_to.default_content()
+                return list(cached)
+        except Exception:
+            pass
+        driver.switch_to.default_content()
+        _FRAME_PATHS.pop(url, None)
+
+    path = discover_diary_frame(driver, keys)
+    if path is not None:
+        _FRAME_PATHS[url] = path
+        if logger and path:
+            logger(f"   diário localizado dentro de frame {path}.")
+    return path
+
+
+def diary_document_url(
+    driver: WebDriver,
+    keys: Iterable[str],
+    logger: Optional[Callable[[str], None]] = None,
+) -> str:
+    """URL do documento que contém o diário (a do frame, se ele estiver num iframe)."""
+    path = diary_frame_path(driver, keys, logger) or []
+    if not path:
+        return driver.current_url
+    try:
+        enter_frame_path(driver, path)
+        href = driver.execute_script("return document.location.href;")
+    except Exception:
+        href = None
+    finally:
+        driver.switch_to.default_content()
+    return href or driver.current_url
+
+
+def enter_cached_frame(driver: WebDriver) -> List[int]:
+    """Entra no frame do diário já descoberto para a URL atual (ou fica no topo)."""
+    try:
+        path = _FRAME_PATHS.get(driver.current_url) or []
+        enter_frame_path(driver, path)
+        return list(path)
+    except Exception:
+        driver.switch_to.default_content()
+        return []
+
+
+def forget_frame_paths() -> None:
+    _FRAME_PATHS.clear()
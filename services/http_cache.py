@@ -0,0 +1,203 @@
+from __future__ import annotations
+import atexit, gzip, hashlib, json, os, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from services.utils import OUT_DIR
+
+# Cache HTTP das páginas do portal com GET condicional: guarda corpo (gzip) e
+# validadores (ETag/Last-Modified) em disco; na próxima visita envia
+# If-None-Match/If-Modified-Since e, com 304, reaproveita corpo e parse já feitos.
+HTTP_CACHE_DIR = OUT_DIR / "http_cache"
+
+
+class CachedPage:
+    __slots__ = ("url", "status", "text", "from_cache", "validator")
+
+    def __init__(self, url: str, status: int, text: str, from_cache: bool, validator: Optional[str]):
+        self.url = url                # URL final (após redirecionamentos)
+        self.status = status          # status efetivo (200 também quando veio de um 304)
+        self.text = text
+        self.from_cache = from_cache  # True = servidor respondeu 304
+        self.validator = validator    # ETag ou Last-Modified da versão em uso
+
+
+class PageCache:
+    """Cache condicional em disco com despejo LRU por tamanho total (bytes comprimidos).
+
+    `stats`: hits (304), misses (200), stored, evicted, bytes_saved (corpo não transferido).
+    `parsed(page, parser)` memoriza em RAM o resultado do parse por (URL, validador).
+    O índice só vai para o disco em `flush()`/`close()` (ao fim de cada lote de páginas),
+    não a cada GET; falha de gravação (disco cheio, arquivo travado) não derruba o GET.
+    """
+
+    def __init__(self, path: Path = HTTP_CACHE_DIR, max_bytes: int = 50 * 1024 * 1024, max_parsed: int = 256):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._index_file = self.path / "index.json"
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, dict]" = OrderedDict()  # ordem = uso (mais antigo primeiro)
+        self._parsed: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._max_parsed = max_parsed
+        self._dirty = False  # índice em memória diferente do gravado
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "bytes_saved": 0}
+        try:
+            data = json.loads(self._index_file.read_text(encoding="utf-8"))
+            for url, entry in sorted(data.items(), key=lambda kv: kv[1].get("last_used", 0)):
+                self._index[url] = entry
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    # ---------- disco ----------
+    def _body_file(self, url: str) -> Path:
+        return self.path / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html.gz")
+
+    def _save_index(self) -> None:
+        tmp = self._index_file.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self._index, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._index_file)
+
+    def _read_body(self, url: str, entry: dict) -> Optional[str]:
+        try:
+            return gzip.decompress(self._body_file(url).read_bytes()).decode(entry.get("encoding") or "utf-8")
+        except (OSError, EOFError, LookupError, UnicodeDecodeError):
+            return None
+
+    def _store(self, url: str, resp: requests.Response, validator_headers: Dict[str, str]) -> None:
+        body = resp.content
+        blob = gzip.compress(body, compresslevel=6)
+        self._body_file(url).write_bytes(blob)
+        self._index.pop(url, None)
+        self._index[url] = {
+            **validator_headers,
+            "final_url": resp.url,
+            "encoding": resp.encoding or "utf-8",
+            "size": len(blob),
+            "raw_size": len(body),
+            "last_used": time.time(),
+        }
+        self.stats["stored"] += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        total = sum(e.get("size", 0) for e in self._index.values())
+        while total > self.max_bytes and len(self._index) > 1:
+            url, entry = self._index.popitem(last=False)
+            total -= entry.get("size", 0)
+            try:
+                self._body_file(url).unlink()
+            except OSError:
+                pass
+            self.stats["evicted"] += 1
+
+    def _touch(self, url: str) -> None:
+        entry = self._index.pop(url)
+        entry["last_used"] = time.time()
+        self._index[url] = entry
+
+    # ---------- API ----------
+    def get(self, session: requests.Session, url: str, *, timeout: float = 15.0, **kw) -> CachedPage:
+        """GET condicional. Com 304 devolve o corpo guardado (from_cache=True)."""
+        with self._lock:
+            entry = dict(self._index.get(url) or {})
+        headers = dict(kw.pop("headers", None) or {})
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        resp = session.get(url, headers=headers, timeout=timeout, **kw)
+
+        if resp.status_code == 304 and entry:
+            with self._lock:
+                text = self._read_body(url, entry)
+                if text is not None:
+                    self._touch(url)
+                    self.stats["hits"] += 1
+                    self.stats["bytes_saved"] += entry.get("raw_size", 0)
+                    self._dirty = True
+            if text is not None:
+                return CachedPage(entry.get("final_url") or url, 200, text, True,
+                                  entry.get("etag") or entry.get("last_modified"))
+            # corpo sumiu do disco: refaz sem condicional
+            resp = session.get(url, timeout=timeout, **kw)
+
+        validators = {}
+        if resp.headers.get("ETag"):
+            validators["etag"] = resp.headers["ETag"]
+        if resp.headers.get("Last-Modified"):
+            validators["last_modified"] = resp.headers["Last-Modified"]
+        with self._lock:
+            self.stats["misses"] += 1
+            if resp.status_code == 200 and validators:
+                try:
+                    self._store(url, resp, validators)
+                    self._dirty = True
+                except OSError:
+                    pass
+            elif url in self._index:
+                self._index.pop(url, None)
+                self._dirty = True
+        return CachedPage(resp.url, resp.status_code, resp.text, False,
+                          validators.get("etag") or validators.get("last_modified"))
+
+    def parsed(self, page: CachedPage, parser: Callable[[str], Any], name: Optional[str] = None) -> Any:
+        """parser(page.text), reaproveitado enquanto a página não mudar (mesmo validador).
+
+        `name` identifica o parser na memória (necessário para lambdas, recriadas a cada chamada).
+        """
+        if not page.validator:
+            return parser(page.text)
+        key = (page.url, page.validator, name or getattr(parser, "__qualname__", id(parser)))
+        with self._lock:
+            if key in self._parsed:
+                self._parsed.move_to_end(key)
+                return self._parsed[key]
+        result = parser(page.text)
+        with self._lock:
+            self._parsed[key] = result
+            while len(self._parsed) > self._max_parsed:
+                self._parsed.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            for url in list(self._index):
+                try:
+                    self._body_file(url).unlink()
+                except OSError:
+                    pass
+            self._index.clear()
+            self._parsed.clear()
+            self._dirty = True
+        self.flush()
+
+    def flush(self) -> bool:
+        """Grava o índice se mudou; False se a gravação falhou (fica pendente para a próxima)."""
+        with self._lock:
+            if not self._dirty:
+                return True
+            try:
+                self._save_index()
+            except OSError:
+                return False
+            self._dirty = False
+            return True
+
+    def close(self) -> None:
+        self.flush()
+
+
+_default: Optional[PageCache] = None
+
+
+def default_cache() -> PageCache:
+    """Cache compartilhado do processo (out_portal/http_cache)."""
+    global _default
+    if _default is None:
+        _default = PageCache()
+        atexit.register(_default.close)
+    return _default
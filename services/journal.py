@@ -0,0 +1,267 @@
+from __future__ import annotations
+import datetime, json, os, re, threading, time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from services.utils import OUT_DIR, validate_value_map
+
+# Salvamento automático em diário de operações (append-only, JSON Lines):
+#
+#   {"ds": "Turma 1", "base": "C:/.../dados.json"}          dataset = conteúdo deste arquivo
+#   {"ds": "Turma 1", "base": ".../autosave/Turma_1.json", "src": "C:/.../dados.json", "t": ...}
+#   {"ds": "Turma 1", "op": "Editar", "t": ..., "c": {k: texto | null}}
+#
+# Cada inserção/edição/remoção/ajuste acrescenta uma linha só com as entradas
+# alteradas (custo proporcional à mudança). De tempos em tempos o diário é compactado:
+# cada dataset alterado é regravado por inteiro em out_portal/autosave/<turma>.json
+# (temporário + rename) e o diário recomeça só com as linhas "base". O arquivo do
+# usuário (dados.json carregado) só é gravado por "Salvar JSON": uma linha base com
+# "src" marca um checkpoint com alterações ainda não salvas nele.
+JOURNAL_FILE = OUT_DIR / "autosave.journal"
+AUTOSAVE_DIR = OUT_DIR / "autosave"
+
+
+def _dump(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_json_atomic(path: str, value_map: Dict[str, str]) -> None:
+    """Grava o JSON canônico (indent=2, como "Salvar JSON") sem deixar arquivo pela metade."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value_map, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_base(path: Optional[str]) -> Dict[str, str]:
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    norm, _errors = validate_value_map(raw) if isinstance(raw, dict) else ({}, {})
+    return norm
+
+
+class Journal:
+    """Diário de alterações por dataset com compactação periódica nos arquivos base.
+
+    `snapshot(ds)` (fornecido pelo app) devolve o conteúdo atual do dataset; é usado
+    para o checkpoint inicial de um dataset sem base e na compactação.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[str], Dict[str, str]],
+        path: Path = JOURNAL_FILE,
+        *,
+        autosave_dir: Path = AUTOSAVE_DIR,
+        compact_every: int = 200,
+        compact_bytes: int = 512 * 1024,
+    ):
+        self.snapshot = snapshot
+        self.path = Path(path)
+        self.autosave_dir = Path(autosave_dir)
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._bases: Dict[str, str] = {}   # dataset -> arquivo base (do usuário ou checkpoint)
+        self._sources: Dict[str, Optional[str]] = {}  # dataset -> arquivo do usuário (None = nenhum)
+        self._dirty: Dict[str, int] = {}   # dataset -> operações desde a última compactação
+        self._fh = None
+        self.stats = {"ops": 0, "bytes": 0, "checkpoints": 0, "compactions": 0}
+
+    # ---------- arquivo ----------
+    def _open(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        return self._fh
+
+    def _write(self, record: dict) -> None:
+        line = _dump(record) + "\n"
+        fh = self._open()
+        fh.write(line)
+        fh.flush()
+        os.fsync(fh.fileno())
+        self.stats["bytes"] += len(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def autosave_path(self, ds: str) -> str:
+        slug = re.sub(r"[^\w.-]+", "_", ds, flags=re.UNICODE).strip("_") or "turma"
+        return str(self.autosave_dir / f"{slug}.json")
+
+    # ---------- registro ----------
+    def _base_record(self, ds: str) -> dict:
+        base = self._bases[ds]
+        src = self._sources.get(ds)
+        if base == src:
+            return {"ds": ds, "base": base}
+        return {"ds": ds, "base": base, "src": src, "t": round(time.time(), 3)}
+
+    def set_base(self, ds: str, path: str) -> None:
+        """O dataset `ds` passa a ser exatamente o conteúdo de `path` (carregado/salvo agora)."""
+        with self._lock:
+            self._bases[ds] = self._sources[ds] = os.path.abspath(path)
+            self._dirty.pop(ds, None)
+            self._write(self._base_record(ds))
+
+    def append(self, ds: str, changes: Dict[str, Optional[str]], label: str) -> None:
+        """Acrescenta uma operação; compacta quando o diário passa dos limites."""
+        if not changes:
+            return
+        with self._lock:
+            if ds not in self._bases:
+                # primeiro registro do dataset: checkpoint completo (já inclui esta operação)
+                path = self.autosave_path(ds)
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(path, self.snapshot(ds))
+                self._bases[ds] = os.path.abspath(path)
+                self._sources.setdefault(ds, None)
+                self._write(self._base_record(ds))
+                self.stats["checkpoints"] += 1
+                return
+            self._write({"ds": ds, "op": label, "t": round(time.time(), 3), "c": changes})
+            self._dirty[ds] = self._dirty.get(ds, 0) + 1
+            self.stats["ops"] += 1
+            due = sum(self._dirty.values()) >= self.compact_every or self._fh.tell() >= self.compact_bytes
+        if due:
+            self.compact()
+
+    def forget(self, ds: Optional[str] = None) -> None:
+        """Esquece um dataset (ou todos); as alterações pendentes dele devem ter sido compactadas."""
+        with self._lock:
+            if ds is None:
+                self._bases.clear()
+                self._sources.clear()
+                self._dirty.clear()
+            else:
+                self._bases.pop(ds, None)
+                self._sources.pop(ds, None)
+                self._dirty.pop(ds, None)
+            self._rewrite()
+
+    # ---------- compactação ----------
+    def _rewrite(self) -> None:
+        """Recomeça o diário só com as linhas base (temporário + rename)."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for ds in self._bases:
+                f.write(_dump(self._base_record(ds)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def compact(self) -> List[str]:
+        """Grava checkpoints dos datasets alterados em autosave/ e zera o diário.
+
+        Nunca toca o arquivo do usuário: ele pode ter entradas que não passaram na
+        validação (e ficaram fora do dataset) ou edições externas.
+        """
+        with self._lock:
+            written = []
+            for ds in list(self._dirty):
+                if ds not in self._bases:
+                    continue
+                path = self.autosave_path(ds)
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(path, self.snapshot(ds))
+                self._bases[ds] = os.path.abspath(path)
+                written.append(path)
+            self._dirty.clear()
+            self._rewrite()
+            self.stats["compactions"] += 1
+            return written
+
+    def pending(self) -> int:
+        return sum(self._dirty.values())
+
+    def unsaved(self) -> Dict[str, Optional[str]]:
+        """{dataset: arquivo do usuário | None} dos datasets com alterações fora do arquivo do usuário."""
+        with self._lock:
+            return {ds: self._sources.get(ds) for ds, base in self._bases.items()
+                    if self._dirty.get(ds) or base != self._sources.get(ds)}
+
+    # ---------- recuperação ----------
+    @staticmethod
+    def read(path: Path = JOURNAL_FILE) -> Dict[str, dict]:
+        """Estado reconstruído de um diário existente:
+        {ds: {'base', 'source', 'ops', 'last', 'value_map'}}.
+
+        Entram datasets com operações após a última base ou cuja base é um checkpoint
+        não salvo no arquivo do usuário (`source`); os demais já estão no arquivo.
+        Linha final truncada (queda no meio da gravação) é ignorada.
+        """
+        bases: Dict[str, Optional[str]] = {}
+        heads: Dict[str, dict] = {}
+        ops: Dict[str, list] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(rec, dict) or "ds" not in rec:
+                        continue
+                    ds = rec["ds"]
+                    if "base" in rec:
+                        bases[ds] = rec["base"]
+                        heads[ds] = rec
+                        ops[ds] = []
+                    elif isinstance(rec.get("c"), dict):
+                        ops.setdefault(ds, []).append(rec)
+        except OSError:
+            return {}
+
+        out: Dict[str, dict] = {}
+        for ds, recs in ops.items():
+            head = heads.get(ds, {})
+            checkpoint = "src" in head
+            if not recs and not checkpoint:
+                continue
+            vm = _read_base(bases.get(ds))
+            for rec in recs:
+                for k, v in rec["c"].items():
+                    if v is None:
+                        vm.pop(k, None)
+                    else:
+                        vm[k] = v
+            t = recs[-1].get("t", 0) if recs else head.get("t", 0)
+            last = datetime.datetime.fromtimestamp(t).isoformat(timespec="seconds")
+            source = head.get("src") if checkpoint else bases.get(ds)
+            out[ds] = {"base": bases.get(ds), "source": source, "ops": len(recs), "last": last, "value_map": vm}
+        return out
+
+    def adopt(self, recovered: Dict[str, dict]) -> None:
+        """Assume as bases do diário recuperado e marca os datasets para a próxima compactação."""
+        with self._lock:
+            for ds, info in recovered.items():
+                self._bases[ds] = info["base"] or os.path.abspath(self.autosave_path(ds))
+                self._sources[ds] = info.get("source")
+                if info["ops"]:
+                    self._dirty[ds] = info["ops"]
+
+    def discard(self) -> None:
+        """Descarta o diário existente (fica uma cópia .bak)."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            try:
+                os.replace(self.path, self.path.with_suffix(self.path.suffix + ".bak"))
+            except OSError:
+                pass
@@ -0,0 +1,139 @@
+from __future__ import annotations
+import hashlib, json, os, threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.utils import OUT_DIR
+
+# Cache persistente de layout: por página (portal + turma), a impressão digital da
+# estrutura do diário e a estratégia de localização que funcionou nela. Lido uma vez
+# por processo; o arquivo só é regravado quando uma entrada muda, mantendo as
+# MAX_LAYOUTS páginas usadas mais recentemente (as demais são descartadas).
+LAYOUT_CACHE_FILE = OUT_DIR / "layout_cache.json"
+MAX_LAYOUTS = 500
+
+_LOADED: Dict[Path, dict] = {}
+_LOCK = threading.Lock()
+
+# Esqueleto do diário: para cada textarea visível, a cadeia de ancestrais (tag + classes,
+# sem números) até 4 níveis. Só as formas distintas contam, então a quantidade de aulas
+# e o texto das linhas não mudam a impressão digital; trocar a tabela por divs muda.
+LAYOUT_SKELETON_JS = r"""
+function sig(el){
+  const cls = Array.from(el.classList || []).map(c => c.replace(/\d+/g, '')).filter(Boolean).sort();
+  return el.tagName.toLowerCase() + (cls.length ? '.' + cls.join('.') : '');
+}
+const shapes = new Set();
+for (const ta of document.querySelectorAll('textarea')){
+  if (!ta.offsetParent) continue;
+  const chain = [];
+  let el = ta;
+  for (let i = 0; i < 5 && el && el !== document.body; i++, el = el.parentElement) chain.push(sig(el));
+  const prev = ta.previousElementSibling;
+  shapes.add(chain.join('<') + (prev ? ' ~' + sig(prev) : ''));
+}
+return Array.from(shapes).sort();
+"""
+
+
+def page_key(url: str) -> str:
+    """Identifica a página da turma: host + caminho + query (sem fragmento)."""
+    parts = urlsplit(url or "")
+    key = f"{parts.netloc}{parts.path}"
+    return f"{key}?{parts.query}" if parts.query else key
+
+
+def layout_fingerprint(driver: WebDriver) -> Optional[str]:
+    """Hash curto do esqueleto do diário no contexto atual; None se não houver textareas."""
+    try:
+        shapes = driver.execute_script(LAYOUT_SKELETON_JS) or []
+    except Exception:
+        return None
+    if not shapes:
+        return None
+    return hashlib.sha1("\n".join(shapes).encode("utf-8")).hexdigest()[:16]
+
+
+def _cache(path: Path) -> dict:
+    """Conteúdo do cache (lido do disco na primeira vez); ordem = uso, mais recente no fim."""
+    data = _LOADED.get(path)
+    if data is None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            data = data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            data = {}
+        _LOADED[path] = data
+    return data
+
+
+def _write_cache(data: dict, path: Path) -> None:
+    while len(data) > MAX_LAYOUTS:
+        data.pop(next(iter(data)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_layout(
+    url: str,
+    fingerprint: Optional[str],
+    logger: Optional[Callable[[str], None]] = None,
+    path: Optional[Path] = LAYOUT_CACHE_FILE,
+) -> Optional[str]:
+    """Estratégia comprovada para a página se a impressão digital ainda bate (path=None: sem cache)."""
+    if not fingerprint or path is None:
+        return None
+    with _LOCK:
+        data = _cache(path)
+        key = page_key(url)
+        entry = data.get(key)
+        if not isinstance(entry, dict):
+            return None
+        data[key] = data.pop(key)  # LRU: vai para o fim (persistido na próxima gravação)
+    if entry.get("fingerprint") != fingerprint:
+        if logger: logger("[layout] Estrutura do diário mudou desde o último uso; redescobrindo.")
+        return None
+    return entry.get("strategy") or None
+
+
+def store_layout(
+    url: str,
+    fingerprint: Optional[str],
+    strategies: Dict[str, int],
+    path: Optional[Path] = LAYOUT_CACHE_FILE,
+) -> Optional[str]:
+    """Registra a estratégia que localizou mais linhas; devolve-a só se a entrada mudou.
+
+    Nada é gravado quando a página já está no cache com a mesma impressão digital e
+    estratégia; path=None desliga o cache.
+    """
+    if not fingerprint or not strategies or path is None:
+        return None
+    best = max(strategies, key=strategies.get)
+    with _LOCK:
+        data = _cache(path)
+        key = page_key(url)
+        old = data.pop(key, None)
+        data[key] = {"fingerprint": fingerprint, "strategy": best, "rows": strategies[best]}
+        if isinstance(old, dict) and old.get("fingerprint") == fingerprint and old.get("strategy") == best:
+            data[key] = old
+            return None
+        try:
+            _write_cache(data, path)
+        except OSError:
+            pass  # cache é só otimização
+    return best
+
+
+def forget_layout(url: str, path: Path = LAYOUT_CACHE_FILE) -> None:
+    with _LOCK:
+        data = _cache(path)
+        if data.pop(page_key(url), None) is not None:
+            try:
+                _write_cache(data, path)
+            except OSError:
+                pass
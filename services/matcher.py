@@ -0,0 +1,140 @@
+from __future__ import annotations
+import datetime, re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from features.date_shift import parse_key_date_suffix, suffix_letter
+from services.scrape import ROW_LABEL_JS
+
+# Todas as linhas candidatas numa única execução: [rótulo, textarea, estratégia] por
+# textarea visível. arguments[0] = estratégia comprovada (services.layout) ou null; com
+# ela, textareas que a estratégia não rotula vêm como ['', textarea, ''] (cache vencido?).
+ROW_INDEX_JS = ROW_LABEL_JS + r"""
+const only = arguments[0] || null;
+const out = [];
+for (const ta of document.querySelectorAll('textarea')){
+  if (!ta.offsetParent) continue;
+  const [label, how] = labelWithHow(ta, only);
+  if (label || only) out.push([label, ta, how]);
+}
+return out;
+"""
+
+# Regras de tolerância (sobrescreva por chamada com rules={...})
+MATCH_RULES: Dict[str, Any] = {
+    "short_year": True,     # '10/06/25' vale como 10/06/2025
+    "unmarked": None,       # linha sem P/T: None ignora; 'P'/'T' assume um; 'any' casa com qualquer sufixo
+    "multi_date": "first",  # linha com várias datas: 'first' | 'all' | 'skip'
+    "ambiguous": "first",   # mais de uma linha para a chave: 'first' livre (ordem da página) | 'skip'
+}
+
+_DATE_TOKEN_RE = re.compile(r"(?<!\d)(\d{1,2})\s*/\s*(\d{1,2})\s*/\s*(\d{4}|\d{2})(?!\d)")
+# marcador de modalidade logo após a data: "-P", "(T)", "- Prática", "P)" ...
+_MARK_RE = re.compile(r"\s*[-–—(]?\s*(pr[aá]tica|te[oó]rica|[pt])(?![a-zà-ÿ])", re.IGNORECASE)
+
+
+def row_tokens(label: str, rules: Dict[str, Any] = MATCH_RULES) -> List[Tuple[datetime.date, Optional[str]]]:
+    """[(data, 'P'|'T'|None)] encontrados no rótulo de uma linha, conforme as regras."""
+    out: List[Tuple[datetime.date, Optional[str]]] = []
+    for m in _DATE_TOKEN_RE.finditer(label or ""):
+        d, mth, y = m.groups()
+        if len(y) == 2:
+            if not rules.get("short_year"):
+                continue
+            y = "20" + y
+        try:
+            dt = datetime.date(int(y), int(mth), int(d))
+        except ValueError:
+            continue
+        mk = _MARK_RE.match(label, m.end())
+        out.append((dt, mk.group(1)[0].upper() if mk else None))
+    if len(out) > 1:
+        mode = rules.get("multi_date", "first")
+        if mode == "skip":
+            return []
+        if mode == "first":
+            return out[:1]
+    return out
+
+
+class RowIndex:
+    """Índice (data, sufixo) -> linhas do portal, montado uma vez a partir de todas as linhas.
+
+    `rows` são [rótulo, handle] ou [rótulo, handle, estratégia] (handle = textarea, valor
+    atual etc.); `strategies` conta quantas linhas cada estratégia localizou. As chaves
+    do value_map são resolvidas por consulta ao índice em vez de busca por substring.
+    Depois de `resolve()`, `ambiguous` traz {chave: [rótulos]} das chaves com mais de uma
+    linha candidata e `shared` {rótulo: [chaves]} das linhas disputadas por mais de uma
+    chave. Cada linha atende uma única chave (a primeira na ordem recebida); as demais
+    ficam sem linha e vão para `blocked` {chave: chave que ficou com a linha}.
+    """
+
+    def __init__(self, rows: Iterable[Any], rules: Optional[Dict[str, Any]] = None):
+        self.rules = {**MATCH_RULES, **(rules or {})}
+        self.rows: List[Tuple[str, Any]] = []
+        self._marked: Dict[Tuple[datetime.date, str], List[int]] = {}
+        self._unmarked: Dict[datetime.date, List[int]] = {}
+        self.ambiguous: Dict[str, List[str]] = {}
+        self.shared: Dict[str, List[str]] = {}
+        self.blocked: Dict[str, str] = {}
+        self.strategies: Dict[str, int] = {}
+        for row in rows:
+            label, handle = row[0], row[1]
+            if len(row) > 2 and row[2]:
+                self.strategies[row[2]] = self.strategies.get(row[2], 0) + 1
+            i = len(self.rows)
+            self.rows.append((label, handle))
+            for dt, mark in row_tokens(label, self.rules):
+                if mark:
+                    self._marked.setdefault((dt, mark), []).append(i)
+                else:
+                    self._unmarked.setdefault(dt, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def candidates(self, key: str) -> List[int]:
+        """Índices das linhas que atendem a chave (marcadas primeiro, depois sem marcador)."""
+        dt, suffix = parse_key_date_suffix(key)
+        if not dt:
+            return []
+        letter = suffix_letter(suffix)
+        found = self._marked.get((dt, letter))
+        if found:
+            return list(found)
+        unmarked = self.rules.get("unmarked")
+        if unmarked == "any" or (unmarked and unmarked.upper() == letter):
+            return list(self._unmarked.get(dt, ()))
+        return []
+
+    def resolve(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """{chave: handle|None}; também preenche `ambiguous`, `shared` e `blocked`."""
+        result: Dict[str, Any] = {}
+        wanted: Dict[int, List[str]] = {}
+        claimed: Dict[int, str] = {}
+        self.ambiguous, self.shared, self.blocked = {}, {}, {}
+        for k in keys:
+            cands = self.candidates(k)
+            if len(cands) > 1:
+                self.ambiguous[k] = [self.rows[i][0] for i in cands]
+                if self.rules.get("ambiguous") == "skip":
+                    result[k] = None
+                    continue
+            if not cands:
+                result[k] = None
+                continue
+            free = [i for i in cands if i not in claimed]
+            for i in (cands if not free else free[:1]):
+                wanted.setdefault(i, []).append(k)
+            if not free:
+                # a linha já foi entregue a outra chave: preencher de novo sobrescreveria o texto dela
+                result[k] = None
+                self.blocked[k] = claimed[cands[0]]
+                continue
+            claimed[free[0]] = k
+            result[k] = self.rows[free[0]][1]
+        self.shared = {self.rows[i][0]: ks for i, ks in wanted.items() if len(ks) > 1}
+        return result
+
+    def report(self) -> dict:
+        return {"rows": len(self.rows), "ambiguous": dict(self.ambiguous), "shared": dict(self.shared),
+                "blocked": dict(self.blocked)}
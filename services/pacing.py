@@ -0,0 +1,142 @@
+from __future__ import annotations
+import threading, time
+from typing import Callable, Dict, List, Optional
+
+
+class AimdPacer:
+    """Ritmo adaptativo (AIMD) para salvar/navegar em várias turmas seguidas.
+
+    Cada operação observada (`observe('save'|'nav'|..., latência, ok)`) alimenta uma
+    média móvel por tipo. Enquanto a latência fica abaixo do alvo e não há erros, o
+    ritmo sobe em passos aditivos (lote +`chunk_step`, concorrência +1 a cada
+    `grow_every` sucessos, pausa −`delay_step`). Um erro/timeout ou latência acima
+    do alvo (na média, ou num pico acima do dobro) corta multiplicativamente (lote e
+    concorrência × `decrease`, pausa × 2), no máximo uma vez por janela: amostras que
+    já estavam em andamento quando o corte aconteceu (K workers voltando lentos juntos)
+    não cortam de novo; o próximo corte exige uma operação iniciada depois do anterior.
+
+    `chunk_size` = entradas preenchidas entre dois salvamentos; `concurrency` =
+    requisições HTTP simultâneas (descoberta/sincronização); `delay` = pausa entre
+    operações. Toda decisão vai para o log e para `report()`; o log é chamado fora do
+    lock interno (use um logger seguro para threads, ex.: que repasse à thread do Tk).
+    """
+
+    def __init__(
+        self,
+        *,
+        target_latency: float = 2.0,
+        chunk: int = 20,
+        min_chunk: int = 5,
+        max_chunk: int = 200,
+        chunk_step: int = 5,
+        concurrency: int = 2,
+        max_concurrency: int = 8,
+        grow_every: int = 3,
+        decrease: float = 0.5,
+        delay_step: float = 0.25,
+        max_delay: float = 10.0,
+        alpha: float = 0.3,
+        logger: Optional[Callable[[str], None]] = None,
+    ):
+        self.target_latency = target_latency
+        self.min_chunk, self.max_chunk, self.chunk_step = min_chunk, max_chunk, chunk_step
+        self.max_concurrency, self.grow_every = max_concurrency, grow_every
+        self.decrease, self.delay_step, self.max_delay = decrease, delay_step, max_delay
+        self.alpha = alpha
+        self.logger = logger
+        self.chunk_size = max(min_chunk, min(chunk, max_chunk))
+        self.concurrency = max(1, min(concurrency, max_concurrency))
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        self._streak = 0
+        self._cut_at: Optional[float] = None  # instante (monotonic) do último corte
+        self._ewma: Dict[str, float] = {}
+        self._stats: Dict[str, dict] = {}
+        self.decisions: List[dict] = []
+
+    def _log(self, msg: str) -> None:
+        if self.logger:
+            self.logger(msg)
+
+    def observe(self, kind: str, latency: float, ok: bool = True) -> None:
+        """Registra uma operação e ajusta o ritmo."""
+        with self._lock:
+            msg = self._observe_locked(kind, latency, ok)
+        if msg:
+            self._log(msg)
+
+    def _observe_locked(self, kind: str, latency: float, ok: bool) -> Optional[str]:
+        now = time.monotonic()
+        st = self._stats.setdefault(kind, {"count": 0, "errors": 0, "held": 0, "total_s": 0.0, "max_s": 0.0})
+        st["count"] += 1
+        st["total_s"] += latency
+        st["max_s"] = max(st["max_s"], latency)
+        if not ok:
+            st["errors"] += 1
+        prev = self._ewma.get(kind)
+        avg = latency if prev is None else self.alpha * latency + (1 - self.alpha) * prev
+        self._ewma[kind] = avg
+
+        # média acima do alvo ou um pico isolado acima do dobro do alvo = sinal de congestionamento
+        if not ok or avg > self.target_latency or latency > 2 * self.target_latency:
+            self._streak = 0
+            if self._cut_at is not None and now - latency < self._cut_at:
+                st["held"] += 1  # em andamento no último corte: mesma janela
+                return None
+            self._cut_at = now
+            worst = max(avg, latency)
+            reason = "erro" if not ok else f"latência {worst:.2f}s > alvo {self.target_latency:.2f}s"
+            return self._decide("reduz", kind, reason,
+                                chunk=max(self.min_chunk, int(self.chunk_size * self.decrease)),
+                                concurrency=max(1, int(self.concurrency * self.decrease)),
+                                delay=min(self.max_delay, max(self.delay * 2, self.delay_step * 2)))
+
+        self._streak += 1
+        grow_conc = self._streak % self.grow_every == 0
+        new_chunk = min(self.max_chunk, self.chunk_size + self.chunk_step)
+        new_conc = min(self.max_concurrency, self.concurrency + 1) if grow_conc else self.concurrency
+        new_delay = max(0.0, self.delay - self.delay_step)
+        if (new_chunk, new_conc, new_delay) != (self.chunk_size, self.concurrency, self.delay):
+            return self._decide("aumenta", kind, f"latência {avg:.2f}s", chunk=new_chunk,
+                                concurrency=new_conc, delay=new_delay)
+        return None
+
+    def _decide(self, action: str, kind: str, reason: str, *, chunk: int, concurrency: int, delay: float) -> str:
+        """Aplica a decisão (com o lock) e devolve a linha de log."""
+        self.chunk_size, self.concurrency, self.delay = chunk, concurrency, round(delay, 3)
+        d = {"t": time.time(), "action": action, "kind": kind, "reason": reason,
+             "chunk": chunk, "concurrency": concurrency, "delay": self.delay}
+        self.decisions.append(d)
+        return (f"[ritmo] {action} ({kind}: {reason}) → lote {chunk}, concorrência {concurrency}, "
+                f"pausa {self.delay:.2f}s")
+
+    def wait(self) -> None:
+        """Pausa atual entre operações (0 quando o portal está folgado)."""
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+    def timed(self, kind: str, fn: Callable[[], object], ok: Callable[[object], bool] = bool):
+        """Executa `fn`, mede e registra (exceção = erro, e é relançada)."""
+        t0 = time.perf_counter()
+        try:
+            res = fn()
+        except Exception:
+            self.observe(kind, time.perf_counter() - t0, ok=False)
+            raise
+        self.observe(kind, time.perf_counter() - t0, ok=ok(res))
+        return res
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = {
+                k: {"count": s["count"], "errors": s["errors"], "held": s["held"],
+                    "avg_ms": round(1000 * s["total_s"] / max(s["count"], 1)),
+                    "max_ms": round(1000 * s["max_s"]),
+                    "ewma_ms": round(1000 * self._ewma.get(k, 0.0))}
+                for k, s in self._stats.items()
+            }
+            return {
+                "final": {"chunk": self.chunk_size, "concurrency": self.concurrency, "delay": self.delay},
+                "stats": stats,
+                "decisions": list(self.decisions),
+            }
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import cProfile, datetime, functools, io, pstats, re, threading, time, tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.utils import OUT_DIR
+
+# Modo de perfil: cada ação da interface (App.on_*) e cada tarefa em segundo plano roda
+# sob cProfile + tracemalloc. Para cada execução ficam em out_portal/profiles/:
+#   <ação>_<data>.prof  (abra com snakeviz / python -m pstats)
+#   <ação>_<data>.txt   (top funções por tempo acumulado e top alocações por linha)
+# e o log recebe um resumo de uma linha: tempo total, 3 funções mais caras, pico de memória.
+PROFILES_DIR = OUT_DIR / "profiles"
+_UNSAFE = re.compile(r"[^\w-]+")
+
+
+def _func_label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtin: "<method 'execute' of ...>"
+        return name.strip("<>").replace("built-in method ", "")
+    return f"{Path(filename).stem}.{name}"
+
+
+class Profiler:
+    """Envolve funções com cProfile + tracemalloc quando `enabled`.
+
+    Execuções aninhadas na mesma thread contam para a de fora; se outro profiler já
+    estiver ativo, a função roda só com o tempo de relógio medido.
+    """
+
+    def __init__(self, logger: Optional[Callable[[str], None]] = None, enabled: bool = False,
+                 out_dir: Path = PROFILES_DIR, top_allocs: int = 15):
+        self.logger = logger
+        self.enabled = enabled
+        self.out_dir = Path(out_dir)
+        self.top_allocs = top_allocs
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tracing = 0  # execuções em andamento que usam tracemalloc
+
+    def _log(self, msg: str) -> None:
+        """Log best-effort: o destino pode já não existir (on_close destrói a janela)."""
+        if self.logger:
+            try:
+                self.logger(msg)
+            except Exception:
+                pass
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or getattr(self._local, "active", False):
+                return fn(*args, **kwargs)
+            return self.run(name, fn, *args, **kwargs)
+        return wrapper
+
+    def _start_trace(self) -> bool:
+        with self._lock:
+            owned = False
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                owned = True
+            if self._tracing == 0:
+                tracemalloc.reset_peak()
+            self._tracing += 1
+            return owned
+
+    def _stop_trace(self, owned: bool):
+        with self._lock:
+            self._tracing -= 1
+            snap = tracemalloc.take_snapshot() if self.top_allocs else None
+            peak = tracemalloc.get_traced_memory()[1]
+            if owned and self._tracing == 0:
+                tracemalloc.stop()
+            return snap, peak
+
+    def run(self, name: str, fn: Callable, *args, **kwargs):
+        prof = cProfile.Profile()
+        self._local.active = True
+        owned = self._start_trace()
+        t0 = time.perf_counter()
+        try:
+            prof.enable()
+        except ValueError:  # outro profiler ativo (ex.: IDE)
+            prof = None
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if prof is not None:
+                prof.disable()
+            wall = time.perf_counter() - t0
+            snap, peak = self._stop_trace(owned)
+            self._local.active = False
+            try:
+                self._report(name, wall, prof, snap, peak)
+            except Exception as e:
+                self._log(f"[perfil] {name}: {wall:.2f}s (relatório falhou: {e})")
+
+    def _report(self, name: str, wall: float, prof: Optional[cProfile.Profile], snap, peak: int) -> None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        base = self.out_dir / f"{_UNSAFE.sub('_', name)}_{stamp}"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        top = "-"
+        buf = io.StringIO()
+        buf.write(f"{name}: {wall:.3f}s de relógio | pico de memória {peak / 1e6:.1f} MB\n\n")
+        if prof is not None:
+            prof.dump_stats(str(base.with_suffix(".prof")))
+            st = pstats.Stats(prof, stream=buf)
+            # tempo próprio (tottime) atribui o custo a quem de fato gastou: Tk, openpyxl, re, WebDriver...
+            ranked = sorted(st.stats.items(), key=lambda kv: kv[1][2], reverse=True)
+            top = ", ".join(f"{_func_label(func)} {row[2]:.2f}s" for func, row in ranked[:3]) or "-"
+            st.sort_stats("cumulative").print_stats(30)
+            st.sort_stats("tottime").print_stats(15)
+        if snap is not None:
+            buf.write("\nTop alocações (por linha):\n")
+            for s in snap.statistics("lineno")[: self.top_allocs]:
+                buf.write(f"  {s}\n")
+        base.with_suffix(".txt").write_text(buf.getvalue(), encoding="utf-8")
+        self._log(f"[perfil] {name}: {wall:.2f}s | {top} | pico {peak / 1e6:.1f} MB → {base.name}.prof")
+
+
+def instrument_actions(obj, profiler: Profiler, prefix: str = "on_") -> int:
+    """Troca os métodos `prefix*` de `obj` por versões perfiladas (atributos da instância).
+
+    Deve rodar antes de a interface capturar os métodos (command=self.on_...).
+    """
+    n = 0
+    for attr in dir(type(obj)):
+        if attr.startswith(prefix) and callable(getattr(type(obj), attr)):
+            setattr(obj, attr, profiler.wrap(attr, getattr(obj, attr)))
+            n += 1
+    return n
@@ -0,0 +1,124 @@
+from __future__ import annotations
+import re
+from typing import Callable, Iterable, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+
+# Espera assíncrona: um MutationObserver reavalia a página a cada mudança no DOM e
+# resolve assim que todas as datas esperadas existem E o DOM ficou quieto por
+# `quiet_ms` (sem re-render em andamento). Se estourar o timeout, devolve o que faltou.
+WAIT_FOR_LABELS_JS = r"""
+const labels  = arguments[0] || [];
+const quietMs = arguments[1] || 300;
+const timeout = arguments[2] || 15000;
+const done    = arguments[arguments.length - 1];
+
+function norm(s){
+  if(!s) return '';
+  return s.toLowerCase()
+          .normalize('NFD').replace(/[\u0300-\u036f]/g,'')
+          .replace(/[–—]/g,'-')
+          .replace(/\s+/g,' ')
+          .trim();
+}
+// cada data pode vir com formas alternativas (ex.: ['10/06/2025', '10/06/25'])
+const wanted = labels.map(l => [].concat(l).map(norm));
+const t0 = performance.now();
+let quietTimer = null, checkQueued = false, finished = false, observer = null, hardTimer = null;
+
+function missing(){
+  const text = norm(document.body ? document.body.textContent : '');
+  return wanted.filter(alts => !alts.some(a => text.includes(a))).map(alts => alts[0]);
+}
+function finish(ok, miss){
+  if (finished) return;
+  finished = true;
+  if (observer) observer.disconnect();
+  clearTimeout(quietTimer); clearTimeout(hardTimer);
+  done({ready: ok, missing: miss, elapsed_ms: Math.round(performance.now() - t0)});
+}
+function check(){
+  checkQueued = false;
+  if (finished || document.readyState === 'loading') return;
+  const miss = missing();
+  clearTimeout(quietTimer);
+  if (miss.length === 0){
+    quietTimer = setTimeout(() => finish(true, []), quietMs);
+  }
+}
+function schedule(){
+  // agrupa rajadas de mutações numa única verificação
+  if (checkQueued) return;
+  checkQueued = true;
+  setTimeout(check, 50);
+}
+
+observer = new MutationObserver(schedule);
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+document.addEventListener('DOMContentLoaded', schedule, {once: true});
+hardTimer = setTimeout(() => { const m = missing(); finish(m.length === 0, m); }, timeout);
+schedule();
+"""
+
+_DATE_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
+
+
+def expected_dates(keys: Iterable[str]) -> list[str]:
+    """Datas distintas (DD/MM/AAAA) das chaves do value_map, na ordem."""
+    seen: dict[str, None] = {}
+    for k in keys:
+        m = _DATE_RE.search(k or "")
+        if m:
+            seen.setdefault(m.group(0), None)
+    return list(seen)
+
+
+def date_variants(date: str) -> list[str]:
+    """Formas aceitas para uma data no portal: 'DD/MM/AAAA' e 'DD/MM/AA'."""
+    return [date, date[:6] + date[8:]] if len(date) == 10 else [date]
+
+
+def wait_for_labels(
+    driver: WebDriver,
+    keys: Iterable[str],
+    timeout: float = 15.0,
+    quiet_ms: int = 300,
+    logger: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """Bloqueia até as datas de `keys` estarem no DOM e a página ficar estável.
+
+    Retorna {'ready': bool, 'missing': [...], 'elapsed_ms': int}.
+    """
+    labels = expected_dates(keys)
+    if not labels:
+        return {"ready": True, "missing": [], "elapsed_ms": 0}
+
+    previous = None
+    try:
+        previous = driver.timeouts.script
+    except Exception:
+        pass
+    try:
+        driver.set_script_timeout(timeout + 5)
+        res = driver.execute_async_script(
+            WAIT_FOR_LABELS_JS, [date_variants(d) for d in labels], quiet_ms, int(timeout * 1000)
+        )
+    except Exception as e:
+        if logger: logger(f"   aviso: espera por prontidão falhou ({type(e).__name__}); seguindo.")
+        return {"ready": False, "missing": labels, "elapsed_ms": int(timeout * 1000)}
+    finally:
+        if previous is not None:
+            try:
+                driver.set_script_timeout(previous)
+            except Exception:
+                pass
+
+    res = res if isinstance(res, dict) else {}
+    res.setdefault("ready", False)
+    res.setdefault("missing", [])
+    res.setdefault("elapsed_ms", 0)
+    if logger:
+        if res["ready"]:
+            logger(f"   página pronta em {res['elapsed_ms']} ms ({len(labels)} datas presentes).")
+        else:
+            logger(f"   aviso: {len(res['missing'])} de {len(labels)} datas não apareceram em {timeout:.0f}s.")
+    return res
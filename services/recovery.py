@@ -0,0 +1,114 @@
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from selenium.common.exceptions import StaleElementReferenceException
+
+# Status por chave produzidos pelo preenchimento
+OK, NOT_FOUND, SKIPPED, ERROR, STALE = "ok", "not_found", "skipped", "error", "stale"
+
+
+def is_stale(exc: BaseException) -> bool:
+    """True se o erro indica que o elemento saiu do DOM (re-render da tabela)."""
+    if isinstance(exc, StaleElementReferenceException):
+        return True
+    msg = str(exc).lower()
+    return "stale element" in msg or "not attached to the page document" in msg
+
+
+class StaleRecovery:
+    """Executa `action(chave, elemento)` para várias chaves tolerando re-renders.
+
+    Todas as chaves são resolvidas num único lote (`resolve(keys) -> {chave: elemento}`).
+    Quando um elemento fica obsoleto, esta e todas as chaves ainda pendentes são
+    re-resolvidas de uma vez contra o DOM novo. Só rodadas que não concluíram nenhuma
+    chave contam para `max_retries` (e esperam com backoff); uma página que redesenha a
+    cada alteração avança uma chave por rodada sem esgotar as tentativas.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[List[str]], Dict[str, Any]],
+        *,
+        max_retries: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        before_retry: Optional[Callable[[], None]] = None,
+        logger: Optional[Callable[[str], None]] = None,
+    ):
+        self.resolve = resolve
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.before_retry = before_retry
+        self.logger = logger
+        self.retried = 0      # chaves re-resolvidas (soma de todas as tentativas)
+        self.rounds = 0       # rodadas de recuperação
+        self.failures = 0     # rodadas seguidas sem nenhuma chave concluída
+
+    def _log(self, msg: str) -> None:
+        if self.logger:
+            self.logger(msg)
+
+    def run(self, keys: Iterable[str], action: Callable[[str, Any], str]) -> Dict[str, str]:
+        """Retorna {chave: status}; `action` devolve OK/SKIPPED e pode levantar stale."""
+        statuses: Dict[str, str] = {}
+        pending = list(keys)
+        handles = self._resolve(pending) if pending else {}
+
+        while pending:
+            done_before = len(statuses)
+            stale: List[str] = list(pending) if handles is None else []
+            for i, k in enumerate(pending if handles is not None else ()):
+                el = handles.get(k)
+                if el is None:
+                    statuses[k] = NOT_FOUND
+                    self._log(f"   não encontrei textarea para '{k}'")
+                    continue
+                try:
+                    statuses[k] = action(k, el)
+                except Exception as e:
+                    if is_stale(e):
+                        # DOM re-renderizado: os handles restantes também estão velhos
+                        stale = pending[i:]
+                        break
+                    statuses[k] = ERROR
+                    self._log(f"   erro: {e}")
+            if not stale:
+                break
+
+            self.rounds += 1
+            if len(statuses) > done_before:
+                # a rodada avançou: o DOM está utilizável, re-resolve já e zera o orçamento
+                self.failures = 0
+                delay = 0.0
+            else:
+                self.failures += 1
+                if self.failures > self.max_retries:
+                    for k in stale:
+                        statuses[k] = STALE
+                    self._log(f"   desisti após {self.max_retries} re-renders sem progresso; "
+                              f"{len(stale)} itens pendentes.")
+                    break
+                delay = min(self.max_delay, self.base_delay * (2 ** (self.failures - 1)))
+            self._log(f"   página re-renderizada; re-resolvendo {len(stale)} itens em {delay:.1f}s...")
+            if delay:
+                time.sleep(delay)
+            if self.before_retry:
+                try:
+                    self.before_retry()
+                except Exception as e:
+                    self._log(f"   aviso: não consegui restaurar o contexto ({type(e).__name__}).")
+            self.retried += len(stale)
+            pending = stale
+            handles = self._resolve(pending)
+        return statuses
+
+    def _resolve(self, keys: List[str]) -> Optional[Dict[str, Any]]:
+        """Resolve o lote; None se o próprio DOM/frame ficou obsoleto no meio."""
+        try:
+            return self.resolve(keys)
+        except Exception as e:
+            if not is_stale(e):
+                raise
+            self._log("   DOM ainda instável durante a resolução.")
+            return None
@@ -0,0 +1,257 @@
+from __future__ import annotations
+import datetime, json, sqlite3, threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.utils import OUT_DIR, validate_value_map
+from features.date_shift import parse_key_date_suffix, format_key
+
+REPO_PATH = OUT_DIR / "diario.sqlite3"
+
+_SCHEMA = """
+PRAGMA foreign_keys = ON;
+CREATE TABLE IF NOT EXISTS turmas (
+    id        INTEGER PRIMARY KEY,
+    semester  TEXT NOT NULL,
+    code      TEXT NOT NULL,
+    name      TEXT,
+    UNIQUE (semester, code)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id          INTEGER PRIMARY KEY,
+    turma_id    INTEGER NOT NULL REFERENCES turmas(id) ON DELETE CASCADE,
+    date        TEXT NOT NULL,              -- ISO AAAA-MM-DD (ordena e filtra por faixa)
+    suffix      TEXT NOT NULL,
+    text        TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    saved_at    TEXT,                       -- NULL = ainda não lançado no portal
+    UNIQUE (turma_id, date, suffix)
+);
+CREATE INDEX IF NOT EXISTS ix_entries_date ON entries (date, suffix);
+CREATE INDEX IF NOT EXISTS ix_entries_unsaved ON entries (turma_id, suffix, date) WHERE saved_at IS NULL;
+CREATE TABLE IF NOT EXISTS fill_history (
+    id        INTEGER PRIMARY KEY,
+    entry_id  INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+    status    TEXT NOT NULL,
+    run_at    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_history_entry ON fill_history (entry_id, run_at);
+"""
+
+# status de preenchimento que contam como "lançado no portal"; "ok" (digitado) só
+# conta quando o clique em Salvar foi confirmado (record_fill(..., saved=True))
+SAVED_STATUSES = ("verified",)
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _split_key(key: str) -> Optional[Tuple[str, str]]:
+    dt, suffix = parse_key_date_suffix(key)
+    if not dt:
+        return None
+    return dt.isoformat(), suffix
+
+
+def _join_key(date_iso: str, suffix: str) -> str:
+    return format_key(datetime.date.fromisoformat(date_iso), suffix)
+
+
+class DiaryRepository:
+    """Arquivo local (SQLite) de diários: várias turmas e semestres, com histórico de lançamentos.
+
+    Linhas de `query()` são dicts com semester, turma, key, text, updated_at, saved_at.
+    """
+
+    def __init__(self, path: Path | str = REPO_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- turmas ----------
+    def turma_id(self, semester: str, code: str, name: Optional[str] = None) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO turmas (semester, code, name) VALUES (?, ?, ?) "
+                "ON CONFLICT (semester, code) DO UPDATE SET name = COALESCE(excluded.name, turmas.name)",
+                (semester, code, name),
+            )
+            row = self._conn.execute(
+                "SELECT id FROM turmas WHERE semester = ? AND code = ?", (semester, code)
+            ).fetchone()
+        return int(row["id"])
+
+    def turmas(self, semester: Optional[str] = None) -> List[dict]:
+        sql = "SELECT semester, code, name FROM turmas"
+        args: tuple = ()
+        if semester:
+            sql += " WHERE semester = ?"
+            args = (semester,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY semester DESC, code", args).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------- importação ----------
+    def import_map(self, semester: str, turma: str, value_map: Dict[str, str]) -> dict:
+        """Valida (validate_value_map) e grava em lote. Texto alterado volta a 'não salvo'."""
+        norm, errors = validate_value_map(value_map)
+        tid = self.turma_id(semester, turma)
+        now = _now()
+        rows = []
+        for k, text in norm.items():
+            parts = _split_key(k)
+            if not parts:
+                errors[k] = "Data inválida."
+                continue
+            rows.append((tid, parts[0], parts[1], text, now))
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO entries (turma_id, date, suffix, text, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (turma_id, date, suffix) DO UPDATE SET "
+                "  text = excluded.text, updated_at = excluded.updated_at, saved_at = NULL "
+                "WHERE entries.text <> excluded.text",
+                rows,
+            )
+            written = self._conn.total_changes - before
+        return {"valid": len(rows), "written": written, "errors": errors}
+
+    def import_json(self, path: str, semester: str, turma: str) -> dict:
+        with open(path, "r", encoding="utf-8") as f:
+            return self.import_map(semester, turma, json.load(f))
+
+    def import_excel(self, path: str, semester: str, turma: str, sheet: Optional[str] = None) -> dict:
+        from openpyxl import load_workbook
+        from features.excel_import import process_worksheet
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet else wb[wb.sheetnames[0]]
+            norm, stats = process_worksheet(ws, validate_value_map)
+        finally:
+            wb.close()
+        res = self.import_map(semester, turma, norm)
+        res["errors"].update(stats.get("errors") or {})
+        return res
+
+    # ---------- leitura ----------
+    def load_map(self, semester: str, turma: str) -> Dict[str, str]:
+        """Dataset de uma turma no formato do app ({'DD/MM/AAAA -X': texto}), por data."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.date, e.suffix, e.text FROM entries e JOIN turmas t ON t.id = e.turma_id "
+                "WHERE t.semester = ? AND t.code = ? ORDER BY e.date, e.suffix",
+                (semester, turma),
+            ).fetchall()
+        return {_join_key(r["date"], r["suffix"]): r["text"] for r in rows}
+
+    @staticmethod
+    def _where(semester, turma, suffix, unsaved, date_from, date_to, text) -> Tuple[str, list]:
+        cond, args = [], []
+        if semester:
+            cond.append("t.semester = ?"); args.append(semester)
+        if turma:
+            cond.append("t.code = ?"); args.append(turma)
+        if suffix:
+            cond.append("e.suffix = ?"); args.append(suffix)
+        if unsaved is True:
+            cond.append("e.saved_at IS NULL")
+        elif unsaved is False:
+            cond.append("e.saved_at IS NOT NULL")
+        if date_from:
+            cond.append("e.date >= ?"); args.append(date_from)
+        if date_to:
+            cond.append("e.date <= ?"); args.append(date_to)
+        if text:
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            cond.append("e.text LIKE ? ESCAPE '\\'"); args.append(f"%{escaped}%")
+        return (" WHERE " + " AND ".join(cond)) if cond else "", args
+
+    def query(
+        self,
+        *,
+        semester: Optional[str] = None,
+        turma: Optional[str] = None,
+        suffix: Optional[str] = None,
+        unsaved: Optional[bool] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = 200,
+        offset: int = 0,
+    ) -> List[dict]:
+        """Uma página de entradas. Ex.: query(semester='2025-1', suffix='P', unsaved=True)."""
+        where, args = self._where(semester, turma, suffix, unsaved, date_from, date_to, text)
+        sql = (
+            "SELECT t.semester, t.code AS turma, e.date, e.suffix, e.text, e.updated_at, e.saved_at "
+            "FROM entries e JOIN turmas t ON t.id = e.turma_id" + where +
+            " ORDER BY e.date, e.suffix, t.code LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, args + [limit, offset]).fetchall()
+        out = []
+        for r in rows:
+            d = dict(r)
+            d["key"] = _join_key(d.pop("date"), d.pop("suffix"))
+            out.append(d)
+        return out
+
+    def count(self, **filters) -> int:
+        where, args = self._where(
+            filters.get("semester"), filters.get("turma"), filters.get("suffix"), filters.get("unsaved"),
+            filters.get("date_from"), filters.get("date_to"), filters.get("text"),
+        )
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM entries e JOIN turmas t ON t.id = e.turma_id" + where, args
+            ).fetchone()
+        return int(row[0])
+
+    def iter_pages(self, page_size: int = 200, **filters) -> Iterator[List[dict]]:
+        """Páginas sob demanda (para a UI carregar conforme rola)."""
+        offset = 0
+        while True:
+            page = self.query(limit=page_size, offset=offset, **filters)
+            if not page:
+                return
+            yield page
+            offset += len(page)
+
+    # ---------- histórico ----------
+    def record_fill(self, semester: str, turma: str, statuses: Dict[str, str], *, saved: bool = False) -> int:
+        """Registra o resultado de um preenchimento e marca como salvas as entradas lançadas.
+
+        'verified' sempre conta; 'ok' só com `saved=True` (o clique em Salvar foi confirmado).
+        """
+        saved_statuses = SAVED_STATUSES + (("ok",) if saved else ())
+        tid = self.turma_id(semester, turma)
+        now = _now()
+        n = 0
+        with self._lock, self._conn:
+            for key, status in statuses.items():
+                parts = _split_key(key)
+                if not parts:
+                    continue
+                row = self._conn.execute(
+                    "SELECT id FROM entries WHERE turma_id = ? AND date = ? AND suffix = ?",
+                    (tid, parts[0], parts[1]),
+                ).fetchone()
+                if not row:
+                    continue
+                self._conn.execute(
+                    "INSERT INTO fill_history (entry_id, status, run_at) VALUES (?, ?, ?)",
+                    (row["id"], status, now),
+                )
+                if status in saved_statuses:
+                    self._conn.execute("UPDATE entries SET saved_at = ? WHERE id = ?", (now, row["id"]))
+                n += 1
+        return n
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.utils import normalize_label
+from services.frames import diary_frame_path, enter_frame_path
+
+# Rótulo da linha de cada textarea: texto da linha (sem o conteúdo dos próprios campos)
+# ou, em layouts "label + textarea", do irmão anterior que tenha uma data.
+ROW_LABEL_JS = r"""
+const ROW_SEL = 'tr, .row, .linha, .form-group, li, .item';
+const DATE_RE = /\d{1,2}\/\d{1,2}\/\d{2,4}/;
+
+function labelText(node){
+  // texto do nó ignorando textareas/inputs (textContent do textarea = valor inicial)
+  const parts = [];
+  const w = document.createTreeWalker(node, NodeFilter.SHOW_TEXT, {
+    acceptNode: t => (t.parentElement && t.parentElement.closest('textarea, script, style, select'))
+                       ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+  });
+  while (w.nextNode()) parts.push(w.currentNode.nodeValue);
+  return parts.join(' ').replace(/\s+/g, ' ').trim();
+}
+// [rótulo, estratégia]: estratégia = seletor da linha que deu certo ('tr', '.row', ...) ou 'sibling'.
+// `only` restringe a uma estratégia já comprovada (cache de layout) e pula as demais.
+function labelWithHow(ta, only){
+  if (only !== 'sibling'){
+    const row = ta.closest(only || ROW_SEL);
+    if (row){
+      const t = labelText(row);
+      if (DATE_RE.test(t)){
+        const how = only || ROW_SEL.split(', ').find(s => row.matches(s));
+        return [t, how];
+      }
+    }
+    if (only) return ['', ''];
+  }
+  // layout "label + textarea" em irmãos
+  let sib = ta.previousElementSibling;
+  for (let i = 0; i < 5 && sib; i++, sib = sib.previousElementSibling){
+    const t = labelText(sib);
+    if (DATE_RE.test(t)) return [t, 'sibling'];
+  }
+  return ['', ''];
+}
+function labelFor(ta){ return labelWithHow(ta)[0]; }
+"""
+
+# Lê todas as linhas do diário numa única execução: [rótulo, valor atual] por textarea visível.
+SCRAPE_DIARY_JS = ROW_LABEL_JS + r"""
+const out = [];
+for (const ta of document.querySelectorAll('textarea')){
+  if (!ta.offsetParent) continue;
+  const label = labelFor(ta);
+  if (label) out.push([label, ta.value || '']);
+}
+return out;
+"""
+
+# data + marcador de modalidade logo após ("-P", "(T)", "- Prática", ...)
+_ROW_LABEL_RE = re.compile(
+    r"(\d{1,2}/\d{1,2}/\d{2,4})(?:\s*[-–—(]?\s*(pr[aá]tica|te[oó]rica|[pt])(?![a-zà-ÿ]))?",
+    re.IGNORECASE,
+)
+
+
+def label_to_key(label: str) -> Optional[str]:
+    """'Ter 10/06/25 (P) ...' -> '10/06/2025 -P' (sem marcador assume P, como normalize_label)."""
+    m = _ROW_LABEL_RE.search(label or "")
+    if not m:
+        return None
+    date, mark = m.groups()
+    return normalize_label(f"{date} -{mark[0].upper()}" if mark else date)
+
+
+def _collect(rows: Iterable[List[str]], include_empty: bool) -> Dict[str, str]:
+    result: Dict[str, str] = {}
+    for label, value in rows:
+        key = label_to_key(label)
+        if not key:
+            continue
+        value = (value or "").replace("\r\n", "\n")
+        if not include_empty and not value.strip():
+            continue
+        result.setdefault(key, value)
+    return result
+
+
+def scrape_diary(
+    driver: WebDriver,
+    keys_hint: Iterable[str] = (),
+    logger: Optional[Callable[[str], None]] = None,
+    *,
+    include_empty: bool = False,
+) -> Dict[str, str]:
+    """Conteúdo atual do diário no portal ({chave normalizada: texto}) em uma ida ao navegador.
+
+    `keys_hint` (ex.: chaves carregadas) ajuda a localizar o frame do diário.
+    Campos vazios são omitidos, salvo `include_empty=True`.
+    """
+    path = diary_frame_path(driver, keys_hint, logger) or []
+    try:
+        enter_frame_path(driver, path)
+        rows = driver.execute_script(SCRAPE_DIARY_JS) or []
+    finally:
+        driver.switch_to.default_content()
+    result = _collect(rows, include_empty)
+    if logger:
+        logger(f"[portal] {len(rows)} linhas lidas; {len(result)} com conteúdo.")
+    return result
+
+
+def page_rows(html: str) -> List[List[str]]:
+    """[rótulo, valor] por textarea do HTML (mesma lógica de SCRAPE_DIARY_JS, via lxml)."""
+    from lxml import html as lxml_html
+
+    doc = lxml_html.fromstring(html)
+    rows: List[List[str]] = []
+    row_xpath = (
+        "ancestor::*[self::tr or self::li or contains(concat(' ', normalize-space(@class), ' '), ' row ')"
+        " or contains(concat(' ', normalize-space(@class), ' '), ' linha ')"
+        " or contains(concat(' ', normalize-space(@class), ' '), ' form-group ')"
+        " or contains(concat(' ', normalize-space(@class), ' '), ' item ')][1]"
+    )
+
+    def _label_text(node) -> str:
+        parts = [t for t in node.xpath(".//text()[not(ancestor::textarea or ancestor::script or ancestor::style or ancestor::select)]")]
+        return re.sub(r"\s+", " ", " ".join(parts)).strip()
+
+    for ta in doc.iter("textarea"):
+        label = ""
+        row = ta.xpath(row_xpath)
+        if row:
+            label = _label_text(row[0])
+        if not _ROW_LABEL_RE.search(label):
+            label = ""
+            sib = ta.getprevious()
+            for _ in range(5):
+                if sib is None:
+                    break
+                t = _label_text(sib)
+                if _ROW_LABEL_RE.search(t):
+                    label = t
+                    break
+                sib = sib.getprevious()
+        if label:
+            rows.append([label, ta.text or ""])
+    return rows
+
+
+def scrape_page_source(html: str, *, include_empty: bool = False) -> Dict[str, str]:
+    """Mesma leitura a partir do HTML (page_source/HTTP) via lxml.
+
+    Reflete o conteúdo renderizado pelo servidor (não o que foi digitado e não salvo).
+    """
+    return _collect(page_rows(html), include_empty)
+
+
+def scrape_url(session, url: str, *, cache=None, include_empty: bool = False) -> Dict[str, str]:
+    """Conteúdo do diário por HTTP (sessão autenticada), com GET condicional via PageCache.
+
+    LookupError se o HTML não traz linhas do diário (login, diário montado por JavaScript):
+    nesse caso leia pelo navegador (scrape_diary).
+    """
+    from services.http_cache import default_cache
+
+    cache = cache or default_cache()
+    page = cache.get(session, url)
+    if page.status >= 400:
+        raise RuntimeError(f"HTTP {page.status} ao ler {url}")
+    rows = cache.parsed(page, page_rows, "rows")
+    if not rows:
+        raise LookupError(f"nenhuma linha do diário no HTML de {url}")
+    return _collect(rows, include_empty)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import threading
+from typing import Callable, Optional
+
+from services.drivers import create_driver, parse_browser, show_window
+
+
+class StandbyBrowser:
+    """Mantém uma sessão de navegador pré-aquecida em segundo plano.
+
+    `prewarm(browser)` inicia o navegador numa thread assim que o app abre, com a
+    janela fora da tela (o driver também fica resolvido e no cache); `acquire(browser)`
+    entrega essa sessão já na tela (esperando o término do início, se necessário) ou
+    cria uma nova quando o navegador pedido for outro.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., object] = create_driver,
+        logger: Optional[Callable[[str], None]] = None,
+    ):
+        self._factory = factory
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._browser: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._driver = None
+        self._error: Optional[BaseException] = None
+
+    def _log(self, msg: str) -> None:
+        if self._logger:
+            self._logger(msg)
+
+    def prewarm(self, browser: str, profile: str = "default") -> None:
+        """Começa a abrir `browser` em background (descarta standby de outro navegador/perfil)."""
+        browser = ((browser or "edge").strip().lower(), profile)
+        with self._lock:
+            if self._browser == browser and self._error is None:
+                return
+            old = self._take_locked()
+            self._browser = browser
+            self._driver, self._error = None, None
+            self._thread = threading.Thread(target=self._start, args=(browser,), daemon=True)
+            self._thread.start()
+        self._quit_quietly(old)
+        self._log(f"[standby] Pré-aquecendo {browser[0]} ({profile}) em segundo plano...")
+
+    def _start(self, browser: tuple) -> None:
+        try:
+            driver = self._factory(browser=browser[0], logger=self._logger, profile=browser[1], background=True)
+        except BaseException as e:
+            with self._lock:
+                if self._browser == browser:
+                    self._error = e
+            return
+        with self._lock:
+            if self._browser == browser and self._driver is None:
+                self._driver = driver
+                driver = None
+        # standby foi trocado/descartado enquanto o navegador abria
+        self._quit_quietly(driver)
+
+    def acquire(self, browser: str, profile: str = "default", timeout: Optional[float] = None):
+        """Entrega a sessão pré-aquecida de `browser` ou cria uma nova na hora."""
+        browser = ((browser or "edge").strip().lower(), profile)
+        with self._lock:
+            thread = self._thread if self._browser == browser else None
+        if thread is not None:
+            thread.join(timeout)
+            with self._lock:
+                if self._browser == browser and self._driver is not None:
+                    driver = self._take_locked()
+                    self._log("[standby] Sessão pré-aquecida entregue.")
+                else:
+                    driver = None
+                    if self._browser == browser and self._error is not None:
+                        self._log(f"[standby] Pré-aquecimento falhou: {self._error}; abrindo novamente.")
+                        self._take_locked()
+            if driver is not None:
+                if not parse_browser(browser[0])[1]:
+                    show_window(driver)
+                return driver
+        return self._factory(browser=browser[0], logger=self._logger, profile=profile)
+
+    def _take_locked(self):
+        driver = self._driver
+        self._browser, self._thread, self._driver, self._error = None, None, None, None
+        return driver
+
+    def discard(self) -> None:
+        """Fecha a sessão ociosa (ex.: ao sair do app)."""
+        with self._lock:
+            driver = self._take_locked()
+        self._quit_quietly(driver)
+
+    @staticmethod
+    def _quit_quietly(driver) -> None:
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
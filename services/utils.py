@@ -1,10 +1,12 @@
 from __future__ import annotations
-import re
+import os, re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 # URL inicial do portal (ajuste conforme necessário)
-GET_URL = "https://www.portaldocente.ufu.br"  # TODO: coloque a URL de entrada correta do portal UFU
+# UFU_GET_URL aponta o app para outro endereço (ex.: o portal local de tools/portal_stub.py)
+GET_URL = os.environ.get("UFU_GET_URL") or "https://www.portaldocente.ufu.br"  # TODO: coloque a URL de entrada correta do portal UFU
 
 DADOS_DEFAULT_PATH = Path("assets/dados_exemplo.json")
 OUT_DIR = Path("out_portal")
@@ -45,6 +47,25 @@ def preview_text(text: str, maxlen: int = 48) -> str:
     return (t[:maxlen] + "…") if len(t) > maxlen else t
 
 
+_KEY_RE = re.compile(r"^\d{2}/\d{2}/\d{4} -.+$")
+
+
+@lru_cache(maxsize=65536)
+def check_key(label: str) -> Tuple[str, Optional[str]]:
+    """(chave normalizada, motivo | None); o veredito fica memorizado por chave bruta."""
+    nk = normalize_label(label)
+    if not _KEY_RE.match(nk):
+        return nk, "Chave não segue padrão 'DD/MM/AAAA -X'."
+    return nk, None
+
+
+def validate_entry(key: str, text) -> Tuple[str, Optional[str]]:
+    """Valida uma única entrada: (chave normalizada, motivo | None)."""
+    if not isinstance(text, str):
+        return str(key), "Valor precisa ser texto (string)."
+    return check_key(str(key))
+
+
 def validate_value_map(value_map: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
     """Valida e normaliza chaves; retorna (norm_map, errors)
     - norm_map: chaves normalizadas -> valor
@@ -61,9 +82,9 @@ def validate_value_map(value_map: Dict[str, str]) -> Tuple[Dict[str, str], Dict[
         if not isinstance(v, str):
             errors[str(k)] = "Valor precisa ser texto (string)."
             continue
-        nk = normalize_label(str(k))
-        if not re.match(r"^\d{2}/\d{2}/\d{4} -.+$", nk):
-            errors[str(k)] = "Chave não segue padrão 'DD/MM/AAAA -X'."
+        nk, err = check_key(str(k))
+        if err:
+            errors[str(k)] = err
             continue
         if nk in norm:
             errors[str(k)] = f"Chave duplicada após normalização: {nk!r}."
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import datetime, hashlib, json, re, unicodedata
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from services.utils import OUT_DIR
+from services.diario import READ_MANY_VALUES_JS
+from services.matcher import RowIndex
+from services.scrape import SCRAPE_DIARY_JS
+from services.frames import diary_frame_path, diary_document_url, enter_cached_frame, enter_frame_path
+from services.readiness import wait_for_labels
+
+VERIFIED, MISMATCH, MISSING = "verified", "mismatch", "missing"
+
+
+def content_hash(text: Optional[str]) -> str:
+    """Hash do conteúdo normalizado (NFC, quebras e espaços colapsados)."""
+    t = unicodedata.normalize("NFC", text or "").replace("\r\n", "\n")
+    t = re.sub(r"\s+", " ", t).strip()
+    return hashlib.sha1(t.encode("utf-8")).hexdigest()
+
+
+def read_values(driver: WebDriver, keys: list[str]) -> Dict[str, Optional[str]]:
+    """Valor atual do textarea de cada chave (None = não achou).
+
+    Mesmo casamento do preenchimento: índice (data, sufixo) sobre todas as linhas,
+    com a busca por substring só para as chaves que sobrarem.
+    """
+    result = RowIndex(driver.execute_script(SCRAPE_DIARY_JS) or []).resolve(keys)
+    missing = [k for k in keys if result.get(k) is None]
+    if missing:
+        values = driver.execute_script(READ_MANY_VALUES_JS, missing) or []
+        for i, k in enumerate(missing):
+            result[k] = values[i] if i < len(values) else None
+    return result
+
+
+def verify_saved(
+    driver: WebDriver,
+    value_map: Dict[str, str],
+    logger: Callable[[str], None],
+    *,
+    reload: bool = True,
+    timeout: float = 15.0,
+    out_dir: Optional[Path] = OUT_DIR,
+) -> dict:
+    """Confere se o portal guardou o que foi preenchido.
+
+    Espera a resposta do salvamento assentar (DOM quieto), opcionalmente recarrega
+    o diário e lê todos os textareas de uma vez. Compara hashes normalizados com
+    `value_map` e grava o relatório em out_portal/verify_*.json.
+    Só chame depois de um salvamento confirmado (try_click_save -> True): com
+    `reload=True` o que estiver apenas digitado na página é descartado.
+    """
+    keys = list(value_map.keys())
+    wait_for_labels(driver, keys, timeout=timeout, quiet_ms=500)
+    url = driver.current_url
+    if reload:
+        logger("[verificação] Recarregando o diário...")
+        driver.get(url)  # GET (não repete o POST do salvamento como o refresh faria)
+
+    path = diary_frame_path(driver, keys, refresh=reload) or []
+    try:
+        enter_frame_path(driver, path)
+        if reload:
+            wait_for_labels(driver, keys, timeout=timeout)
+        actual = read_values(driver, keys)
+    finally:
+        driver.switch_to.default_content()
+
+    return _report(url, value_map, actual, logger, reloaded=reload, out_dir=out_dir)
+
+
+def verify_http(
+    session,
+    url: str,
+    value_map: Dict[str, str],
+    logger: Callable[[str], None],
+    *,
+    cache=None,
+    out_dir: Optional[Path] = OUT_DIR,
+) -> dict:
+    """Mesma conferência pelo HTML que o servidor devolve (sessão autenticada, sem navegador).
+
+    Usa GET condicional (PageCache): se a página não mudou desde a última leitura,
+    custa um 304 e reaproveita o parse anterior. LookupError se o HTML não traz
+    linhas do diário.
+    """
+    from services.http_cache import default_cache
+    from services.scrape import page_rows
+
+    cache = cache or default_cache()
+    page = cache.get(session, url)
+    if page.status >= 400:
+        raise RuntimeError(f"HTTP {page.status} ao ler {url}")
+    if page.from_cache:
+        logger("[verificação] Página inalterada desde a última leitura (304).")
+    rows = cache.parsed(page, page_rows, "rows")
+    if not rows:
+        raise LookupError(f"nenhuma linha do diário no HTML de {url}")
+    actual = RowIndex(rows).resolve(list(value_map.keys()))
+    return _report(url, value_map, actual, logger, reloaded=True, out_dir=out_dir)
+
+
+def verify_after_save(
+    driver: WebDriver,
+    value_map: Dict[str, str],
+    logger: Callable[[str], None],
+    *,
+    cache=None,
+    timeout: float = 15.0,
+    out_dir: Optional[Path] = OUT_DIR,
+) -> dict:
+    """Conferência depois de um salvamento confirmado.
+
+    Espera a resposta assentar e confere pelo HTML do servidor com os cookies do
+    navegador (verify_http: sem recarregar a página, 304 se nada mudou). Se o HTML não
+    traz o diário (montado por JavaScript, sessão não reaproveitável), recarrega e lê
+    pelo navegador (verify_saved).
+    """
+    from services.discovery import session_from_driver
+
+    keys = list(value_map.keys())
+    try:
+        enter_cached_frame(driver)
+        wait_for_labels(driver, keys, timeout=timeout, quiet_ms=500)
+    finally:
+        driver.switch_to.default_content()
+    try:
+        url = diary_document_url(driver, keys)
+        return verify_http(session_from_driver(driver), url, value_map, logger, cache=cache, out_dir=out_dir)
+    except Exception as e:
+        logger(f"[verificação] Leitura por HTTP indisponível ({type(e).__name__}: {e}); usando o navegador.")
+    return verify_saved(driver, value_map, logger, timeout=timeout, out_dir=out_dir)
+
+
+def _report(
+    url: str,
+    value_map: Dict[str, str],
+    actual: Dict[str, Optional[str]],
+    logger: Callable[[str], None],
+    *,
+    reloaded: bool,
+    out_dir: Optional[Path],
+) -> dict:
+    items: Dict[str, dict] = {}
+    summary = {VERIFIED: 0, MISMATCH: 0, MISSING: 0}
+    for k in value_map:
+        expected_h = content_hash(value_map[k])
+        got = actual.get(k)
+        if got is None:
+            status, got_h = MISSING, None
+        else:
+            got_h = content_hash(got)
+            status = VERIFIED if got_h == expected_h else MISMATCH
+        summary[status] += 1
+        items[k] = {"status": status, "expected_hash": expected_h, "actual_hash": got_h}
+
+    ts = datetime.datetime.now()
+    report = {
+        "url": url,
+        "timestamp": ts.isoformat(timespec="seconds"),
+        "reloaded": reloaded,
+        "summary": summary,
+        "items": items,
+    }
+    try:
+        if out_dir is not None:  # None = não grava (testes/benchmarks)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out = out_dir / f"verify_{ts.strftime('%Y%m%d-%H%M%S')}.json"
+            out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            report["path"] = str(out)
+    except OSError as e:
+        logger(f"[verificação] Não consegui gravar o relatório: {e}")
+
+    logger(f"[verificação] conferidos: {summary[VERIFIED]} | divergentes: {summary[MISMATCH]} | "
+           f"ausentes: {summary[MISSING]}")
+    for k, it in items.items():
+        if it["status"] != VERIFIED:
+            logger(f"   {it['status']}: {k}")
+    return report
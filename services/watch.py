@@ -0,0 +1,85 @@
+from __future__ import annotations
+import hashlib, os, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Modo observação: detecta quando dados.json ou a planilha de origem mudam no disco.
+# A cada rodada só se faz os.stat() (barato); o arquivo só é lido e hasheado quando a
+# assinatura (mtime, tamanho, inode) muda, e só é reimportado se o conteúdo mudou.
+
+
+def stat_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def file_digest(path: str) -> Optional[str]:
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+class FileWatcher:
+    """Arquivos observados por assinatura de stat + hash do conteúdo.
+
+    `watch(path, **info)` registra o arquivo no estado atual; `poll()` devolve
+    [(path, info)] dos arquivos cujo conteúdo mudou desde o último registro/poll.
+    Arquivo sumido ou em gravação (hash ilegível) fica para a próxima rodada.
+    `stats`: polls, stat_changes (assinatura mudou), content_changes (hash mudou).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files: Dict[str, dict] = {}
+        self.stats = {"polls": 0, "stat_changes": 0, "content_changes": 0}
+
+    def watch(self, path: str, **info: Any) -> str:
+        """Registra `path` no estado atual; devolve o caminho absoluto (chave usada no poll)."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._files[path] = {"sig": stat_signature(path), "digest": file_digest(path), "info": info}
+        return path
+
+    def unwatch(self, path: str) -> None:
+        with self._lock:
+            self._files.pop(os.path.abspath(path), None)
+
+    def invalidate(self, path: str) -> None:
+        """Faz o próximo poll reportar o arquivo (ex.: leitura falhou com ele ainda em gravação)."""
+        with self._lock:
+            entry = self._files.get(os.path.abspath(path))
+            if entry:
+                entry["sig"] = entry["digest"] = None
+
+    def watched(self) -> List[Tuple[str, dict]]:
+        with self._lock:
+            return [(p, dict(e["info"])) for p, e in self._files.items()]
+
+    def poll(self) -> List[Tuple[str, dict]]:
+        changed: List[Tuple[str, dict]] = []
+        with self._lock:
+            self.stats["polls"] += 1
+            for path, entry in self._files.items():
+                sig = stat_signature(path)
+                if sig is None or sig == entry["sig"]:
+                    continue
+                self.stats["stat_changes"] += 1
+                digest = file_digest(path)
+                if digest is None:
+                    continue
+                entry["sig"] = sig
+                if digest != entry["digest"]:
+                    entry["digest"] = digest
+                    self.stats["content_changes"] += 1
+                    changed.append((path, dict(entry["info"])))
+        return changed
+
+    def __len__(self) -> int:
+        return len(self._files)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+import shutil, time
+
+import pytest
+
+from services.driver_cache import find_browser_binary
+from services.drivers import create_driver
+from services.diario import fill_entries, try_click_save
+from services.standby import StandbyBrowser
+from services.verify import verify_after_save, VERIFIED
+from tools.pages import generate_entries
+from tools.portal_stub import PortalState, PortalStub
+
+# Sessão pré-aquecida (StandbyBrowser) e Chromium headless de verdade contra o portal
+# local (tools.portal_stub); os testes com navegador são pulados sem Chrome/Chromium.
+BROWSER = "chrome-headless"
+ROWS = 10
+
+_CHROME = find_browser_binary("chrome") or next(
+    filter(None, map(shutil.which, ("chrome", "google-chrome", "chromium", "chromium-browser"))), None)
+needs_chrome = pytest.mark.skipif(not _CHROME, reason="Chrome/Chromium não instalado")
+
+
+def quiet(_msg: str) -> None:
+    pass
+
+
+class _Window:
+    """Sessão falsa: só registra as chamadas de janela."""
+
+    def __init__(self, **kw):
+        self.kw, self.calls = kw, []
+
+    def set_window_position(self, x, y):
+        self.calls.append(("position", x, y))
+
+    def maximize_window(self):
+        self.calls.append(("maximize",))
+
+    def quit(self):
+        self.calls.append(("quit",))
+
+
+def test_standby_opens_in_background_and_shows_on_acquire():
+    standby = StandbyBrowser(factory=_Window, logger=quiet)
+    standby.prewarm("edge")
+    drv = standby.acquire("edge", timeout=5)
+    assert drv.kw["background"] is True
+    assert drv.calls == [("position", 0, 0), ("maximize",)]
+    # navegador diferente do pré-aquecido: sessão nova, aberta normalmente
+    other = standby.acquire("chrome")
+    assert "background" not in other.kw and other.calls == []
+
+
+@pytest.fixture
+def stub():
+    with PortalStub(state=PortalState(turmas=1, rows=ROWS)) as p:
+        yield p
+
+
+def login(driver, stub: PortalStub) -> None:
+    driver.get(stub.url + "/login")
+    driver.add_cookie({"name": "sid", "value": stub.login(), "path": "/"})
+
+
+@needs_chrome
+def test_create_driver_headless(stub):
+    driver = create_driver(BROWSER, quiet)
+    try:
+        login(driver, stub)
+        driver.get(stub.url + "/")
+        assert "T01" in driver.page_source
+    finally:
+        driver.quit()
+
+
+@needs_chrome
+def test_standby_acquire_fills_and_saves(stub):
+    standby = StandbyBrowser(logger=quiet)
+    standby.prewarm(BROWSER)
+    driver = standby.acquire(BROWSER, timeout=120)
+    try:
+        login(driver, stub)
+        driver.get(stub.url + "/diario?turma=T01")
+        entries = {k: f"{v} (teste)" for k, v in generate_entries(ROWS, seed=0).items()}
+
+        assert fill_entries(driver, entries, quiet, layout_cache=None) == (ROWS, 0, 0)
+        assert try_click_save(driver, quiet)
+        deadline = time.monotonic() + 10
+        while stub.state.stats["saves"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert stub.state.turmas["T01"]["saved"] == entries
+
+        rep = verify_after_save(driver, entries, quiet, timeout=5.0, out_dir=None)
+        assert rep["summary"][VERIFIED] == ROWS
+    finally:
+        driver.quit()
+        standby.discard()
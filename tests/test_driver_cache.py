@@ -0,0 +1,32 @@
+from __future__ import annotations
+import json
+
+from services.driver_cache import check_browser_version, load_cached_driver, store_driver
+
+
+def _store(tmp_path, version):
+    drv = tmp_path / "chromedriver"
+    drv.write_text("")
+    cache = tmp_path / "driver_cache.json"
+    # sem binário localizado: assinatura None, só a versão detecta a atualização
+    store_driver("chrome", driver_path=str(drv), browser_path=None, browser_version=version,
+                 strategy="selenium-manager", path=cache)
+    return cache
+
+
+def test_version_mismatch_drops_entry(tmp_path):
+    cache = _store(tmp_path, "120.0.6099.109")
+    assert load_cached_driver("chrome", path=cache) is not None
+    assert check_browser_version("chrome", "120.0.6099.109", path=cache) is True
+
+    logs: list = []
+    assert check_browser_version("chrome", "121.0.6167.85", logs.append, path=cache) is False
+    assert load_cached_driver("chrome", path=cache) is None
+    assert logs and "121.0.6167.85" in logs[0]
+
+
+def test_missing_version_is_recorded(tmp_path):
+    cache = _store(tmp_path, None)
+    assert check_browser_version("chrome", "120.0.6099.109", path=cache) is True
+    assert json.loads(cache.read_text(encoding="utf-8"))["chrome"]["browser_version"] == "120.0.6099.109"
+    assert check_browser_version("chrome", None, path=cache) is True
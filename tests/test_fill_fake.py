@@ -0,0 +1,128 @@
+from __future__ import annotations
+import itertools
+
+import pytest
+
+from services.diario import fill_entries, try_click_save
+from services.recovery import OK, NOT_FOUND, SKIPPED
+from services.scrape import SCRAPE_DIARY_JS
+from services.verify import verify_saved, verify_after_save, VERIFIED, MISMATCH
+from tools.fakedriver import FakeDriver, rerender_on_change
+from tools.pages import LAYOUTS, diary_html, generate_entries
+
+# Preenchimento + salvamento + conferência contra o FakeDriver (sem navegador), em todos
+# os layouts de tools.pages e estilos de rótulo.
+LABEL_STYLES = ("key", "long", "short")
+CASES = list(itertools.product(LAYOUTS, LABEL_STYLES))
+_urls = itertools.count()
+
+
+def quiet(_msg: str) -> None:
+    pass
+
+
+def make_driver(entries, layout: str, label_style: str = "key", *, prefilled=None, **kw) -> FakeDriver:
+    # URL única por página: o cache de frames (services.frames) é por URL
+    url = f"http://portal.local/diario?layout={layout}&rotulo={label_style}&n={next(_urls)}"
+    page = diary_html(prefilled if prefilled is not None else list(entries), layout, label_style=label_style)
+    return FakeDriver({url: page}, url, **kw)
+
+
+def fill(drv: FakeDriver, entries, **kw) -> dict:
+    report: dict = {}
+    kw.setdefault("layout_cache", None)
+    counts = fill_entries(drv, entries, quiet, report=report, highlight=False, **kw)
+    report["counts"] = counts
+    return report
+
+
+def saved_values(drv: FakeDriver) -> dict:
+    """Valores como o portal os devolve depois de recarregar (rótulo -> texto)."""
+    drv.refresh()
+    return {label: value for label, value in drv.execute_script(SCRAPE_DIARY_JS)}
+
+
+@pytest.mark.parametrize("layout,label_style", CASES)
+def test_fill_save_verify(layout, label_style):
+    entries = generate_entries(12, seed=1)
+    drv = make_driver(entries, layout, label_style)
+
+    report = fill(drv, entries)
+    assert report["counts"] == (len(entries), 0, 0)
+    assert report["status"] == {k: OK for k in entries}
+
+    assert try_click_save(drv, quiet) is True
+    assert drv.saves == 1
+
+    rep = verify_saved(drv, entries, quiet, out_dir=None)
+    assert rep["reloaded"] is True
+    assert rep["summary"][VERIFIED] == len(entries)
+    assert {k: it["status"] for k, it in rep["items"].items()} == {k: VERIFIED for k in entries}
+    assert sorted(saved_values(drv).values()) == sorted(entries.values())
+
+
+@pytest.mark.parametrize("layout,label_style", CASES)
+def test_verify_after_save(layout, label_style):
+    entries = generate_entries(8, seed=2)
+    drv = make_driver(entries, layout, label_style)
+    fill(drv, entries)
+    assert try_click_save(drv, quiet)
+
+    # sem cookies no FakeDriver: a leitura por HTTP cai para o navegador
+    logs: list = []
+    rep = verify_after_save(drv, entries, logs.append, timeout=1.0, out_dir=None)
+    assert rep["summary"][VERIFIED] == len(entries)
+    assert any("usando o navegador" in m for m in logs)
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("every", [1, 3])
+def test_rerender_on_change_recovers(layout, every):
+    entries = generate_entries(10, seed=3)
+    drv = make_driver(entries, layout, on_change=rerender_on_change(every))
+
+    report = fill(drv, entries)
+    assert report["counts"] == (len(entries), 0, 0)
+    assert report["status"] == {k: OK for k in entries}
+    assert report["retried"] > 0
+
+    assert try_click_save(drv, quiet)
+    rep = verify_saved(drv, entries, quiet, out_dir=None)
+    assert rep["summary"][VERIFIED] == len(entries)
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_missing_and_prefilled_rows(layout):
+    entries = generate_entries(6, seed=4)
+    keys = list(entries)
+    page = {k: ("já lançado" if k == keys[0] else "") for k in keys[:-1]}  # última chave não está na página
+    drv = make_driver(entries, layout, prefilled=page)
+
+    report = fill(drv, entries, require_empty=True, ready_timeout=0)
+    assert report["status"][keys[0]] == SKIPPED
+    assert report["status"][keys[-1]] == NOT_FOUND
+    assert all(report["status"][k] == OK for k in keys[1:-1])
+    assert report["counts"] == (len(keys) - 2, 1, 1)
+
+    assert try_click_save(drv, quiet)
+    rep = verify_saved(drv, entries, quiet, out_dir=None)
+    assert rep["items"][keys[0]]["status"] == MISMATCH
+    assert rep["summary"][VERIFIED] == len(keys) - 2
+
+
+def test_layout_cache_reused(tmp_path):
+    entries = generate_entries(10, seed=5)
+    cache = tmp_path / "layout_cache.json"
+    url = "http://portal.local/diario?layout=cache"
+    pages = {url: diary_html(list(entries), "form-group")}
+
+    logs: list = []
+    first = FakeDriver(pages, url)
+    assert fill_entries(first, entries, logs.append, layout_cache=cache) == (len(entries), 0, 0)
+    assert cache.exists()
+    assert any("layout registrado" in m for m in logs)
+
+    logs.clear()
+    second = FakeDriver(dict(pages), url)
+    assert fill_entries(second, entries, logs.append, layout_cache=cache) == (len(entries), 0, 0)
+    assert any("layout conhecido" in m for m in logs)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import json
+
+import requests
+
+from services.http_cache import PageCache
+from tools.portal_stub import PortalState, PortalStub
+
+
+def _session(stub: PortalStub) -> requests.Session:
+    s = requests.Session()
+    s.cookies.set("sid", stub.login())
+    return s
+
+
+def test_hits_do_not_rewrite_index_until_flush(tmp_path):
+    with PortalStub(state=PortalState(turmas=3, rows=5)) as stub:
+        session = _session(stub)
+        cache = PageCache(tmp_path)
+        urls = [f"{stub.url}/diario?turma=T{i:02d}" for i in (1, 2, 3)]
+        for url in urls:
+            assert cache.get(session, url).from_cache is False
+        index = tmp_path / "index.json"
+        assert not index.exists()
+        assert cache.flush() and set(json.loads(index.read_text(encoding="utf-8"))) == set(urls)
+
+        mtime = index.stat().st_mtime_ns
+        for url in urls:
+            assert cache.get(session, url).from_cache is True
+        assert index.stat().st_mtime_ns == mtime
+        assert cache.stats["hits"] == 3
+        cache.close()
+        assert PageCache(tmp_path).get(session, urls[0]).from_cache is True
+
+
+def test_index_write_failure_does_not_break_get(tmp_path, monkeypatch):
+    with PortalStub(state=PortalState(turmas=1, rows=5)) as stub:
+        session = _session(stub)
+        cache = PageCache(tmp_path)
+        url = f"{stub.url}/diario?turma=T01"
+        cache.get(session, url)
+
+        def locked():
+            raise PermissionError("arquivo em uso")
+
+        monkeypatch.setattr(cache, "_save_index", locked)
+        page = cache.get(session, url)
+        assert page.from_cache is True and "Turma T01" in page.text
+        assert cache.flush() is False  # continua pendente
+
+        monkeypatch.undo()
+        assert cache.flush() is True
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import time
+
+from services.pacing import AimdPacer
+
+
+def test_one_cut_per_window():
+    p = AimdPacer(target_latency=0.01, chunk=80, concurrency=8)
+    # K workers iniciados juntos voltam lentos: um único corte
+    for _ in range(8):
+        p.observe("http", 5.0)
+    assert (p.chunk_size, p.concurrency) == (40, 4)
+    assert p.report()["stats"]["http"]["held"] == 7
+
+    # operação iniciada depois do corte ainda lenta: novo corte
+    time.sleep(0.05)
+    p.observe("http", 0.02)
+    assert (p.chunk_size, p.concurrency) == (20, 2)
+
+
+def test_logs_outside_lock():
+    seen = []
+    p = AimdPacer(target_latency=0.01)
+
+    def logger(msg):
+        free = p._lock.acquire(blocking=False)
+        if free:
+            p._lock.release()
+        seen.append((free, msg))
+
+    p.logger = logger
+    p.observe("save", 1.0, ok=False)
+    assert seen and all(free for free, _ in seen)
+    assert "reduz" in seen[0][1]
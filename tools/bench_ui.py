@@ -0,0 +1,378 @@
+from __future__ import annotations
+import datetime, json, os, platform, statistics, sys, tempfile, time, tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from services.utils import OUT_DIR
+
+# Benchmark das operações de edição da interface em datasets grandes.
+#
+# Dirige o próprio App (ui/app.py) sem interação: diálogos são substituídos por
+# respostas fixas e a janela fica oculta (withdraw). Sem display (CI/servidor), o
+# backend 'headless' troca o Tcl e os widgets por equivalentes em Python — mede o
+# código do app, não o desenho do Tk; o backend usado fica registrado no resultado.
+#
+#   python -m tools.bench_ui --sizes 1000 10000 100000
+#   python -m tools.bench_ui --compare out_portal/bench/ui_tk_....json   (sai com 1 se regrediu)
+#
+# Resultado em out_portal/bench/ui_<backend>_<data>.json:
+#   {"meta": {...}, "results": {"10000": {"load": {"median_ms", "min_ms", "max_ms", "peak_kb"}, ...}}}
+
+BENCH_DIR = OUT_DIR / "bench"
+OPERATIONS = ("load", "import", "refresh", "search", "sort", "add", "edit", "remove", "shift", "undo")
+
+
+# ---------- backend sem display ----------
+class _FakeTcl:
+    """Interpretador Tcl de mentira: aceita tudo e não agenda nada (after/bind ficam inertes)."""
+
+    def call(self, *args):
+        return ""
+
+    def createcommand(self, *args):
+        pass
+
+    def deletecommand(self, *args):
+        pass
+
+    def getboolean(self, v):
+        return bool(v)
+
+    def splitlist(self, v):
+        return tuple(v) if isinstance(v, (tuple, list)) else ()
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: ""
+
+
+class _Widget:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: None
+
+
+class _Listbox(_Widget):
+    def __init__(self, *args, **kwargs):
+        self.items: List[str] = []
+        self._sel: List[int] = []
+
+    def insert(self, index, *values):
+        i = len(self.items) if index == "end" else int(index)
+        self.items[i:i] = values
+
+    def delete(self, first, last=None):
+        if last is None:
+            del self.items[int(first)]
+        else:
+            del self.items[int(first): (len(self.items) if last == "end" else int(last) + 1)]
+        self._sel = []
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return tuple(self._sel)
+
+    def selection_clear(self, *args):
+        self._sel = []
+
+    def selection_set(self, first, last=None):
+        self._sel = [int(first)]
+
+
+class _Text(_Widget):
+    def __init__(self, *args, **kwargs):
+        self.lines = 0
+
+    def insert(self, index, text):
+        self.lines += text.count("\n")
+
+
+class _Var:
+    default: object = None
+
+    def __init__(self, master=None, value=None, name=None):
+        self._v = self.default if value is None else value
+
+    def get(self):
+        return self._v
+
+    def set(self, v):
+        self._v = v
+
+
+class _StringVar(_Var):
+    default = ""
+
+
+class _BooleanVar(_Var):
+    default = False
+
+
+class _Ttk:
+    Label = Combobox = Checkbutton = Entry = _Widget
+
+
+@contextmanager
+def _headless():
+    """Troca Tcl/widgets de ui.app por equivalentes em Python enquanto o App é criado."""
+    import tkinter
+    import ui.app as app_mod
+
+    def _tk_init(self, *args, **kwargs):
+        self.tk = _FakeTcl()
+        self._w = "."
+        self.children = {}
+        self._tclCommands = None
+        self.master = None
+
+    saved = {name: getattr(app_mod, name) for name in
+             ("Frame", "Button", "Listbox", "Text", "Scrollbar", "StringVar", "BooleanVar", "ttk")}
+    saved_init = tkinter.Tk.__init__
+    tkinter.Tk.__init__ = _tk_init
+    app_mod.Frame = app_mod.Button = app_mod.Scrollbar = _Widget
+    app_mod.Listbox, app_mod.Text = _Listbox, _Text
+    app_mod.StringVar, app_mod.BooleanVar = _StringVar, _BooleanVar
+    app_mod.ttk = _Ttk
+    try:
+        yield
+    finally:
+        tkinter.Tk.__init__ = saved_init
+        for name, obj in saved.items():
+            setattr(app_mod, name, obj)
+
+
+def make_app(backend: str, workdir: Path):
+    """App pronto para o benchmark: sem pré-aquecimento de navegador e com autosave isolado."""
+    os.environ["UFU_PREWARM"] = "0"
+    os.environ["UFU_PROFILE"] = "0"
+    os.environ["UFU_WATCH"] = "0"
+    from ui.app import App
+    from services.journal import Journal
+
+    if backend == "auto":
+        import tkinter
+        try:
+            tkinter.Tk().destroy()
+            backend = "tk"
+        except tkinter.TclError:
+            backend = "headless"
+    if backend == "tk":
+        app = App()
+        app.withdraw()
+    else:
+        with _headless():
+            app = App()
+    app.journal = Journal(app._dataset_snapshot, workdir / "bench.journal", autosave_dir=workdir / "autosave")
+    return app, backend
+
+
+@contextmanager
+def _answers(**patches):
+    """Substitui diálogos de ui.app (filedialog, messagebox, ...) por respostas fixas."""
+    import ui.app as app_mod
+
+    saved = {}
+    for dotted, value in patches.items():
+        owner_name, _, attr = dotted.rpartition(".")
+        owner = getattr(app_mod, owner_name) if owner_name else app_mod
+        saved[(owner, attr)] = getattr(owner, attr)
+        setattr(owner, attr, value)
+    try:
+        yield
+    finally:
+        for (owner, attr), value in saved.items():
+            setattr(owner, attr, value)
+
+
+# ---------- dados ----------
+def _write_sources(n: int, workdir: Path) -> tuple[Path, Path]:
+    from openpyxl import Workbook
+    from tools.pages import generate_entries
+
+    entries = generate_entries(n, seed=n)
+    json_path = workdir / f"dados_{n}.json"
+    json_path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Plano")
+    ws.append(["Data", "Modalidade", "Conteúdo", "Matéria lecionada"])
+    for i, (k, text) in enumerate(entries.items()):
+        date, _, suffix = k.partition(" -")
+        ws.append([datetime.datetime.strptime(date, "%d/%m/%Y").date(),
+                   "Teórica" if suffix == "T" else "Prática", "", f"{text} (rev {i % 7})"])
+    xlsx_path = workdir / f"plano_{n}.xlsx"
+    wb.save(xlsx_path)
+    return json_path, xlsx_path
+
+
+# ---------- medição ----------
+def _settle(app, backend: str) -> None:
+    if backend == "tk":
+        app.update_idletasks()  # inclui o trabalho de layout/desenho pendente
+
+
+def _measure(fn: Callable[[], None], app, backend: str, repeat: int, memory: bool) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        _settle(app, backend)
+        times.append((time.perf_counter() - t0) * 1000)
+    res = {"median_ms": round(statistics.median(times), 2), "min_ms": round(min(times), 2),
+           "max_ms": round(max(times), 2), "runs": repeat}
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _settle(app, backend)
+            res["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024)
+        finally:
+            tracemalloc.stop()
+    return res
+
+
+def bench_size(n: int, *, backend: str = "auto", repeat: int = 3, memory: bool = True,
+               workdir: Optional[Path] = None, logger: Callable[[str], None] = print) -> tuple[dict, str]:
+    """Roda todas as operações num dataset de `n` entradas; devolve ({op: medidas}, backend)."""
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="bench_ui_"))
+    json_path, xlsx_path = _write_sources(n, workdir)
+    app, backend = make_app(backend, workdir)
+    results: Dict[str, dict] = {}
+    counter = iter(range(10 ** 9))
+
+    def middle_key_index() -> int:
+        return len(app._visible_keys) // 2
+
+    def op_load():
+        with _answers(**{"filedialog.askopenfilename": lambda **kw: str(json_path)}):
+            app.on_load_json()
+        assert app.current_path == str(json_path), "falha ao carregar o JSON (veja o log do app)"
+
+    def op_import():
+        with _answers(**{"filedialog.askopenfilename": lambda **kw: str(xlsx_path)}):
+            app.on_import_excel()
+
+    def op_refresh():
+        app._refresh_listbox()
+
+    def op_search():
+        app.search_var.set("aula")
+        app._apply_search()
+        app.search_var.set("")
+        app._apply_search()
+
+    def op_sort():
+        app._sorted_by_date(app.value_map)
+
+    def op_add():
+        i = next(counter)
+        answers = iter([f"{1 + i % 28:02d}/01/1990 -T{i}", "nova entrada do benchmark"])
+        with _answers(**{"simpledialog.askstring": lambda *a, **kw: next(answers)}):
+            app.on_add_item()
+
+    def op_edit():
+        idx = middle_key_index()
+        key = app._visible_keys[idx]
+        app.listbox.selection_clear(0, "end")
+        app.listbox.selection_set(idx)
+        with _answers(ask_edit_item=lambda _p, k, t: (k, t + " (editado)")):
+            app.on_edit_item()
+        assert app.value_map[key].endswith("(editado)")
+
+    def op_remove():
+        app.listbox.selection_clear(0, "end")
+        app.listbox.selection_set(middle_key_index())
+        with _answers(**{"messagebox.askyesno": lambda *a, **kw: True}):
+            app.on_remove_item()
+
+    def op_shift():
+        with _answers(ask_shift_params=lambda _p: ("Dias", 1, "Todas")):
+            app.on_shift_dates()
+
+    def op_undo():
+        app.on_undo()
+
+    ops = {"load": op_load, "import": op_import, "refresh": op_refresh, "search": op_search,
+           "sort": op_sort, "add": op_add, "edit": op_edit, "remove": op_remove,
+           "shift": op_shift, "undo": op_undo}
+    try:
+        for name in OPERATIONS:
+            results[name] = _measure(ops[name], app, backend, repeat, memory)
+            logger(f"[bench] {n:>7} {name:<8} {results[name]['median_ms']:>10.2f} ms"
+                   + (f"  pico {results[name]['peak_kb']} KB" if "peak_kb" in results[name] else ""))
+        results["entries_after"] = {"count": len(app.value_map)}
+        try:
+            import resource  # só POSIX
+            results["entries_after"]["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+    finally:
+        try:
+            app.journal.close()
+            if backend == "tk":
+                app.destroy()
+        except Exception:
+            pass
+    return results, backend
+
+
+def run(sizes: List[int], *, backend: str = "auto", repeat: int = 3, memory: bool = True,
+        out_dir: Optional[Path] = BENCH_DIR, logger: Callable[[str], None] = print) -> dict:
+    results: Dict[str, dict] = {}
+    used = backend
+    for n in sizes:
+        results[str(n)], used = bench_size(n, backend=backend, repeat=repeat, memory=memory, logger=logger)
+    report = {
+        "meta": {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "backend": used,
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "repeat": repeat, "sizes": sizes},
+        "results": results,
+    }
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out = out_dir / f"ui_{used}_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        report["path"] = str(out)
+    return report
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25, min_ms: float = 1.0) -> List[str]:
+    """Operações mais lentas que `threshold`× a referência (ignorando medidas abaixo de `min_ms`)."""
+    regressions = []
+    if current["meta"].get("backend") != baseline["meta"].get("backend"):
+        regressions.append(f"backend diferente: {current['meta'].get('backend')} × {baseline['meta'].get('backend')}")
+    for size, ops in current["results"].items():
+        for op, m in ops.items():
+            ref = baseline["results"].get(size, {}).get(op)
+            if not ref or "median_ms" not in m or "median_ms" not in ref:
+                continue
+            if m["median_ms"] >= min_ms and m["median_ms"] > threshold * max(ref["median_ms"], min_ms):
+                regressions.append(f"{size} {op}: {ref['median_ms']:.2f} → {m['median_ms']:.2f} ms "
+                                   f"({m['median_ms'] / max(ref['median_ms'], 1e-9):.2f}×)")
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Benchmark das operações de edição do App em datasets grandes.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--backend", choices=("auto", "tk", "headless"), default="auto")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-memory", action="store_true", help="não mede pico de memória (tracemalloc)")
+    ap.add_argument("--compare", help="JSON de referência; sai com código 1 se alguma operação regrediu")
+    ap.add_argument("--threshold", type=float, default=1.25)
+    args = ap.parse_args()
+
+    report = run(args.sizes, backend=args.backend, repeat=args.repeat, memory=not args.no_memory)
+    print(f"[bench] Resultado: {report.get('path')}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regs = compare(report, baseline, args.threshold)
+        for r in regs:
+            print(f"[bench] REGRESSÃO {r}")
+        sys.exit(1 if regs else 0)
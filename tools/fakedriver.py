@@ -0,0 +1,393 @@
+from __future__ import annotations
+import re, time, unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Union
+
+from lxml import html as lxml_html
+from selenium.common.exceptions import NoSuchFrameException, StaleElementReferenceException
+
+from services.diario import (
+    FIND_MANY_TEXTAREAS_JS, FILL_TEXTAREA_JS, READ_MANY_VALUES_JS, CLICK_SAVE_BUTTON_JS,
+)
+from services.readiness import WAIT_FOR_LABELS_JS
+from services.frames import PROBE_DIARY_JS
+from services.scrape import SCRAPE_DIARY_JS
+from services.matcher import ROW_INDEX_JS
+from services.layout import LAYOUT_SKELETON_JS
+
+# WebDriver em memória para testar/perfilar o preenchimento sem navegador.
+# Não executa JavaScript: cada script do projeto (pela string exata) é atendido por
+# uma implementação em Python com a mesma semântica sobre um DOM lxml. Scripts
+# desconhecidos levantam NotImplementedError.
+
+_ROW_SELECTORS = ("tr", ".row", ".linha", ".form-group", "li", ".item")
+_LABEL_DATE_RE = re.compile(r"\d{1,2}/\d{1,2}/\d{2,4}")
+_SAVE_RE = re.compile(r"\b(salvar|gravar)\b")
+_SKIP_TEXT = ("textarea", "script", "style", "select")
+READ_VALUE_JS = "return arguments[0].value || '';"
+
+
+def _norm(s: str) -> str:
+    s = unicodedata.normalize("NFD", (s or "").lower())
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.replace("–", "-").replace("—", "-")
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def _matches(el, selector: str) -> bool:
+    """Subconjunto de CSS usado pelos scripts: 'tag', '.classe', listas com vírgula."""
+    if not isinstance(el.tag, str):
+        return False
+    for sel in selector.split(","):
+        sel = sel.strip()
+        if sel.startswith("."):
+            if sel[1:] in (el.get("class") or "").split():
+                return True
+        elif el.tag == sel:
+            return True
+    return False
+
+
+class _Timeouts:
+    def __init__(self):
+        self.script = 30.0
+
+
+class _SwitchTo:
+    """Documento único: trocar para o topo é no-op; não há frames."""
+
+    def default_content(self) -> None:
+        pass
+
+    def parent_frame(self) -> None:
+        pass
+
+    def frame(self, ref) -> None:
+        raise NoSuchFrameException("FakeDriver não suporta frames.")
+
+
+class FakeDriver:
+    """Substituto de WebDriver sobre HTML salvo (ver tools/pages.py para gerar páginas).
+
+    - `pages`: {url: html} ou função url -> html usada por get()/refresh().
+    - Salvar (CLICK_SAVE_BUTTON_JS) grava os valores atuais na página da URL, então
+      um get() posterior devolve o conteúdo "salvo", como o portal.
+    - `on_change(driver, textarea)`: gancho após cada preenchimento (ex.: re-render).
+    - `calls` conta execuções por script; `saves` conta cliques em Salvar.
+    """
+
+    def __init__(
+        self,
+        pages: Union[Dict[str, str], Callable[[str], str], str],
+        url: str = "http://portal.local/diario",
+        *,
+        on_change: Optional[Callable[["FakeDriver", object], None]] = None,
+    ):
+        if isinstance(pages, str):
+            pages = {url: pages}
+        self._pages = pages
+        self.on_change = on_change
+        self.timeouts = _Timeouts()
+        self.switch_to = _SwitchTo()
+        self.calls: Counter = Counter()
+        self.saves = 0
+        self._values: Dict[object, str] = {}
+        self._handlers: Dict[str, tuple] = {
+            FIND_MANY_TEXTAREAS_JS: ("find_many", self._js_find_many),
+            FILL_TEXTAREA_JS: ("fill", self._js_fill),
+            READ_MANY_VALUES_JS: ("read_many", self._js_read_many),
+            CLICK_SAVE_BUTTON_JS: ("click_save", self._js_click_save),
+            PROBE_DIARY_JS: ("probe", self._js_probe),
+            SCRAPE_DIARY_JS: ("scrape", self._js_scrape),
+            ROW_INDEX_JS: ("row_index", self._js_row_index),
+            LAYOUT_SKELETON_JS: ("skeleton", self._js_skeleton),
+            READ_VALUE_JS: ("read_value", self._js_read_value),
+        }
+        self.get(url)
+
+    # ---------- navegação ----------
+    def _load(self, url: str) -> str:
+        return self._pages(url) if callable(self._pages) else self._pages[url]
+
+    def get(self, url: str) -> None:
+        self.current_url = url
+        self._root = lxml_html.document_fromstring(self._load(url))
+        self._values = {}
+
+    def refresh(self) -> None:
+        self.get(self.current_url)
+
+    @property
+    def page_source(self) -> str:
+        for ta in self._textareas():
+            ta.text = self._value(ta)
+        return lxml_html.tostring(self._root, encoding="unicode")
+
+    def set_script_timeout(self, seconds: float) -> None:
+        self.timeouts.script = seconds
+
+    def find_elements(self, by: str, value: str) -> List[object]:
+        if value in ("iframe, frame", "iframe", "frame"):
+            return []
+        return [el for el in self._root.iter() if _matches(el, value)]
+
+    def quit(self) -> None:
+        pass
+
+    # ---------- execução de scripts ----------
+    def execute_script(self, script: str, *args):
+        handler = self._handlers.get(script)
+        if handler is None:
+            raise NotImplementedError(f"FakeDriver: script não suportado:\n{script[:120]}")
+        name, fn = handler
+        self.calls[name] += 1
+        return fn(*args)
+
+    def execute_async_script(self, script: str, *args):
+        if script != WAIT_FOR_LABELS_JS:
+            raise NotImplementedError(f"FakeDriver: script assíncrono não suportado:\n{script[:120]}")
+        self.calls["wait_labels"] += 1
+        text = _norm(self._root.body.text_content())
+        wanted = [[_norm(a) for a in (l if isinstance(l, list) else [l])] for l in (args[0] if args else [])]
+        missing = [alts[0] for alts in wanted if not any(a in text for a in alts)]
+        return {"ready": not missing, "missing": missing, "elapsed_ms": 0}
+
+    # ---------- DOM ----------
+    def _attached(self, el) -> None:
+        node = el
+        while node is not None and node is not self._root:
+            node = node.getparent()
+        if node is None:
+            raise StaleElementReferenceException("stale element reference: element is not attached to the page document")
+
+    @staticmethod
+    def _visible(el) -> bool:
+        # aproxima offsetParent: oculto por atributo/estilo em si ou num ancestral
+        while el is not None:
+            if el.get("hidden") is not None or "display:none" in (el.get("style") or "").replace(" ", ""):
+                return False
+            el = el.getparent()
+        return True
+
+    def _textareas(self) -> List[object]:
+        return list(self._root.iter("textarea"))
+
+    def _value(self, ta) -> str:
+        v = self._values.get(ta)
+        return v if v is not None else (ta.text or "")
+
+    @staticmethod
+    def _label_text(node) -> str:
+        parts = node.xpath(".//text()[not(" + " or ".join(f"ancestor::{t}" for t in _SKIP_TEXT) + ")]")
+        return re.sub(r"\s+", " ", " ".join(parts)).strip()
+
+    @staticmethod
+    def _closest(el, selector: str):
+        while el is not None:
+            if _matches(el, selector):
+                return el
+            el = el.getparent()
+        return None
+
+    def _find_related(self, key: str):
+        """Mesma busca de FIND_RELATED_TEXTAREA_JS (linhas, <td> seguinte, irmãos)."""
+        key = _norm(key)
+        body = self._root.body
+        rows = []
+        for sel in _ROW_SELECTORS:
+            rows.extend(el for el in body.iter() if _matches(el, sel))
+        rows = [r for r in rows if self._visible(r) and key in _norm(r.text_content())]
+        for row in rows:
+            ta = next(row.iterdescendants("textarea"), None)
+            if ta is not None:
+                return ta
+            if row.tag == "tr":
+                tds = list(row)
+                idx = next((i for i, td in enumerate(tds) if key in _norm(td.text_content())), -1)
+                if idx >= 0:
+                    for td in tds[idx + 1:]:
+                        ta = next(td.iterdescendants("textarea"), None)
+                        if ta is not None:
+                            return ta
+        for el in body.iterdescendants():
+            if not isinstance(el.tag, str) or not self._visible(el) or key not in _norm(el.text_content()):
+                continue
+            sib = el.getnext()
+            for _ in range(5):
+                if sib is None:
+                    break
+                if sib.tag == "textarea":
+                    return sib
+                inside = next(sib.iterdescendants("textarea"), None)
+                if inside is not None:
+                    return inside
+                sib = sib.getnext()
+            inside = next(el.iterdescendants("textarea"), None)
+            if inside is not None:
+                return inside
+        return None
+
+    def _label_with_how(self, ta, only: Optional[str] = None):
+        if only != "sibling":
+            row = self._closest(ta, only or ", ".join(_ROW_SELECTORS))
+            if row is not None:
+                t = self._label_text(row)
+                if _LABEL_DATE_RE.search(t):
+                    return t, only or next(s for s in _ROW_SELECTORS if _matches(row, s))
+            if only:
+                return "", ""
+        sib = ta.getprevious()
+        for _ in range(5):
+            if sib is None:
+                break
+            t = self._label_text(sib)
+            if _LABEL_DATE_RE.search(t):
+                return t, "sibling"
+            sib = sib.getprevious()
+        return "", ""
+
+    # ---------- implementações dos scripts ----------
+    def _js_find_many(self, keys):
+        return [self._find_related(k) for k in (keys or [])]
+
+    def _js_fill(self, ta, text, highlight=False):
+        self._attached(ta)
+        self._values[ta] = text or ""
+        if self.on_change:
+            self.on_change(self, ta)
+        return True
+
+    def _js_read_many(self, keys):
+        return [None if ta is None else self._value(ta) for ta in self._js_find_many(keys)]
+
+    def _js_read_value(self, ta):
+        self._attached(ta)
+        return self._value(ta)
+
+    def _js_click_save(self):
+        best = None
+        for el in self._root.body.iter():
+            if not isinstance(el.tag, str) or not self._visible(el) or el.get("disabled") is not None:
+                continue
+            clickable = (
+                el.tag == "button" or el.get("onclick") is not None
+                or (el.tag == "input" and el.get("type") in ("submit", "button"))
+                or (el.tag == "a" and (el.get("role") == "button" or _matches(el, ".btn")))
+            )
+            if not clickable:
+                continue
+            label = _norm(el.text_content() or el.get("value") or el.get("title") or el.get("aria-label") or "")
+            if _SAVE_RE.search(label) and (best is None or len(label) < len(best)):
+                best = label
+        if best is None:
+            return False
+        self.saves += 1
+        saved = self.page_source
+        if isinstance(self._pages, dict):
+            self._pages[self.current_url] = saved
+        return True
+
+    def _js_probe(self, dates):
+        body = self._root.body
+        tas = len(self._textareas())
+        if body is None or not tas:
+            return 0
+        text = re.sub(r"\s+", " ", body.text_content())
+        hits = sum(1 for d in (dates or []) if any(a in text for a in (d if isinstance(d, list) else [d])))
+        return hits * 1000 + min(tas, 999) if hits else 0
+
+    def _js_scrape(self):
+        out = []
+        for ta in self._textareas():
+            if self._visible(ta):
+                label, _how = self._label_with_how(ta)
+                if label:
+                    out.append([label, self._value(ta)])
+        return out
+
+    def _js_row_index(self, only=None):
+        out = []
+        for ta in self._textareas():
+            if self._visible(ta):
+                label, how = self._label_with_how(ta, only or None)
+                if label or only:
+                    out.append([label, ta, how])
+        return out
+
+    def _js_skeleton(self):
+        def sig(el) -> str:
+            cls = sorted(filter(None, (re.sub(r"\d+", "", c) for c in (el.get("class") or "").split())))
+            return el.tag + ("." + ".".join(cls) if cls else "")
+
+        shapes = set()
+        body = self._root.body
+        for ta in self._textareas():
+            if not self._visible(ta):
+                continue
+            chain, el = [], ta
+            for _ in range(5):
+                if el is None or el is body:
+                    break
+                chain.append(sig(el))
+                el = el.getparent()
+            prev = ta.getprevious()
+            shapes.add("<".join(chain) + (" ~" + sig(prev) if prev is not None else ""))
+        return sorted(shapes)
+
+
+def rerender_on_change(every: int = 1) -> Callable[[FakeDriver, object], None]:
+    """Gancho on_change que re-renderiza a tabela (textareas novos) a cada `every` preenchimentos,
+    invalidando as referências já resolvidas, como um portal que redesenha após 'change'."""
+    state = {"n": 0}
+
+    def _hook(driver: FakeDriver, _ta) -> None:
+        state["n"] += 1
+        if state["n"] % every:
+            return
+        values = {ta: driver._value(ta) for ta in driver._textareas()}
+        for ta, v in values.items():
+            clone = lxml_html.fromstring(lxml_html.tostring(ta))
+            clone.tail = ta.tail
+            ta.getparent().replace(ta, clone)
+            driver._values.pop(ta, None)
+            driver._values[clone] = v
+
+    return _hook
+
+
+def benchmark(pages: int = 200, rows: int = 60, layouts=None, **fill_kw) -> dict:
+    """Preenche+salva+verifica `pages` páginas geradas por layout; devolve tempos e contagens."""
+    from services.diario import fill_entries, try_click_save
+    from services.verify import verify_saved
+    from tools.pages import LAYOUTS, diary_html, generate_entries
+
+    quiet = lambda _msg: None
+    fill_kw.setdefault("layout_cache", None)  # páginas geradas não entram no cache real
+    result: dict = {}
+    for layout in layouts or LAYOUTS:
+        totals = Counter()
+        t0 = time.perf_counter()
+        for i in range(pages):
+            entries = generate_entries(rows, seed=i)
+            url = f"http://portal.local/diario?layout={layout}&turma={i}"
+            drv = FakeDriver({url: diary_html(entries.keys(), layout)}, url)
+            ok, nf, sk = fill_entries(drv, entries, quiet, **fill_kw)
+            try_click_save(drv, quiet)
+            rep = verify_saved(drv, entries, quiet, out_dir=None)
+            totals.update(ok=ok, not_found=nf, skipped=sk, verified=rep["summary"]["verified"])
+            totals.update(drv.calls)
+        elapsed = time.perf_counter() - t0
+        result[layout] = {"pages": pages, "rows": rows, "seconds": round(elapsed, 3),
+                          "ms_per_page": round(elapsed * 1000 / max(pages, 1), 2), **totals}
+    return result
+
+
+if __name__ == "__main__":
+    import argparse, json
+
+    ap = argparse.ArgumentParser(description="Preenchimento em massa contra o FakeDriver (sem navegador).")
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--layout", action="append", help="repita para vários; padrão: todos")
+    args = ap.parse_args()
+    print(json.dumps(benchmark(args.pages, args.rows, args.layout), indent=2, ensure_ascii=False))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+import datetime, html, random
+from typing import Dict, Iterable, List, Optional
+
+# Páginas de diário sintéticas nos layouts que o preenchimento reconhece
+# (usadas pelo FakeDriver e pelo servidor local de testes).
+LAYOUTS = ("table", "table-inline", "form-group", "sibling")
+
+_WEEKDAYS = ("Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom")
+_WORDS = (
+    "introdução sensores temperatura medição termopar discussão erros aplicação processo "
+    "industrial exercício prático válvulas controle pressão nível vazão calibração"
+).split()
+
+
+def generate_keys(n: int, start: datetime.date = datetime.date(2025, 3, 10)) -> List[str]:
+    """n chaves 'DD/MM/AAAA -X' em dias úteis, alternando teórica/prática no mesmo dia."""
+    keys: List[str] = []
+    day = start
+    while len(keys) < n:
+        if day.weekday() < 5:
+            for suffix in ("T", "P"):
+                if len(keys) < n:
+                    keys.append(f"{day.strftime('%d/%m/%Y')} -{suffix}")
+        day += datetime.timedelta(days=1)
+    return keys
+
+
+def generate_entries(n: int, seed: Optional[int] = 0, **kw) -> Dict[str, str]:
+    rnd = random.Random(seed)
+    return {k: " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(4, 14))).capitalize()
+            for k in generate_keys(n, **kw)}
+
+
+def row_label(key: str, style: str = "key") -> str:
+    """Rótulo exibido para a chave.
+
+    'key'  -> '10/06/2025 -P' (texto exato da chave)
+    'long' -> 'Ter 10/06/2025 (P)'
+    'short'-> 'Ter 10/06/25 (P)'
+    """
+    date, _, suffix = key.partition(" -")
+    if style == "key":
+        return key
+    d = datetime.datetime.strptime(date, "%d/%m/%Y").date()
+    shown = d.strftime("%d/%m/%y") if style == "short" else date
+    return f"{_WEEKDAYS[d.weekday()]} {shown} ({suffix[:1]})"
+
+
+def diary_html(
+    entries: Dict[str, str] | Iterable[str],
+    layout: str = "table",
+    *,
+    label_style: str = "key",
+    title: str = "Diário de classe",
+    save_label: str = "Salvar",
+    extra_head: str = "",
+    extra_body: str = "",
+) -> str:
+    """HTML de um diário com uma linha (rótulo + textarea) por entrada."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout desconhecido: {layout!r} (use {', '.join(LAYOUTS)})")
+    values = entries if isinstance(entries, dict) else {k: "" for k in entries}
+    esc = html.escape
+    rows: List[str] = []
+    for i, (key, value) in enumerate(values.items()):
+        label, ta = esc(row_label(key, label_style)), f'<textarea name="aula_{i}" rows="2">{esc(value)}</textarea>'
+        if layout == "table":
+            rows.append(f"<tr><td class=\"data\">{label}</td><td>{ta}</td></tr>")
+        elif layout == "table-inline":
+            rows.append(f"<tr><td><span class=\"data\">{label}</span><br>{ta}</td></tr>")
+        elif layout == "form-group":
+            rows.append(f"<div class=\"form-group\"><label>{label}</label>{ta}</div>")
+        else:
+            rows.append(f"<span class=\"data\">{label}</span>{ta}")
+    body = "\n".join(rows)
+    if layout.startswith("table"):
+        body = f"<table class=\"diario\"><tbody>\n{body}\n</tbody></table>"
+    return (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\"><head><meta charset=\"utf-8\">"
+        f"<title>{esc(title)}</title>{extra_head}</head><body>\n<h1>{esc(title)}</h1>\n{body}\n"
+        f"<button type=\"button\" id=\"salvar\">{esc(save_label)}</button>\n{extra_body}</body></html>"
+    )
@@ -0,0 +1,370 @@
+from __future__ import annotations
+import hashlib, html, json, random, secrets, threading, time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from tools.pages import LAYOUTS, diary_html, generate_entries
+
+# Portal docente local para testes de carga e regressão (sem rede).
+#
+#   GET  /                      lista de turmas (exige sessão)
+#   GET  /login  | POST /login  abre sessão (cookie 'sid'); qualquer usuário/senha
+#   GET  /diario?turma=T        diário da turma (no layout configurado)
+#   GET  /diario/frame?turma=T  conteúdo do diário quando frame=True
+#   POST /diario/salvar?turma=T grava {name: texto} (JSON ou formulário)
+#   GET  /api/diario?turma=T    estado salvo da turma em JSON {chave: texto}
+#   GET  /stats                 contadores do servidor
+#
+# Injeções: latência (+ jitter), re-render da tabela após 'change', linhas
+# renderizadas por JS com atraso, expiração de sessão e limite de requisições/s.
+# Páginas HTML levam ETag e respondem 304 a If-None-Match (GET condicional).
+
+_PAGE_SCRIPT = r"""
+<script>
+(function(){
+  const TURMA = %(turma)s, RERENDER_MS = %(rerender_ms)d;
+  document.getElementById('salvar').addEventListener('click', function(){
+    const data = {};
+    document.querySelectorAll('textarea').forEach(ta => { data[ta.name] = ta.value; });
+    fetch('/diario/salvar?turma=' + encodeURIComponent(TURMA), {
+      method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(data)
+    }).then(r => r.json()).then(r => {
+      document.getElementById('status').textContent = r.ok ? ('Salvo: ' + r.saved) : ('Erro: ' + r.error);
+    });
+  });
+  if (RERENDER_MS > 0){
+    // o portal redesenha a linha após 'change': o textarea antigo deixa de existir
+    document.addEventListener('change', function(ev){
+      const ta = ev.target;
+      if (!ta || ta.tagName !== 'TEXTAREA') return;
+      setTimeout(function(){
+        if (!ta.parentNode) return;
+        const clone = ta.cloneNode(true);
+        clone.value = ta.value;
+        ta.parentNode.replaceChild(clone, ta);
+      }, RERENDER_MS);
+    }, true);
+  }
+})();
+</script>
+"""
+
+# linhas inseridas por JS após um atraso (testa a espera por prontidão)
+_DEFERRED_SCRIPT = r"""
+<template id="diario-tpl">%(content)s</template>
+<script>
+setTimeout(function(){
+  const tpl = document.getElementById('diario-tpl');
+  document.getElementById('diario-slot').appendChild(tpl.content.cloneNode(true));
+}, %(delay)d);
+</script>
+"""
+
+
+class PortalState:
+    """Turmas, conteúdo salvo, sessões e contadores (compartilhado entre threads)."""
+
+    def __init__(
+        self,
+        turmas: int = 3,
+        rows: int = 60,
+        layout: str = "table",
+        *,
+        label_style: str = "key",
+        prefilled: float = 0.0,
+        seed: int = 0,
+    ):
+        self.lock = threading.Lock()
+        self.label_style = label_style
+        self.turmas: Dict[str, dict] = {}
+        rnd = random.Random(seed)
+        for i in range(turmas):
+            code = f"T{i + 1:02d}"
+            entries = generate_entries(rows, seed=seed + i)
+            saved = {k: (v if rnd.random() < prefilled else "") for k, v in entries.items()}
+            lay = LAYOUTS[i % len(LAYOUTS)] if layout == "mixed" else layout
+            self.turmas[code] = {"layout": lay, "keys": list(entries), "saved": saved}
+        self.sessions: Dict[str, float] = {}  # sid -> criada em (monotonic)
+        self.hits: Dict[str, list] = {}       # sid -> instantes das últimas requisições
+        self.stats = {"requests": 0, "pages": 0, "saves": 0, "saved_fields": 0,
+                      "throttled": 0, "expired": 0, "logins": 0, "not_modified": 0}
+
+    def bump(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[name] += n
+
+
+class PortalStub:
+    """Servidor HTTP local do portal; use start()/stop() ou `with PortalStub(...) as p:`."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        state: Optional[PortalState] = None,
+        latency_ms: int = 0,
+        jitter_ms: int = 0,
+        rerender_ms: int = 0,
+        render_delay_ms: int = 0,
+        session_ttl: float = 0.0,
+        rate_limit: float = 0.0,
+        frame: bool = False,
+        require_login: bool = True,
+    ):
+        self.state = state or PortalState()
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.rerender_ms, self.render_delay_ms = rerender_ms, render_delay_ms
+        self.session_ttl, self.rate_limit = session_ttl, rate_limit
+        self.frame, self.require_login = frame, require_login
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "PortalStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "PortalStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def login(self) -> str:
+        """Abre uma sessão sem passar pelo formulário (para clientes HTTP de teste)."""
+        sid = secrets.token_hex(8)
+        with self.state.lock:
+            self.state.sessions[sid] = time.monotonic()
+        self.state.bump("logins")
+        return sid
+
+    # ---------- páginas ----------
+    def render_diary(self, code: str, *, inner: bool = False) -> str:
+        t = self.state.turmas[code]
+        with self.state.lock:
+            values = {k: t["saved"].get(k, "") for k in t["keys"]}
+        title = f"Diário de classe – Turma {code}"
+        if self.frame and not inner:
+            return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>"
+                    f"<body><iframe src=\"/diario/frame?turma={code}\" width=\"100%\" height=\"900\"></iframe></body></html>")
+        script = _PAGE_SCRIPT % {"turma": json.dumps(code), "rerender_ms": self.rerender_ms}
+        page = diary_html(values, t["layout"], label_style=self.state.label_style, title=title,
+                          extra_body="<p id=\"status\"></p>" + script)
+        if self.render_delay_ms > 0:
+            start, end = page.index("</h1>") + len("</h1>"), page.index("<button")
+            content = page[start:end]
+            deferred = _DEFERRED_SCRIPT % {"content": content, "delay": self.render_delay_ms}
+            page = page[:start] + "\n<div id=\"diario-slot\"></div>\n" + deferred + page[end:]
+        return page
+
+    def render_index(self) -> str:
+        links = "".join(
+            f"<li><a href=\"/diario?turma={c}\">Turma {c}</a> ({t['layout']}, {len(t['keys'])} aulas)</li>"
+            for c, t in self.state.turmas.items()
+        )
+        return f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Portal docente</title></head><body><ul>{links}</ul></body></html>"
+
+    def save(self, code: str, fields: Dict[str, str]) -> int:
+        t = self.state.turmas[code]
+        n = 0
+        with self.state.lock:
+            for name, text in fields.items():
+                if not name.startswith("aula_"):
+                    continue
+                try:
+                    key = t["keys"][int(name[5:])]
+                except (ValueError, IndexError):
+                    continue
+                t["saved"][key] = str(text)
+                n += 1
+        self.state.bump("saves")
+        self.state.bump("saved_fields", n)
+        return n
+
+    # ---------- HTTP ----------
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):  # silencioso
+                pass
+
+            def _send(self, status: int, body: str, ctype: str = "text/html; charset=utf-8", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _page(self, body: str):
+                """200 com ETag; 304 sem corpo se o cliente já tem a mesma versão."""
+                etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:20] + '"'
+                if etag in (self.headers.get("If-None-Match") or ""):
+                    stub.state.bump("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(200, body, headers={"ETag": etag})
+
+            def _json(self, status: int, obj, headers=None):
+                self._send(status, json.dumps(obj, ensure_ascii=False), "application/json; charset=utf-8", headers)
+
+            def _sid(self) -> Optional[str]:
+                cookie = SimpleCookie(self.headers.get("Cookie") or "")
+                return cookie["sid"].value if "sid" in cookie else None
+
+            def _gate(self, path: str) -> bool:
+                """Latência, sessão e limite de taxa. False = resposta já enviada."""
+                stub.state.bump("requests")
+                if stub.latency_ms or stub.jitter_ms:
+                    time.sleep((stub.latency_ms + random.uniform(0, stub.jitter_ms)) / 1000.0)
+                if not stub.require_login or path in ("/login", "/stats"):
+                    return True
+                sid = self._sid()
+                now = time.monotonic()
+                with stub.state.lock:
+                    created = stub.state.sessions.get(sid) if sid else None
+                    expired = created is not None and stub.session_ttl and now - created > stub.session_ttl
+                    if expired:
+                        del stub.state.sessions[sid]
+                if created is None or expired:
+                    if expired:
+                        stub.state.bump("expired")
+                    if self.command == "GET" and not path.startswith("/api/"):
+                        self._send(302, "", headers={"Location": "/login?next=" + self.path})
+                    else:
+                        self._json(401, {"ok": False, "error": "sessão expirada"})
+                    return False
+                if stub.rate_limit > 0:
+                    with stub.state.lock:
+                        hits = [t for t in stub.state.hits.get(sid, []) if now - t < 1.0]
+                        throttled = len(hits) >= stub.rate_limit
+                        if not throttled:
+                            hits.append(now)
+                        stub.state.hits[sid] = hits
+                    if throttled:
+                        stub.state.bump("throttled")
+                        self._json(429, {"ok": False, "error": "muitas requisições"}, {"Retry-After": "1"})
+                        return False
+                return True
+
+            def _turma(self, query: dict) -> Optional[str]:
+                code = (query.get("turma") or [""])[0]
+                if code in stub.state.turmas:
+                    return code
+                self._send(404, "<h1>Turma não encontrada</h1>")
+                return None
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                if not self._gate(parts.path):
+                    return
+                if parts.path == "/login":
+                    nxt = html.escape((query.get("next") or ["/"])[0])
+                    self._send(200, "<!DOCTYPE html><html><body><form method=\"post\" action=\"/login\">"
+                                    f"<input name=\"user\"><input name=\"password\" type=\"password\">"
+                                    f"<input type=\"hidden\" name=\"next\" value=\"{nxt}\">"
+                                    "<button type=\"submit\">Entrar</button></form></body></html>")
+                elif parts.path == "/":
+                    self._page(stub.render_index())
+                elif parts.path in ("/diario", "/diario/frame"):
+                    code = self._turma(query)
+                    if code:
+                        stub.state.bump("pages")
+                        self._page(stub.render_diary(code, inner=parts.path.endswith("/frame")))
+                elif parts.path == "/api/diario":
+                    code = self._turma(query)
+                    if code:
+                        with stub.state.lock:
+                            self._json(200, dict(stub.state.turmas[code]["saved"]))
+                elif parts.path == "/stats":
+                    with stub.state.lock:
+                        self._json(200, dict(stub.state.stats))
+                else:
+                    self._send(404, "<h1>Não encontrado</h1>")
+
+            def do_POST(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length).decode("utf-8") if length else ""
+                if not self._gate(parts.path):
+                    return
+                ctype = self.headers.get("Content-Type") or ""
+                if "json" in ctype:
+                    try:
+                        fields = json.loads(raw or "{}")
+                    except ValueError:
+                        self._json(400, {"ok": False, "error": "JSON inválido"})
+                        return
+                else:
+                    fields = {k: v[-1] for k, v in parse_qs(raw, keep_blank_values=True).items()}
+                if parts.path == "/login":
+                    sid = stub.login()
+                    nxt = fields.get("next") or "/"
+                    self._send(302, "", headers={"Location": nxt, "Set-Cookie": f"sid={sid}; Path=/; HttpOnly"})
+                elif parts.path == "/diario/salvar":
+                    code = self._turma(query)
+                    if code:
+                        self._json(200, {"ok": True, "saved": stub.save(code, fields)})
+                else:
+                    self._send(404, "<h1>Não encontrado</h1>")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Portal docente local para testes (sem rede).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--turmas", type=int, default=3)
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--layout", default="table", choices=list(LAYOUTS) + ["mixed"])
+    ap.add_argument("--label-style", default="key", choices=["key", "long", "short"])
+    ap.add_argument("--prefilled", type=float, default=0.0, help="fração de aulas já salvas")
+    ap.add_argument("--latency-ms", type=int, default=0)
+    ap.add_argument("--jitter-ms", type=int, default=0)
+    ap.add_argument("--rerender-ms", type=int, default=0, help="redesenha o textarea N ms após 'change'")
+    ap.add_argument("--render-delay-ms", type=int, default=0, help="insere as linhas por JS após N ms")
+    ap.add_argument("--session-ttl", type=float, default=0.0, help="segundos até a sessão expirar (0 = nunca)")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="requisições/s por sessão (0 = sem limite)")
+    ap.add_argument("--frame", action="store_true", help="serve o diário dentro de um iframe")
+    ap.add_argument("--no-login", action="store_true")
+    args = ap.parse_args()
+
+    state = PortalState(args.turmas, args.rows, args.layout, label_style=args.label_style, prefilled=args.prefilled)
+    stub = PortalStub(
+        args.host, args.port, state=state, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        rerender_ms=args.rerender_ms, render_delay_ms=args.render_delay_ms, session_ttl=args.session_ttl,
+        rate_limit=args.rate_limit, frame=args.frame, require_login=not args.no_login,
+    )
+    print(f"Portal local em {stub.url}  (UFU_GET_URL={stub.url}/login)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
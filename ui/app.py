@@ -1,23 +1,44 @@
 from __future__ import annotations
-import json, threading, re
+import bisect, datetime, json, os, threading, re
 from typing import Dict, Optional
 from tkinter import (
     Tk, Frame, Button, Listbox, Text, Scrollbar, END, SINGLE, BOTH, LEFT, RIGHT, Y, X, TOP, BOTTOM,
-    filedialog, simpledialog, messagebox, StringVar
+    filedialog, simpledialog, messagebox, StringVar, BooleanVar
 )
 from tkinter import ttk
 from openpyxl import load_workbook
 from selenium.webdriver.remote.webdriver import WebDriver
 
 # project services (já existentes no seu projeto)
-from services.drivers import create_driver
-from services.utils import GET_URL, validate_value_map, preview_text
+from services.standby import StandbyBrowser
+from services.utils import GET_URL, OUT_DIR, check_key, normalize_label, validate_entry, preview_text
 from services.diario import fill_entries, try_click_save
+from services.scrape import scrape_diary, scrape_url
+from services.verify import verify_after_save
+from services.frames import diary_document_url
+from services.repository import DiaryRepository
+from services.discovery import session_from_driver, discover_turmas
+from services.batch import fill_turmas
+from services.pacing import AimdPacer
+from services.watch import FileWatcher
+from services.journal import Journal, write_json_atomic
+from services.profiling import Profiler, instrument_actions
 
 # ui & features
-from ui.dialogs import ask_edit_item, choose_from_list, ask_shift_params
+from ui.dialogs import ask_edit_item, choose_from_list, choose_many, ask_shift_params, browse_repository
 from features.excel_import import process_worksheet
+from features.excel_export import write_back_statuses, export_run_report, run_report_rows
 from features.date_shift import shift_value_map
+from features.merge import diff_maps, three_way_merge
+from features.workspace import Workspace, next_dataset_name
+from features.history import History, PMap
+from features.search import SearchIndex, filter_keys
+from features.validation import ValidationState
+
+# pausa na digitação antes de filtrar a lista (cada tecla reinicia a contagem)
+SEARCH_DEBOUNCE_MS = 150
+# acima disto (entradas alteradas de uma vez), reordenar/redesenhar tudo sai mais barato que linha a linha
+ROW_UPDATE_LIMIT = 2000
 
 
 class App(Tk):
@@ -29,10 +50,53 @@ class App(Tk):
 
         self.driver: Optional[WebDriver] = None
         self.value_map: Dict[str, str] = {}
+        # conteúdo como carregado (base da mesclagem com o portal); versão imutável do histórico
+        self.base_map: PMap = PMap()
         self.current_path: Optional[str] = None
         self.browser_var = StringVar(value="edge")
+        self.lean_var = BooleanVar(value=os.environ.get("UFU_LEAN", "0") == "1")
+        self.verify_var = BooleanVar(value=True)
+        self.last_run: dict = {}  # relatórios do último preenchimento ('fill', 'verify')
+        self.repo: Optional[DiaryRepository] = None
+        self.current_turma: Optional[tuple[str, str]] = None  # (semestre, turma) aberta do arquivo
+        # várias turmas abertas ao mesmo tempo; value_map é o dataset ativo
+        self.workspace = Workspace()
+        self.current_dataset = next_dataset_name(self.workspace)
+        self.value_map = self.workspace.set_dataset(self.current_dataset, {})
+        self._ds_dirty = False  # dataset ativo alterado desde o último _intern_current
+        self.dataset_var = StringVar(value=self.current_dataset)
+        self._histories: Dict[str, History] = {self.current_dataset: History()}  # desfazer/refazer por turma
+        self._indexes: Dict[str, SearchIndex] = {}  # busca por turma, atualizada pelos deltas do histórico
+        self.search_var = StringVar()
+        self._visible_keys: list[str] = []  # chaves na ordem exibida na lista (após o filtro)
+        self._search_job: Optional[str] = None  # busca agendada (debounce da digitação)
+        # modo observação: reimporta dados.json/planilha quando mudam no disco
+        self.watcher = FileWatcher()
+        # caminho -> (turma, validação incremental do arquivo); também é o "antes" do modo observação
+        self._sources: Dict[str, tuple[str, ValidationState]] = {}
+        self.watch_var = BooleanVar(value=os.environ.get("UFU_WATCH", "0") == "1")
+        self._watch_ms = int(os.environ.get("UFU_WATCH_MS", "1500"))
+        # salvamento automático: cada operação vai para um diário append-only
+        self.journal = Journal(self._dataset_snapshot)
+        # ritmo adaptativo (AIMD) único para o portal: descoberta por HTTP e preenchimento em lote
+        self.pacer = AimdPacer(logger=self._log_async)  # observa de threads do pool
+        # modo perfil: cProfile + tracemalloc em cada ação/tarefa (UFU_PROFILE=1 ou "Perfilar")
+        self.profile_var = BooleanVar(value=os.environ.get("UFU_PROFILE", "0") == "1")
+        self.profiler = Profiler(logger=self._log, enabled=self.profile_var.get())
+        instrument_actions(self, self.profiler)
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<Control-z>", lambda _e: self.on_undo())
+        self.bind("<Control-y>", lambda _e: self.on_redo())
+        self.after(self._watch_ms, self._poll_watch)
+        self.after(200, self._offer_recovery)
+
+        # sessão de navegador pré-aquecida, fora da tela até "Start Navegador" (UFU_PREWARM=0 desliga)
+        self.standby = StandbyBrowser(logger=self._log)
+        self._prewarm = os.environ.get("UFU_PREWARM", "1") == "1"
+        if self._prewarm:
+            self.standby.prewarm(self.browser_var.get(), self._profile())
 
     # ---------- UI ----------
     def _build_ui(self):
@@ -44,6 +108,9 @@ class App(Tk):
             values=["edge", "chrome", "firefox"], width=10
         )
         self.cbo_browser.pack(side=LEFT, padx=(0, 8), pady=6)
+        self.cbo_browser.bind("<<ComboboxSelected>>", self.on_browser_selected)
+        ttk.Checkbutton(top, text="Perfil leve", variable=self.lean_var,
+                        command=self.on_browser_selected).pack(side=LEFT, padx=(0, 8), pady=6)
 
         self.btn_open_browser = Button(top, text="Start Navegador", command=self.on_open_browser)
         self.btn_open_browser.pack(side=LEFT, padx=4, pady=6)
@@ -54,10 +121,42 @@ class App(Tk):
         self.btn_import_excel = Button(top, text="Importar Excel", command=self.on_import_excel)
         self.btn_import_excel.pack(side=LEFT, padx=4, pady=6)
 
+        self.btn_pull_portal = Button(top, text="Ler do portal", command=self.on_pull_portal)
+        self.btn_pull_portal.pack(side=LEFT, padx=4, pady=6)
+
+        self.btn_turmas = Button(top, text="Turmas do portal", command=self.on_discover_turmas)
+        self.btn_turmas.pack(side=LEFT, padx=4, pady=6)
+
+        self.btn_repository = Button(top, text="Arquivo", command=self.on_open_repository)
+        self.btn_repository.pack(side=LEFT, padx=4, pady=6)
+
+        ttk.Checkbutton(top, text="Observar arquivos", variable=self.watch_var).pack(side=LEFT, padx=(8, 4), pady=6)
+        ttk.Checkbutton(top, text="Perfilar", variable=self.profile_var,
+                        command=self._toggle_profiling).pack(side=LEFT, padx=4, pady=6)
+
         main = Frame(self); main.pack(side=TOP, fill=BOTH, expand=True)
         left = Frame(main, width=520); left.pack(side=LEFT, fill=BOTH, expand=True)
         right = Frame(main); right.pack(side=RIGHT, fill=BOTH, expand=True)
 
+        ds_bar = Frame(left); ds_bar.pack(side=TOP, fill=X, padx=6, pady=(6, 0))
+        ttk.Label(ds_bar, text="Turma:").pack(side=LEFT, padx=(0, 2))
+        self.cbo_dataset = ttk.Combobox(ds_bar, textvariable=self.dataset_var, state="readonly",
+                                        values=self.workspace.names(), width=24)
+        self.cbo_dataset.pack(side=LEFT, padx=(0, 4))
+        self.cbo_dataset.bind("<<ComboboxSelected>>", self.on_dataset_selected)
+        Button(ds_bar, text="+", width=2, command=self.on_new_dataset).pack(side=LEFT, padx=2)
+        Button(ds_bar, text="Abrir workspace", command=self.on_open_workspace).pack(side=LEFT, padx=2)
+        Button(ds_bar, text="Salvar workspace", command=self.on_save_workspace).pack(side=LEFT, padx=2)
+
+        search_bar = Frame(left); search_bar.pack(side=TOP, fill=X, padx=6, pady=(6, 0))
+        ttk.Label(search_bar, text="Buscar:").pack(side=LEFT, padx=(0, 2))
+        self.ent_search = ttk.Entry(search_bar, textvariable=self.search_var)
+        self.ent_search.pack(side=LEFT, fill=X, expand=True)
+        self.ent_search.bind("<KeyRelease>", lambda _e: self._schedule_search())
+        self.lbl_errors = ttk.Label(search_bar, text="", foreground="#b00", cursor="hand2")
+        self.lbl_errors.pack(side=LEFT, padx=(6, 0))
+        self.lbl_errors.bind("<Button-1>", lambda _e: self._log_source_errors())
+
         self.listbox = Listbox(left, selectmode=SINGLE)
         self.listbox.pack(side=TOP, fill=BOTH, expand=True, padx=6, pady=6)
 
@@ -67,7 +166,12 @@ class App(Tk):
         self.btn_remove = Button(left_btns, text="Remove", command=self.on_remove_item); self.btn_remove.pack(side=LEFT, padx=4)
         self.btn_shift = Button(left_btns, text="Ajustar datas (±)", command=self.on_shift_dates); self.btn_shift.pack(side=LEFT, padx=4)
         self.btn_save_json = Button(left_btns, text="Salvar JSON", command=self.on_save_json); self.btn_save_json.pack(side=LEFT, padx=4)
+        self.btn_undo = Button(left_btns, text="↶", command=self.on_undo, state="disabled"); self.btn_undo.pack(side=LEFT, padx=(12, 2))
+        self.btn_redo = Button(left_btns, text="↷", command=self.on_redo, state="disabled"); self.btn_redo.pack(side=LEFT, padx=2)
         self.btn_fill = Button(left_btns, text="Preencher diário", command=self.on_fill, state="disabled"); self.btn_fill.pack(side=RIGHT, padx=4)
+        ttk.Checkbutton(left_btns, text="Verificar", variable=self.verify_var).pack(side=RIGHT, padx=4)
+        self.btn_export = Button(left_btns, text="Exportar resultado", command=self.on_export_run, state="disabled")
+        self.btn_export.pack(side=RIGHT, padx=4)
 
         self.logs = Text(right, wrap="word", state="disabled")
         sb = Scrollbar(right, command=self.logs.yview)
@@ -83,15 +187,250 @@ class App(Tk):
         self.logs.see(END)
         self.logs.configure(state="disabled")
 
+    def _log_async(self, msg: str):
+        """_log para threads de trabalho: a escrita no widget acontece na thread do Tk."""
+        self.after(0, self._log, msg)
+
     def _log_clear(self):
         self.logs.configure(state="normal")
         self.logs.delete("1.0", END)
         self.logs.configure(state="disabled")
 
+    def _row_text(self, k: str) -> str:
+        return f"{k}: {preview_text(self.value_map[k])}"
+
+    def _filtered_keys(self) -> list[str]:
+        query = self.search_var.get()
+        hits = self.search_index.search(query) if query.strip() else None
+        return filter_keys(self.value_map, hits)
+
     def _refresh_listbox(self):
+        self._visible_keys = self._filtered_keys()
         self.listbox.delete(0, END)
-        for k, v in self.value_map.items():
-            self.listbox.insert(END, f"{k}: {preview_text(v)}")
+        if self._visible_keys:
+            self.listbox.insert(END, *(self._row_text(k) for k in self._visible_keys))
+
+    def _schedule_search(self, delay_ms: int = SEARCH_DEBOUNCE_MS):
+        """Agenda a busca; cada tecla adia a anterior, então só a última digitação filtra."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(delay_ms, self._apply_search)
+
+    def _apply_search(self):
+        """Aplica o filtro mexendo só nas linhas que saem/entram (os textos não mudam na busca)."""
+        self._search_job = None
+        old, new = self._visible_keys, self._filtered_keys()
+        if new == old:
+            return
+        keep = set(new)
+        kept = [k for k in old if k in keep]
+        kept_set = set(kept)
+        if kept != [k for k in new if k in kept_set]:
+            self._refresh_listbox()  # ordem diferente da exibida: recria tudo
+            return
+        gone = [i for i, k in enumerate(old) if k not in keep]
+        while gone:  # blocos contíguos, de trás para frente
+            last = first = gone.pop()
+            while gone and gone[-1] == first - 1:
+                first = gone.pop()
+            self.listbox.delete(first, last)
+        j, run = 0, []
+        for i, k in enumerate(new):
+            if j < len(kept) and kept[j] == k:
+                j += 1
+                if run:
+                    self.listbox.insert(i - len(run), *(self._row_text(x) for x in run))
+                    run = []
+            else:
+                run.append(k)
+        if run:
+            self.listbox.insert(len(new) - len(run), *(self._row_text(x) for x in run))
+        self._visible_keys = new
+
+    def _refresh_rows(self, changes: Dict[str, Optional[str]]):
+        """Atualiza na lista só as linhas de `changes` (as demais não são recriadas)."""
+        query = self.search_var.get()
+        hits = self.search_index.search(query) if query.strip() else None
+
+        def shown(k: str) -> bool:
+            return k in self.value_map and (hits is None or k in hits)
+
+        pos = {k: i for i, k in enumerate(self._visible_keys)}
+        for i in sorted((pos[k] for k in changes if k in pos and not shown(k)), reverse=True):
+            self.listbox.delete(i)
+            del self._visible_keys[i]
+        pos = {k: i for i, k in enumerate(self._visible_keys)}
+        added = []
+        for k in changes:
+            if not shown(k):
+                continue
+            if k not in pos:
+                added.append(k)
+                continue
+            i = pos[k]
+            self.listbox.delete(i)
+            self.listbox.insert(i, self._row_text(k))
+        for k in added:
+            i = bisect.bisect_left(self._visible_keys, self._key_sort_key(k), key=self._key_sort_key)
+            self._visible_keys.insert(i, k)
+            self.listbox.insert(i, self._row_text(k))
+
+    def _apply_changes(self, changes: Dict[str, Optional[str]]):
+        """Aplica `changes` ao mapa (mantendo a ordem por data) e redesenha só as linhas afetadas.
+
+        Chaves novas entram na posição da data (busca binária) em vez de reordenar o mapa.
+        """
+        self._ds_dirty = True
+        sk = self._key_sort_key
+        new = sorted((k for k, v in changes.items() if v is not None and k not in self.value_map), key=sk)
+        for k, v in changes.items():
+            if v is None:
+                self.value_map.pop(k, None)
+            elif k in self.value_map:
+                self.value_map[k] = v
+        if len(new) > ROW_UPDATE_LIMIT:
+            self.value_map.update((k, changes[k]) for k in new)
+            self.value_map = self._sorted_by_date(self.value_map)
+        elif new:
+            keys = list(self.value_map)
+            items = list(self.value_map.items())
+            for n, k in enumerate(new):  # as anteriores de `new` já entraram antes desta
+                items.insert(bisect.bisect_left(keys, sk(k), key=sk) + n, (k, changes[k]))
+            self.value_map = dict(items)
+        if len(changes) > ROW_UPDATE_LIMIT:
+            self._refresh_listbox()
+        else:
+            self._refresh_rows(changes)
+
+    def _selected_key(self) -> Optional[str]:
+        sel = self.listbox.curselection()
+        if not sel or sel[0] >= len(self._visible_keys):
+            return None
+        return self._visible_keys[sel[0]]
+
+    def _spawn(self, name: str, fn):
+        """Roda `fn` numa thread (perfilada quando o modo perfil está ligado)."""
+        threading.Thread(target=self.profiler.wrap(name, fn), daemon=True).start()
+
+    def _profile(self) -> str:
+        return "lean" if self.lean_var.get() else "default"
+
+    def _intern_current(self):
+        """Guarda o dataset ativo no workspace; textos repetidos passam a ser compartilhados."""
+        self.value_map = self.workspace.set_dataset(self.current_dataset, self.value_map)
+        self._ds_dirty = False
+
+    def _switch_dataset(self, name: str, store_current: bool = True):
+        # sem alterações desde a última internação, o workspace já tem o map ativo
+        if store_current and (self._ds_dirty or self.workspace.dataset(self.current_dataset) is not self.value_map):
+            self._intern_current()
+        self.current_dataset = name
+        self.value_map = self.workspace.dataset(name)  # o próprio map da turma, sem cópia
+        self._ds_dirty = False
+        self.base_map = self.history.current  # snapshot imutável: O(1)
+        self.current_path = None
+        self.current_turma = None
+        self.cbo_dataset.configure(values=self.workspace.names())
+        self.dataset_var.set(name)
+        self._refresh_listbox()
+        self._validate_ready()
+        self._update_history_buttons()
+        self._update_error_label()
+
+    # ---------- Desfazer/refazer ----------
+    @property
+    def history(self) -> History:
+        h = self._histories.get(self.current_dataset)
+        if h is None:
+            h = self._histories[self.current_dataset] = History()
+            h.reset(self.value_map)
+        return h
+
+    def _record(self, label: str, changes: Optional[Dict[str, Optional[str]]] = None, journal: bool = True):
+        """Registra a operação no histórico (changes explícitas ou estado completo) e no autosave."""
+        if changes is None:
+            applied = self.history.commit_map(self.value_map, label)
+        else:
+            applied = self.history.commit(changes, label)
+        self._ds_dirty = True
+        if journal:
+            self._journal(self.current_dataset, applied, label)
+        self._update_search(applied)
+        self._update_history_buttons()
+
+    def _update_history_buttons(self):
+        self.btn_undo.configure(state=("normal" if self.history.can_undo() else "disabled"))
+        self.btn_redo.configure(state=("normal" if self.history.can_redo() else "disabled"))
+
+    def _apply_delta(self, delta: Dict[str, Optional[str]], label: str):
+        self._journal(self.current_dataset, delta, label)
+        self._update_search(delta)
+        self._apply_changes(delta)
+        self._validate_ready()
+        self._update_history_buttons()
+
+    # ---------- Salvamento automático ----------
+    def _dataset_snapshot(self, ds: str) -> Dict[str, str]:
+        return self.value_map if ds == self.current_dataset else self.workspace.dataset(ds)
+
+    def _journal(self, ds: str, changes: Dict[str, Optional[str]], label: str):
+        try:
+            self.journal.append(ds, changes, label)
+        except OSError as e:
+            self._log(f"[autosave] Falha ao registrar alteração: {e}")
+
+    def _offer_recovery(self):
+        """Na abertura: oferece reaplicar alterações que ficaram só no diário (queda/fechamento forçado)."""
+        recovered = Journal.read(self.journal.path)
+        if not recovered:
+            self.journal.forget()
+            return
+        lines = [f"- {ds}: {info['ops'] or 'checkpoint com'} alterações não salvas em "
+                 f"{os.path.basename(info['source'] or '') or 'arquivo'} (última {info['last']})"
+                 for ds, info in recovered.items()]
+        if not messagebox.askyesno(
+            "Recuperar alterações",
+            "Há alterações não salvas da última sessão:\n" + "\n".join(lines) + "\n\nReaplicar?",
+            parent=self,
+        ):
+            self.journal.discard()
+            self.journal.forget()
+            self._log("[autosave] Diário anterior descartado (cópia em autosave.journal.bak).")
+            return
+        for ds, info in recovered.items():
+            self.workspace.set_dataset(ds, self._sorted_by_date(info["value_map"]))
+            self._histories.pop(ds, None)
+            self._indexes.pop(ds, None)
+        self.journal.adopt(recovered)
+        first = next(iter(recovered))
+        self._switch_dataset(first, store_current=self.current_dataset not in recovered)
+        self.current_path = recovered[first]["source"]
+        try:
+            written = self.journal.compact()
+        except OSError as e:
+            self._log(f"[autosave] Falha ao compactar: {e}")
+            written = []
+        self._log(f"[autosave] {len(recovered)} turma(s) recuperada(s); checkpoint em: {', '.join(written) or '-'}. "
+                  f"Use \"Salvar JSON\" para gravar no seu arquivo.")
+
+    # ---------- Busca ----------
+    @property
+    def search_index(self) -> SearchIndex:
+        idx = self._indexes.get(self.current_dataset)
+        if idx is None:
+            idx = self._indexes[self.current_dataset] = SearchIndex(self.value_map)
+        return idx
+
+    def _update_search(self, changes: Dict[str, Optional[str]]):
+        """Aplica só as entradas alteradas ao índice da turma (se já foi construído).
+
+        Lotes grandes descartam o índice: reconstruí-lo na próxima busca sai mais barato.
+        """
+        idx = self._indexes.get(self.current_dataset)
+        if idx is not None and len(changes) > ROW_UPDATE_LIMIT:
+            del self._indexes[self.current_dataset]
+        elif idx is not None and changes:
+            idx.apply(changes)
 
     def _validate_ready(self):
         ready = (self.driver is not None) and bool(self.value_map)
@@ -120,29 +459,133 @@ class App(Tk):
                 browser = (self.browser_var.get() or "edge").strip().lower()
                 if self.driver is None:
                     self._log(f"[UI] Abrindo {browser.title()}...")
-                    self.driver = create_driver(browser=browser, logger=self._log)
+                    self.driver = self.standby.acquire(browser, self._profile())
                 self._log(f"[UI] Navegando para: {GET_URL}")
                 self.driver.get(GET_URL)
                 self._validate_ready()
             except Exception as e:
                 self._log(f"[ERRO] Falha ao abrir navegador: {e}")
-        threading.Thread(target=_run, daemon=True).start()
+        self._spawn("on_open_browser:tarefa", _run)
+
+    def on_browser_selected(self, _event=None):
+        if self.driver is None and self._prewarm:
+            self.standby.prewarm(self.browser_var.get(), self._profile())
+
+    def _toggle_profiling(self):
+        self.profiler.enabled = self.profile_var.get()
+        if self.profiler.enabled:
+            self._log(f"[perfil] Ligado: cada ação grava .prof/.txt em {self.profiler.out_dir}")
+        else:
+            self._log("[perfil] Desligado.")
+
+    def on_close(self):
+        try:
+            self.journal.compact()
+            self.journal.close()
+        except OSError as e:
+            self._log(f"[autosave] Falha ao compactar: {e}")
+        self.standby.discard()
+        self.destroy()
+
+    def on_dataset_selected(self, _event=None):
+        name = self.dataset_var.get()
+        if name and name != self.current_dataset:
+            self._switch_dataset(name)
+            self._log(f"[UI] Turma ativa: {name} ({len(self.value_map)} itens).")
+
+    def on_new_dataset(self):
+        name = simpledialog.askstring("Nova turma", "Nome da turma/dataset:", parent=self,
+                                      initialvalue=next_dataset_name(self.workspace))
+        if not name:
+            return
+        name = name.strip()
+        if name in self.workspace:
+            messagebox.showerror("Conflito", f"A turma {name!r} já existe.", parent=self)
+            return
+        self.workspace.set_dataset(name, {})
+        self._switch_dataset(name)
+        self._log(f"[UI] Turma criada: {name}")
+
+    def on_open_workspace(self):
+        path = filedialog.askopenfilename(parent=self, title="Abrir workspace", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            ws = Workspace.load(path)
+        except Exception as e:
+            self._log(f"[ERRO] Falha ao abrir workspace: {e}")
+            return
+        if not ws.names():
+            ws.set_dataset(next_dataset_name(ws), {})
+        try:
+            self.journal.compact()  # pendências da workspace anterior vão para out_portal/autosave/
+        except OSError as e:
+            self._log(f"[autosave] Falha ao compactar: {e}")
+        for ds, src in self.journal.unsaved().items():
+            self._log(f"[autosave] {ds}: alterações não salvas em {src or 'arquivo'} ficaram em "
+                      f"{self.journal.autosave_path(ds)}")
+        self.journal.forget()
+        self.workspace = ws
+        self._histories.clear()
+        self._indexes.clear()
+        self.watcher = FileWatcher()
+        self._sources.clear()
+        self._update_error_label()
+        self._switch_dataset(ws.names()[0], store_current=False)
+        st = ws.stats()
+        self._log(f"[UI] Workspace aberto: {st['datasets']} turmas, {st['entries']} entradas, "
+                  f"{st['unique_texts']} textos distintos.")
+
+    def on_save_workspace(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Salvar workspace", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")], initialfile="workspace.json")
+        if not path:
+            return
+        try:
+            self._intern_current()
+            self.workspace.save(path)
+            st = self.workspace.stats()
+            self._log(f"[UI] Workspace salvo em: {path} ({st['entries']} entradas, "
+                      f"{st['unique_texts']} textos distintos).")
+        except Exception as e:
+            self._log(f"[ERRO] Falha ao salvar workspace: {e}")
+
+    def on_undo(self):
+        res = self.history.undo()
+        if not res:
+            return
+        delta, label = res
+        self._apply_delta(delta, f"Desfazer: {label}")
+        self._log(f"[UI] Desfeito: {label} ({len(delta)} entradas)")
+
+    def on_redo(self):
+        res = self.history.redo()
+        if not res:
+            return
+        delta, label = res
+        self._apply_delta(delta, f"Refazer: {label}")
+        self._log(f"[UI] Refeito: {label} ({len(delta)} entradas)")
 
     def on_load_json(self):
         path = filedialog.askopenfilename(parent=self, title="Escolha dados.json", filetypes=[("JSON", "*.json")])
         if not path:
             return
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                raw = json.load(f)
-            norm, errors = validate_value_map(raw)
+            state = self._source_state(path)
+            norm, errors = self._read_json_source(path, state)
             self._log_clear()
             if errors:
                 self._log("⚠ Erros ao validar dados.json:")
                 for k, e in errors.items():
                     self._log(f" - {k}: {e}")
             self.value_map = self._sorted_by_date(norm)
+            self._intern_current()
+            self._record("Carregar dados", journal=False)
+            self.journal.set_base(self.current_dataset, path)
+            self.base_map = self.history.current
             self.current_path = path
+            self.current_turma = None
+            self._watch_source(path, state, kind="json")
             self._refresh_listbox()
             self._log("✔ dados.json carregado. Itens:")
             for k, v in self.value_map.items():
@@ -157,62 +600,54 @@ class App(Tk):
         if not key:
             return
         val = simpledialog.askstring("Texto", "Informe o texto:", parent=self) or ""
-        norm, errors = validate_value_map({key: val})
-        if errors:
-            msg = "\n".join(f"{k}: {e}" for k, e in errors.items())
-            messagebox.showerror("Erro de validação", msg, parent=self)
+        nk, err = validate_entry(key, val)
+        if err:
+            messagebox.showerror("Erro de validação", f"{key}: {err}", parent=self)
             return
-        nk = list(norm.keys())[0]
         if nk in self.value_map:
             messagebox.showerror("Conflito", f"A chave {nk!r} já existe.", parent=self)
             return
-        self.value_map[nk] = norm[nk]
-        self.value_map = self._sorted_by_date(self.value_map)
-        self._refresh_listbox()
+        changes: Dict[str, Optional[str]] = {nk: val}
+        self._record("Inserir", changes)
+        self._apply_changes(changes)
         self._log(f"[UI] Item adicionado: {nk}")
         self._validate_ready()
 
     def on_edit_item(self):
-        sel = self.listbox.curselection()
-        if not sel:
+        old_key = self._selected_key()
+        if old_key is None:
             messagebox.showinfo("Editar", "Selecione um item na lista.", parent=self)
             return
-        idx = sel[0]
-        old_key = list(self.value_map.keys())[idx]
         old_text = self.value_map[old_key]
         res = ask_edit_item(self, old_key, old_text)
         if not res:
             return
         new_key, new_text = res
-        norm, errors = validate_value_map({new_key: new_text})
-        if errors:
-            msg = "\n".join(f"{k}: {e}" for k, e in errors.items())
-            messagebox.showerror("Erro de validação", msg, parent=self)
-            return
-        new_key_norm = list(norm.keys())[0]
-        new_text_norm = norm[new_key_norm]
-        if new_key_norm != old_key:
-            if new_key_norm in self.value_map and new_key_norm != old_key:
-                messagebox.showerror("Conflito", f"A chave {new_key_norm!r} já existe.", parent=self)
-                return
-            del self.value_map[old_key]
-        self.value_map[new_key_norm] = new_text_norm
-        self.value_map = self._sorted_by_date(self.value_map)
-        self._refresh_listbox()
+        new_key_norm, err = validate_entry(new_key, new_text)
+        if err:
+            messagebox.showerror("Erro de validação", f"{new_key}: {err}", parent=self)
+            return
+        new_text_norm = new_text
+        if new_key_norm != old_key and new_key_norm in self.value_map:
+            messagebox.showerror("Conflito", f"A chave {new_key_norm!r} já existe.", parent=self)
+            return
+        changes: Dict[str, Optional[str]] = {old_key: None} if new_key_norm != old_key else {}
+        changes[new_key_norm] = new_text_norm
+        self._record("Editar", changes)
+        self._apply_changes(changes)
         self._log(f"[UI] Item editado: {new_key_norm}")
         self._validate_ready()
 
     def on_remove_item(self):
-        sel = self.listbox.curselection()
-        if not sel:
+        key = self._selected_key()
+        if key is None:
             messagebox.showinfo("Remover", "Selecione um item na lista.", parent=self)
             return
-        idx = sel[0]
-        key = list(self.value_map.keys())[idx]
         if not messagebox.askyesno("Confirmar remoção", f"Remover a entrada '{key}'?", parent=self):
             return
-        del self.value_map[key]
-        self._refresh_listbox()
+        changes: Dict[str, Optional[str]] = {key: None}
+        self._record("Remover", changes)
+        self._apply_changes(changes)
         self._log(f"[UI] Item removido: {key}")
         self._validate_ready()
 
@@ -225,8 +660,9 @@ class App(Tk):
         if not path:
             return
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(self.value_map, f, ensure_ascii=False, indent=2)
+            write_json_atomic(path, self.value_map)
+            self.journal.set_base(self.current_dataset, path)
+            self.current_path = path
             self._log(f"[UI] Salvo em: {path}")
         except Exception as e:
             self._log(f"[ERRO] Falha ao salvar JSON: {e}")
@@ -250,13 +686,224 @@ class App(Tk):
         def _run():
             try:
                 self._log("Iniciando preenchimento visual...")
-                ok, fail = fill_entries(self.driver, self.value_map, self._log)
-                try_click_save(self.driver, self._log)
-                self._log(f"Preenchimento concluído: {ok} ok, {fail} não encontrado.")
+                report: dict = {}
+                ok, fail, skipped = fill_entries(self.driver, self.value_map, self._log, report=report)
+                saved = try_click_save(self.driver, self._log)
+                self._log(f"Preenchimento concluído: {ok} ok, {fail} não encontrado, {skipped} pulados "
+                          f"| re-resolvidos após re-render: {report.get('retried', 0)}.")
+                self.last_run = {"fill": report, "dataset": self.current_dataset, "saved": saved}
+                if not saved:
+                    # recarregar para verificar descartaria o que acabou de ser digitado
+                    self._log("⚠ Nada foi salvo no portal: o texto está só na página. Salve manualmente "
+                              "antes de sair dela" + (" (verificação não executada)." if self.verify_var.get() else "."))
+                elif self.verify_var.get():
+                    self.last_run["verify"] = verify_after_save(self.driver, self.value_map, self._log)
+                self.last_run["finished"] = datetime.datetime.now().isoformat(timespec="seconds")
+                self.after(0, lambda: self.btn_export.configure(state="normal"))
+                if self.current_turma and self.repo:
+                    self.repo.record_fill(*self.current_turma, self._run_statuses(), saved=saved)
             except Exception as e:
                 self._log(f"[ERRO] Falha no preenchimento: {e}")
 
-        threading.Thread(target=_run, daemon=True).start()
+        self._spawn("on_fill:tarefa", _run)
+
+    def _run_statuses(self) -> Dict[str, str]:
+        """Status por chave do último preenchimento (verificação prevalece, se houver)."""
+        statuses = dict(self.last_run.get("fill", {}).get("status", {}))
+        for k, it in self.last_run.get("verify", {}).get("items", {}).items():
+            if statuses.get(k) == "ok" or it["status"] == "verified":
+                statuses[k] = it["status"]
+        return statuses
+
+    def on_export_run(self):
+        """Grava o status do último preenchimento na planilha de origem (cópia) e um relatório CSV."""
+        statuses = self._run_statuses()
+        if not statuses:
+            messagebox.showinfo("Exportar", "Nenhum preenchimento nesta sessão.", parent=self)
+            return
+        when = datetime.datetime.fromisoformat(self.last_run.get("finished") or datetime.datetime.now().isoformat())
+        ds = self.last_run.get("dataset", self.current_dataset)
+        sources = [(p, info["sheet"]) for p, info in self.watcher.watched()
+                   if info.get("kind") == "excel" and info.get("dataset") == ds]
+        if not sources:
+            path = filedialog.askopenfilename(
+                parent=self, title="Planilha de origem (opcional)",
+                filetypes=[("Excel", "*.xlsx;*.xlsm;*.xltx;*.xltm"), ("Todos", "*.*")]
+            )
+            if path:
+                try:
+                    wb = load_workbook(path, read_only=True)
+                    names = list(wb.sheetnames)
+                    wb.close()
+                except Exception as e:
+                    messagebox.showerror("Excel", f"Não consegui abrir o arquivo:\n{e}", parent=self)
+                    return
+                sheet = names[0] if len(names) == 1 else choose_from_list(self, "Escolha a aba", names)
+                if sheet:
+                    sources = [(path, sheet)]
+        value_map = dict(self._dataset_snapshot(ds))
+
+        def _run():
+            try:
+                for path, sheet in sources:
+                    res = write_back_statuses(path, sheet, statuses, normalize_label, when=when)
+                    counts = ", ".join(f"{k}: {v}" for k, v in sorted(res["counts"].items())) or "-"
+                    self._log(f"[exportar] {os.path.basename(path)} ({sheet}): {res['annotated']}/{res['rows']} "
+                              f"linhas anotadas ({counts}) → {res['path']}")
+                report = OUT_DIR / f"preenchimento_{when.strftime('%Y%m%d-%H%M%S')}.csv"
+                self._log(f"[exportar] Relatório: {export_run_report(str(report), run_report_rows(value_map, statuses, when))}")
+            except Exception as e:
+                self._log(f"[ERRO] Falha ao exportar: {e}")
+
+        self._spawn("on_export_run:tarefa", _run)
+
+    def on_open_repository(self):
+        if self.repo is None:
+            self.repo = DiaryRepository()
+
+        def _archive(semester: str, turma: str) -> str:
+            st = self.repo.import_map(semester, turma, self.value_map)
+            self.current_turma = (semester, turma)
+            self._log(f"[arquivo] {semester}/{turma}: {st['valid']} válidas, {st['written']} gravadas.")
+            return f"{st['valid']} entradas arquivadas em {semester}/{turma} ({st['written']} novas/alteradas)."
+
+        target = browse_repository(self, self.repo, on_archive=_archive)
+        if not target:
+            return
+        self.value_map = self.repo.load_map(*target)
+        self._intern_current()
+        self._record("Abrir do arquivo")
+        self.base_map = self.history.current
+        self.current_turma = target
+        self.current_path = None
+        self._refresh_listbox()
+        self._validate_ready()
+        self._log(f"[arquivo] Turma {target[1]} ({target[0]}) aberta: {len(self.value_map)} itens.")
+
+    def on_pull_portal(self):
+        if not self.driver:
+            messagebox.showerror("Navegador", "Abra o navegador primeiro.", parent=self)
+            return
+
+        def _run():
+            try:
+                self._log("[portal] Lendo conteúdo atual do diário...")
+                keys = list(self.value_map.keys())
+                try:
+                    # HTML salvo no servidor (GET condicional: 304 se nada mudou desde a última leitura)
+                    url = diary_document_url(self.driver, keys, self._log)
+                    remote = scrape_url(session_from_driver(self.driver), url)
+                    self._log(f"[portal] {len(remote)} entradas com conteúdo lidas por HTTP.")
+                except Exception as e:
+                    self._log(f"[portal] Leitura por HTTP indisponível ({type(e).__name__}); usando o navegador.")
+                    remote = scrape_diary(self.driver, keys, self._log)
+            except Exception as e:
+                self._log(f"[ERRO] Falha ao ler o portal: {e}")
+                return
+            self.after(0, lambda: self._merge_from_portal(remote))
+
+        self._spawn("on_pull_portal:tarefa", _run)
+
+    def on_discover_turmas(self):
+        if not self.driver:
+            messagebox.showerror("Navegador", "Abra o navegador e faça login primeiro.", parent=self)
+            return
+        today = datetime.date.today()
+        semester = simpledialog.askstring(
+            "Turmas do portal", "Semestre (ex.: 2025-1):", parent=self,
+            initialvalue=f"{today.year}-{1 if today.month <= 7 else 2}",
+        )
+        if not semester:
+            return
+
+        def _run():
+            try:
+                turmas = discover_turmas(session_from_driver(self.driver), semester.strip(), self._log,
+                                         pacer=self.pacer)
+            except Exception as e:
+                self._log(f"[ERRO] Falha ao listar turmas: {e}")
+                return
+            self.after(0, lambda: self._choose_turmas(turmas))
+
+        self._spawn("on_discover_turmas:tarefa", _run)
+
+    def _choose_turmas(self, turmas: list):
+        turmas = [t for t in turmas if t.get("diary_url")]
+        if not turmas:
+            self._log("[turmas] Nenhum diário localizado.")
+            return
+        idx = choose_many(self, "Turmas para preencher", [f"{t['code']} – {t['name']}" for t in turmas])
+        if not idx:
+            return
+        chosen = [turmas[i] for i in idx]
+        if len(chosen) == 1:
+            t = chosen[0]
+
+            def _open():
+                try:
+                    self.driver.get(t["diary_url"])
+                    self._log(f"[turmas] Diário de {t['code']} aberto; use 'Preencher diário'.")
+                except Exception as e:
+                    self._log(f"[ERRO] Falha ao abrir o diário: {e}")
+
+            self._spawn("abrir_turma:tarefa", _open)
+            return
+
+        # várias turmas: cada uma usa o dataset do workspace com o mesmo código/nome
+        self._intern_current()
+        targets, missing = [], []
+        for t in chosen:
+            name = next((n for n in self.workspace.names() if n in (t["code"], t["name"])), None)
+            if name is None:
+                missing.append(t["code"])
+            else:
+                targets.append({"name": name, "url": t["diary_url"], "value_map": dict(self.workspace.dataset(name))})
+        if missing:
+            self._log(f"[turmas] Sem dataset no workspace (ignoradas): {', '.join(missing)}")
+        if not targets:
+            return
+        total = sum(len(t["value_map"]) for t in targets)
+        if not messagebox.askyesno(
+            "Preencher várias turmas",
+            f"Preencher {total} itens em {len(targets)} turmas, salvando com ritmo adaptativo?",
+            parent=self,
+        ):
+            return
+
+        def _run():
+            try:
+                report = fill_turmas(self.driver, targets, self._log,
+                                     pacer=self.pacer, verify=self.verify_var.get())
+                self.last_run = {"batch": report}
+            except Exception as e:
+                self._log(f"[ERRO] Falha no preenchimento em lote: {e}")
+
+        self._spawn("fill_turmas:tarefa", _run)
+
+    def _merge_from_portal(self, remote: Dict[str, str]):
+        diff = diff_maps(self.value_map, remote)
+        self._log(f"[portal] Só no portal: {len(diff['added'])} | diferentes: {len(diff['changed'])} | "
+                  f"iguais: {len(diff['same'])} | só no app: {len(diff['removed'])}")
+        for k in (diff["added"] + diff["changed"])[:10]:
+            self._log(f"   - {k}: {preview_text(remote[k])}")
+        if not diff["added"] and not diff["changed"]:
+            return
+
+        merged, conflicts = three_way_merge(self.base_map, self.value_map, remote)
+        if not messagebox.askyesno(
+            "Mesclar com o portal",
+            f"Trazer {len(merged) - len(self.value_map)} novas e atualizar alteradas do portal?\n"
+            f"Conflitos (mantém o texto do app): {len(conflicts)}",
+            parent=self,
+        ):
+            return
+        self.value_map = self._sorted_by_date(merged)
+        self._record("Mesclar do portal")
+        self._refresh_listbox()
+        self._validate_ready()
+        self._log(f"✔ Mesclagem com o portal concluída. Conflitos: {len(conflicts)}")
+        for k, (_b, l, r) in conflicts.items():
+            self._log(f"   ! {k}: app={preview_text(l or '')!r} | portal={preview_text(r or '')!r}")
 
     def on_import_excel(self):
         path = filedialog.askopenfilename(
@@ -278,8 +925,10 @@ class App(Tk):
             return
         ws = wb[sheet]
 
-        # Processa com o normalize/validate do projeto
-        norm, stats = process_worksheet(ws, validate_value_map)
+        # Processa com o normalize/validate do projeto (incremental: reimportar a mesma aba
+        # revalida só as linhas alteradas)
+        state = self._source_state(path)
+        norm, stats = process_worksheet(ws, state)
         wb.close()
 
         if stats.get("errors"):
@@ -291,6 +940,9 @@ class App(Tk):
         self.value_map.update(norm)
         # >>> ORDENAR POR DATA DE VERDADE (antes estava por texto) <<<
         self.value_map = self._sorted_by_date(self.value_map)
+        self._intern_current()
+        self._record("Importar Excel", {k: self.value_map[k] for k in norm})
+        self._watch_source(path, state, kind="excel", sheet=sheet)
 
         self._refresh_listbox()
         self._validate_ready()
@@ -304,6 +956,110 @@ class App(Tk):
         for i, k in enumerate(list(norm.keys())[:5]):
             self._log(f"   - {k}: {preview_text(norm[k])}")
 
+    # ---------- Modo observação ----------
+    def _source_state(self, path: str) -> ValidationState:
+        """Validação incremental do arquivo (reaproveitada se ele já foi lido nesta sessão)."""
+        entry = self._sources.get(os.path.abspath(path))
+        return entry[1] if entry else ValidationState(check_key)
+
+    def _read_json_source(self, path: str, state: ValidationState):
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return state(raw)
+
+    def _read_excel_source(self, path: str, sheet: str, state: ValidationState):
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            return process_worksheet(wb[sheet], state)
+        finally:
+            wb.close()
+
+    def _watch_source(self, path: str, state: ValidationState, **info):
+        """Passa a observar o arquivo de origem do dataset ativo."""
+        key = self.watcher.watch(path, dataset=self.current_dataset, **info)
+        self._sources[key] = (self.current_dataset, state)
+        self._update_error_label()
+
+    def _source_errors(self) -> Dict[str, Dict[str, str]]:
+        """Erros vivos dos arquivos de origem da turma ativa: {arquivo: {chave bruta: motivo}}."""
+        return {os.path.basename(p): st.errors for p, (ds, st) in self._sources.items()
+                if ds == self.current_dataset and st.errors}
+
+    def _update_error_label(self):
+        n = sum(len(e) for e in self._source_errors().values())
+        self.lbl_errors.configure(text=(f"⚠ {n} erro(s) na origem" if n else ""))
+
+    def _log_source_errors(self):
+        for name, errors in self._source_errors().items():
+            self._log(f"⚠ {name}: {len(errors)} erro(s)")
+            for k, e in list(errors.items())[:50]:
+                self._log(f" - {k}: {e}")
+
+    def _poll_watch(self):
+        try:
+            if self.watch_var.get() and len(self.watcher):
+                for path, info in self.watcher.poll():
+                    self._reload_source(path, info)
+        finally:
+            self.after(self._watch_ms, self._poll_watch)
+
+    def _reload_source(self, path: str, info: dict):
+        """Reimporta um arquivo alterado e aplica só as entradas que mudaram nele.
+
+        Entradas editadas no app desde a última importação ficam como estão (conflito,
+        igual à mesclagem com o portal).
+        """
+        ds = info["dataset"]
+        name = os.path.basename(path)
+        if ds not in self.workspace:
+            self.watcher.unwatch(path)
+            return
+        state = self._sources[path][1]
+        try:
+            if info["kind"] == "excel":
+                self._read_excel_source(path, info["sheet"], state)
+            else:
+                self._read_json_source(path, state)
+        except Exception as e:
+            self.watcher.invalidate(path)  # provavelmente ainda em gravação; tenta de novo
+            self._log(f"[observar] {name}: leitura falhou ({e}); nova tentativa em seguida.")
+            return
+
+        diff = state.last_diff  # só as entradas que mudaram no arquivo: {chave: (antes, depois)}
+        if ds == self.current_dataset:
+            self._update_error_label()
+        current = self.value_map if ds == self.current_dataset else self.workspace.dataset(ds)
+        conflicts = [k for k, (old, new) in diff.items() if current.get(k) != old and current.get(k) != new]
+        changes = {k: new for k, (_old, new) in diff.items() if k not in conflicts and current.get(k) != new}
+        if not changes and not conflicts:
+            return
+
+        label = f"Observar {name}"
+        if ds == self.current_dataset:
+            self._record(label, changes)
+            self._apply_changes(changes)
+            self._validate_ready()
+        else:
+            resort = any(v is not None and k not in current for k, v in changes.items())
+            for k, v in changes.items():
+                if v is None:
+                    current.pop(k, None)
+                else:
+                    current[k] = v
+            self.workspace.set_dataset(ds, self._sorted_by_date(current) if resort else current)
+            self._journal(ds, changes, label)
+            if ds in self._histories:
+                self._histories[ds].commit(changes, label)
+            if ds in self._indexes:
+                self._indexes[ds].apply(changes)
+
+        added = sum(1 for k in changes if diff[k][0] is None)
+        removed = sum(1 for v in changes.values() if v is None)
+        self._log(f"[observar] {name} ({ds}): +{added} ~{len(changes) - added - removed} -{removed}"
+                  + (f" | mantidas do app (editadas aqui): {len(conflicts)}" if conflicts else ""))
+        for k in conflicts[:5]:
+            self._log(f"   ! {k}")
+
     def on_shift_dates(self):
         params = ask_shift_params(self)
         if not params:
@@ -313,6 +1069,7 @@ class App(Tk):
         self.value_map = new_map
         # reforça ordenação por data após ajuste
         self.value_map = self._sorted_by_date(self.value_map)
+        self._record(f"Ajustar datas ({amount:+d} {unit})")
         self._refresh_listbox()
         self._validate_ready()
         self._log(f"✔ Ajuste concluído: {stats['changed']} alteradas | inválidas: {stats['invalid']} | "
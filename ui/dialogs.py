@@ -61,6 +61,42 @@ def choose_from_list(parent, title: str, options: List[str]) -> Optional[str]:
     parent.wait_window(win)
     return res[0]  # type: ignore[return-value]
 
+def choose_many(parent, title: str, options: List[str], height: int = 18) -> Optional[List[int]]:
+    """Modal com seleção múltipla. Retorna os índices escolhidos (None se cancelar)."""
+    from tkinter import Listbox, Scrollbar, EXTENDED, END
+    if not options:
+        return None
+    win = Centerlevel(parent)
+    win.title(title)
+
+    Label(win, text=f"{title} (Ctrl/Shift para vários)").grid(row=0, column=0, columnspan=2, padx=8, pady=(8, 4), sticky="w")
+    lst = Listbox(win, selectmode=EXTENDED, width=80, height=height)
+    sb = Scrollbar(win, command=lst.yview)
+    lst.configure(yscrollcommand=sb.set)
+    lst.grid(row=1, column=0, sticky="nsew", padx=(8, 0))
+    sb.grid(row=1, column=1, sticky="ns", padx=(0, 8))
+    for opt in options:
+        lst.insert(END, opt)
+
+    res = [None]
+    def _ok():
+        sel = list(lst.curselection())
+        res[0] = sel or None
+        win.destroy()
+    def _all(): lst.selection_set(0, END)
+    def _cancel(): win.destroy()
+
+    btns = Frame(win); btns.grid(row=2, column=0, columnspan=2, sticky="we", padx=8, pady=8)
+    Button(btns, text="Todas", command=_all).pack(side="left", padx=4)
+    Button(btns, text="Cancelar", command=_cancel).pack(side="right", padx=4)
+    Button(btns, text="OK", command=_ok).pack(side="right", padx=4)
+
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+    lst.focus_set()
+    parent.wait_window(win)
+    return res[0]  # type: ignore[return-value]
+
 def ask_shift_params(parent) -> Optional[tuple[str, int, str]]:
     """Pergunta (unidade, valor, filtro). Retorna ('Dias'|'Meses'|'Anos', int, 'Todas'|'Só T (Teóricas)'|'Só P (Práticas)')."""
     from tkinter import messagebox
@@ -109,4 +145,101 @@ def ask_shift_params(parent) -> Optional[tuple[str, int, str]]:
     win.columnconfigure(1, weight=1)
     cbo_unit.focus_set()
     parent.wait_window(win)
-    return res[0]
\ No newline at end of file
+    return res[0]
+
+def browse_repository(parent, repo, on_archive=None, page_size: int = 200) -> Optional[Tuple[str, str]]:
+    """Consulta paginada do arquivo SQLite. Retorna (semestre, turma) para abrir no editor, ou None.
+    on_archive(semestre, turma) -> str: grava os dados atuais do app e devolve mensagem."""
+    from tkinter import Listbox, Scrollbar, BooleanVar, messagebox
+    from services.utils import preview_text
+    win = Centerlevel(parent)
+    win.title("Arquivo de diários")
+
+    filt = Frame(win); filt.grid(row=0, column=0, sticky="we", padx=8, pady=(8, 4))
+    Label(filt, text="Semestre:").pack(side="left")
+    var_sem = StringVar(); Entry(filt, textvariable=var_sem, width=8).pack(side="left", padx=(2, 8))
+    Label(filt, text="Turma:").pack(side="left")
+    var_tur = StringVar(); Entry(filt, textvariable=var_tur, width=12).pack(side="left", padx=(2, 8))
+    Label(filt, text="Modalidade:").pack(side="left")
+    var_suf = StringVar(value="")
+    ttk.Combobox(filt, textvariable=var_suf, values=["", "P", "T"], state="readonly", width=3).pack(side="left", padx=(2, 8))
+    var_unsaved = BooleanVar(value=False)
+    ttk.Checkbutton(filt, text="Só não salvas", variable=var_unsaved).pack(side="left", padx=(0, 8))
+    var_txt = StringVar(); Entry(filt, textvariable=var_txt, width=18).pack(side="left", padx=(0, 4))
+
+    lst = Listbox(win, width=110, height=22)
+    sb = Scrollbar(win, command=lst.yview)
+    lst.grid(row=1, column=0, sticky="nsew", padx=(8, 0))
+    sb.grid(row=1, column=1, sticky="ns", padx=(0, 8))
+    lbl_count = Label(win, text="")
+    lbl_count.grid(row=2, column=0, sticky="w", padx=8)
+
+    state = {"pages": None, "rows": [], "done": True}
+
+    def _filters() -> dict:
+        return {
+            "semester": var_sem.get().strip() or None,
+            "turma": var_tur.get().strip() or None,
+            "suffix": var_suf.get().strip() or None,
+            "unsaved": True if var_unsaved.get() else None,
+            "text": var_txt.get().strip() or None,
+        }
+
+    def _more():
+        if state["done"]:
+            return
+        page = next(state["pages"], None)
+        if not page:
+            state["done"] = True
+            return
+        for r in page:
+            mark = "✔" if r["saved_at"] else "·"
+            lst.insert("end", f"{mark} {r['semester']} | {r['turma']} | {r['key']}: {preview_text(r['text'], 70)}")
+        state["rows"].extend(page)
+
+    def _search():
+        lst.delete(0, "end")
+        f = _filters()
+        state.update(pages=repo.iter_pages(page_size, **f), rows=[], done=False)
+        lbl_count.configure(text=f"{repo.count(**f)} entradas")
+        _more()
+
+    def _on_scroll(first, last):
+        sb.set(first, last)
+        if float(last) > 0.95:  # carrega a próxima página perto do fim
+            _more()
+    lst.configure(yscrollcommand=_on_scroll)
+
+    res = [None]
+    def _open():
+        sel = lst.curselection()
+        if sel:
+            r = state["rows"][sel[0]]
+            res[0] = (r["semester"], r["turma"])
+        elif var_sem.get().strip() and var_tur.get().strip():
+            res[0] = (var_sem.get().strip(), var_tur.get().strip())
+        else:
+            messagebox.showinfo("Arquivo", "Selecione uma linha ou informe semestre e turma.", parent=win)
+            return
+        win.destroy()
+
+    def _archive():
+        sem, tur = var_sem.get().strip(), var_tur.get().strip()
+        if not sem or not tur:
+            messagebox.showinfo("Arquivo", "Informe semestre e turma para arquivar.", parent=win)
+            return
+        messagebox.showinfo("Arquivo", on_archive(sem, tur), parent=win)
+        _search()
+
+    btns = Frame(win); btns.grid(row=3, column=0, columnspan=2, sticky="e", padx=8, pady=8)
+    Button(btns, text="Fechar", command=win.destroy).pack(side="right", padx=4)
+    Button(btns, text="Abrir turma", command=_open).pack(side="right", padx=4)
+    if on_archive:
+        Button(btns, text="Arquivar dados atuais", command=_archive).pack(side="right", padx=4)
+    Button(filt, text="Buscar", command=_search).pack(side="left", padx=4)
+
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+    _search()
+    parent.wait_window(win)
+    return res[0]  # type: ignore[return-value]